@@ -1,19 +1,57 @@
-from flask import Flask, render_template, request, send_file, redirect, url_for, flash
-from datetime import datetime
+from flask import (Flask, Blueprint, Response, render_template, request, send_file, redirect, url_for, flash,
+                   jsonify, make_response, stream_with_context, current_app)
+from datetime import datetime, timezone
 import pandas as pd
 import os
 from sistema_escala import SistemaEscalaExcel
+from esquema import expandir_escala, compactar_contadores
+from edicao import EditorEscala, caminho_diario
+from historico import ARQUIVO_MANIFESTO
+from travas import trava_geracao
+import exportacao
+from aquecimento import Aquecimento
 import io
 
-app = Flask(__name__)
-app.secret_key = 'escala_rodizio_secreto_2024'
+# Motor único do processo, compartilhado por todas as aplicações criadas aqui
 sistema = SistemaEscalaExcel()
+editor = EditorEscala(sistema)
 
-@app.route('/')
+escalas = Blueprint('escalas', __name__)
+
+# Abreviações de dia aceitas nos formulários e na API (índice 0=Seg ... 6=Dom)
+DIAS_CONSULTA = ['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom']
+
+# Maior página aceita por /api/escala
+LIMITE_PAGINA_MAX = 500
+
+# Maior intervalo (em meses, inclusive) aceito por /api/disponibilidade
+MESES_CONSULTA_MAX = 24
+
+# Páginas e arquivos de escala podem ficar no navegador, mas são sempre revalidados pelo ETag
+CACHE_CONTROL_ESCALAS = 'private, no-cache'
+
+def data_http(timestamp: float) -> datetime:
+    """Timestamp em datetime UTC com precisão de segundos (formato do Last-Modified)"""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+def cliente_atualizado(etag: str, ultima_modificacao: float) -> bool:
+    """Verifica se o cliente já tem esta versão (If-None-Match tem precedência sobre If-Modified-Since)"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return request.if_modified_since is not None and data_http(ultima_modificacao) <= request.if_modified_since
+
+def marcar_versao(resposta, etag: str, ultima_modificacao: float):
+    """Adiciona ETag, Last-Modified e Cache-Control a uma resposta"""
+    resposta.set_etag(etag)
+    resposta.last_modified = data_http(ultima_modificacao)
+    resposta.headers['Cache-Control'] = CACHE_CONTROL_ESCALAS
+    return resposta
+
+@escalas.route('/')
 def index():
     """Página inicial"""
     # Carregar escalas existentes
-    arquivos = sistema.listar_escalas_existentes(return_list=True)
+    arquivos = [entrada['arquivo'] for entrada in sistema.listar_historico()]
     
     # Estatísticas rápidas
     stats = {
@@ -24,7 +62,23 @@ def index():
     
     return render_template('index.html', stats=stats)
 
-@app.route('/gerar_escala', methods=['GET', 'POST'])
+@escalas.before_app_request
+def sincronizar_caches():
+    """Descarta meses em cache que outro worker salvou ou editou desde a última requisição"""
+    sistema.sincronizar_caches()
+
+@escalas.app_context_processor
+def injetar_regras():
+    """Regras de negócio em vigor (regras_escala.json) disponíveis nos templates"""
+    return {'regras': sistema.regras}
+
+@escalas.route('/saude')
+def saude():
+    """Saúde e prontidão (503 enquanto o aquecimento do histórico não terminou)"""
+    resumo = current_app.extensions['aquecimento'].resumo()
+    return jsonify(resumo), 200 if resumo['pronto'] else 503
+
+@escalas.route('/gerar_escala', methods=['GET', 'POST'])
 def gerar_escala():
     """Gerar nova escala mensal"""
     if request.method == 'POST':
@@ -32,6 +86,8 @@ def gerar_escala():
             ano = int(request.form['ano'])
             mes = int(request.form['mes'])
             semanas = int(request.form.get('semanas', 4))
+            motor = request.form.get('motor', 'guloso')
+            otimizar = 'otimizar' in request.form
             
             # Verificar se já existe
             arquivo_existente = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
@@ -44,16 +100,18 @@ def gerar_escala():
                                      ano=ano, 
                                      mes=mes, 
                                      semanas=semanas,
+                                     motor=motor,
+                                     otimizar=otimizar,
                                      existe=True)
             
-            # Gerar escala
-            df_escala = sistema.gerar_escala_mensal(ano, mes, semanas)
-            
-            # Salvar
-            arquivo_salvo = sistema.salvar_escala_excel(df_escala, ano, mes)
+            # Gerar e salvar com a trava do período (outro worker ou a CLI não gravam o mês no meio)
+            with trava_geracao(sistema.diretorio_escalas, ano, mes):
+                df_escala = sistema.gerar_escala_mensal(ano, mes, semanas, motor=motor, otimizar=otimizar)
+                arquivo_salvo = sistema.salvar_escala_excel(df_escala, ano, mes)
+            resumo_portfolio = df_escala.attrs.get('portfolio')
             
             # Verificar regras
-            verificacao = sistema.verificar_regras(df_escala)
+            verificacao = sistema.validar_escala(df_escala)['regras']
             
             # Calcular estatísticas
             stats = {
@@ -71,10 +129,13 @@ def gerar_escala():
                     verificacao['rodizio_sabado'],
                     verificacao['rodizio_folgas']
                 ]),
-                'primeiros_funcionarios': df_escala.head(10).to_dict('records')
+                'primeiros_funcionarios': expandir_escala(df_escala.head(10)).to_dict('records')
             }
             
             flash(f'Escala gerada com sucesso para {mes:02d}/{ano}!', 'success')
+            if resumo_portfolio:
+                flash(f"Melhor de {resumo_portfolio['candidatos']} candidatos: {resumo_portfolio['melhor']:.0f} pontos "
+                      f"(mediana {resumo_portfolio['mediana']:.0f}, pior {resumo_portfolio['pior']:.0f})", 'info')
             return render_template('gerar_escala_resultado.html', 
                                  stats=stats, 
                                  erros=verificacao['erros'][:10],
@@ -87,84 +148,180 @@ def gerar_escala():
     
     return render_template('gerar_escala.html', confirmar=False)
 
-@app.route('/listar_escalas')
+@escalas.route('/listar_escalas')
 def listar_escalas():
     """Listar todas as escalas existentes"""
-    arquivos = sistema.listar_escalas_existentes(return_list=True)
+    entradas = sistema.listar_historico()
+    
+    # A lista muda apenas quando o manifesto é regravado
+    info = os.stat(f"{sistema.diretorio_escalas}/{ARQUIVO_MANIFESTO}")
+    etag = f"manifesto-{info.st_mtime_ns}"
+    if cliente_atualizado(etag, info.st_mtime):
+        return marcar_versao(make_response('', 304), etag, info.st_mtime)
     
     escalas_detalhadas = []
-    for arquivo in arquivos:
-        partes = arquivo.replace('ESCALA_', '').replace('.xlsx', '').split('_')
-        if len(partes) >= 2:
-            ano, mes = partes[0], partes[1]
-            caminho = f"{sistema.diretorio_escalas}/{arquivo}"
-            tamanho = f"{os.path.getsize(caminho) / 1024:.1f} KB" if os.path.exists(caminho) else "N/A"
-            
-            escalas_detalhadas.append({
-                'arquivo': arquivo,
-                'ano': ano,
-                'mes': mes,
-                'tamanho': tamanho,
-                'caminho': caminho
-            })
-    
-    return render_template('listar_escalas.html', escalas=escalas_detalhadas)
+    for entrada in entradas:
+        escalas_detalhadas.append({
+            'arquivo': entrada['arquivo'],
+            'ano': str(entrada['ano']),
+            'mes': f"{entrada['mes']:02d}",
+            'tamanho': f"{entrada['tamanho'] / 1024:.1f} KB",
+            'caminho': entrada['caminho'],
+            'linhas': entrada['linhas'],
+            'validacao': entrada['validacao']
+        })
+    
+    return marcar_versao(make_response(render_template('listar_escalas.html', escalas=escalas_detalhadas)),
+                         etag, info.st_mtime)
 
-@app.route('/visualizar_escala/<ano>/<mes>')
+@escalas.route('/visualizar_escala/<ano>/<mes>')
 def visualizar_escala(ano, mes):
     """Visualizar escala específica"""
     try:
-        arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{int(mes):02d}.xlsx"
+        versao = sistema.versao_http(int(ano), int(mes))
         
-        if not os.path.exists(arquivo):
+        if versao is None:
             flash('Escala não encontrada', 'danger')
             return redirect('/listar_escalas')
         
-        # Carregar dados
-        df_escala = pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA')
+        # Mesma versão (Excel + edições) que o navegador já tem: nada a recalcular
+        if cliente_atualizado(versao['etag'], versao['mtime_conteudo']):
+            return marcar_versao(make_response('', 304), versao['etag'], versao['mtime_conteudo'])
         
-        # Converter para lista de dicionários para o template
-        dados = df_escala.head(50).to_dict('records')
+        # Estatísticas direto da cópia codificada; as linhas são buscadas pela página em /api/escala
+        escala = sistema.carregar_escala_codificada(int(ano), int(mes))
+        resumo = escala.resumo()
         
-        # Estatísticas
         stats = {
             'ano': ano,
             'mes': mes,
-            'total_registros': len(df_escala),
-            'semanas': df_escala['Semana do Mês'].nunique(),
-            'funcionarios': df_escala['Funcionário'].nunique(),
-            'total_dias_trabalhados': int(df_escala['Dias Trabalhados'].sum()),
-            'dados': dados
+            'total_registros': resumo['registros'],
+            'semanas': resumo['semanas'],
+            'funcionarios': resumo['funcionarios'],
+            'total_dias_trabalhados': resumo['dias_trabalhados'],
+            'ilhas': escala.nomes_ilhas,
+            'lista_semanas': sorted(set(escala.semanas.tolist()))
         }
         
-        return render_template('visualizar.html', stats=stats)
+        return marcar_versao(make_response(render_template('visualizar.html', stats=stats)),
+                             versao['etag'], versao['mtime_conteudo'])
         
     except Exception as e:
         flash(f'Erro ao carregar escala: {str(e)}', 'danger')
         return redirect('/listar_escalas')
 
-@app.route('/download_escala/<ano>/<mes>')
+@escalas.route('/download_escala/<ano>/<mes>')
 def download_escala(ano, mes):
-    """Download do arquivo Excel"""
+    """
+    Download do arquivo Excel
+    
+    Com edições no diário, a planilha é montada em memória com as edições
+    aplicadas; nada é gravado (a consolidação fica com `escala_cli consolidar`).
+    """
     try:
-        arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{int(mes):02d}.xlsx"
+        ano, mes = int(ano), int(mes)
+        arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
         
-        if not os.path.exists(arquivo):
+        if os.path.exists(caminho_diario(sistema.diretorio_escalas, ano, mes)):
+            # Versão antes do conteúdo: uma edição no meio deixa o ETag mais velho
+            # que os bytes, e o navegador só baixa de novo na próxima vez
+            versao = sistema.versao_http(ano, mes)
+            escala = sistema.carregar_escala_codificada(ano, mes) if versao is not None else None
+            conteudo = exportacao.planilha_editada(escala, {
+                'CONTADORES_FIM_SEMANA': sistema.ler_contadores_fim_semana(ano, mes),
+                'RODÍZIO_FOLGAS': sistema.ler_rodizio_folgas(ano, mes)
+            }) if escala is not None else None
+        else:
+            # Sem trava: a gravação é atômica (os.replace), então o arquivo aberto
+            # não muda, e a versão vem do fstat desse mesmo arquivo
+            try:
+                conteudo = open(arquivo, 'rb')
+            except FileNotFoundError:
+                conteudo = None
+            versao = sistema.versao_http(ano, mes, conteudo) if conteudo is not None else None
+        
+        if conteudo is None:
             flash('Arquivo não encontrado', 'danger')
             return redirect('/listar_escalas')
         
-        return send_file(
-            arquivo,
+        # conditional=True responde 304 (If-None-Match/If-Modified-Since) e 206 (Range)
+        resposta = send_file(
+            conteudo,
             as_attachment=True,
-            download_name=f"ESCALA_{ano}_{int(mes):02d}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            download_name=f"ESCALA_{ano}_{mes:02d}.xlsx",
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            conditional=True,
+            etag=versao['etag'],
+            last_modified=data_http(versao['mtime_conteudo'])
         )
+        resposta.headers['Cache-Control'] = CACHE_CONTROL_ESCALAS
+        return resposta
         
     except Exception as e:
         flash(f'Erro ao baixar arquivo: {str(e)}', 'danger')
         return redirect('/listar_escalas')
 
-@app.route('/contadores', methods=['GET', 'POST'])
+@escalas.route('/exportar/<tipo>/<formato>')
+def exportar(tipo, formato):
+    """
+    Exportação em fluxo (CSV ou NDJSON) para o BI
+    
+    Tipos: escala, contadores (por mês) e estatisticas (anuais por funcionário).
+    Parâmetros opcionais: desde e ate (AAAA-MM).
+    """
+    try:
+        periodos = exportacao.periodos_entre(sistema.listar_historico(),
+                                             request.args.get('desde'), request.args.get('ate'))
+        blocos = exportacao.exportar(sistema, tipo, formato, periodos)
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    
+    intervalo = f"{request.args.get('desde', 'inicio')}_{request.args.get('ate', 'fim')}"
+    
+    # Sem Content-Length: a resposta sai em partes (chunked) à medida que o gerador produz
+    return Response(
+        stream_with_context(blocos),
+        content_type=exportacao.FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename={tipo.upper()}_{intervalo}.{formato}'}
+    )
+
+@escalas.route('/exportar_xlsx/<int:ano>/<int:mes>')
+def exportar_xlsx(ano, mes):
+    """
+    Planilha filtrada de um mês, montada em memória (nada é gravado em disco)
+    
+    Parâmetros opcionais: ilha, semana_de, semana_ate e funcionarios
+    (nomes exatos separados por vírgula).
+    """
+    escala = sistema.carregar_escala_codificada(ano, mes)
+    
+    if escala is None:
+        return jsonify({'erro': f'Escala não encontrada para {mes:02d}/{ano}'}), 404
+    
+    try:
+        args = request.args
+        semanas = None
+        if args.get('semana_de') or args.get('semana_ate'):
+            semanas = (int(args.get('semana_de') or 1), int(args.get('semana_ate') or 255))
+        funcionarios = [f.strip() for f in args['funcionarios'].split(',')] if args.get('funcionarios') else None
+        
+        linhas = escala.filtrar(ilha=args.get('ilha') or None, semanas=semanas, funcionarios=funcionarios)
+        buffer = exportacao.planilha_filtrada(escala, linhas, f"ESCALA_{ano}_{mes:02d}")
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetros inválidos: {e}'}), 400
+    except OverflowError as e:
+        return jsonify({'erro': str(e)}), 413
+    
+    sufixo = args.get('ilha', 'FILTRO').replace(' ', '_')
+    
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=f"ESCALA_{ano}_{mes:02d}_{sufixo}.xlsx",
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+
+@escalas.route('/contadores', methods=['GET', 'POST'])
 def contadores():
     """Ver contadores de fim de semana"""
     if request.method == 'POST':
@@ -173,39 +330,14 @@ def contadores():
             mes = int(request.form['mes'])
             
             if mes == 0:  # Ano inteiro
-                arquivos_ano = []
-                for m in range(1, 13):
-                    arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{m:02d}.xlsx"
-                    if os.path.exists(arquivo):
-                        arquivos_ano.append(arquivo)
+                # Agregado anual mantido a cada salvamento (uma leitura só)
+                registros = sistema.carregar_contadores_anuais(ano)
                 
-                if not arquivos_ano:
+                if not registros:
                     flash(f'Nenhuma escala encontrada para o ano {ano}', 'warning')
                     return render_template('contadores.html')
                 
-                # Combinar contadores
-                todos_contadores = []
-                for arquivo in arquivos_ano:
-                    try:
-                        df = pd.read_excel(arquivo, sheet_name='CONTADORES_FIM_SEMANA')
-                        todos_contadores.append(df)
-                    except:
-                        continue
-                
-                if not todos_contadores:
-                    flash('Não foi possível carregar contadores', 'warning')
-                    return render_template('contadores.html')
-                
-                df_todos = pd.concat(todos_contadores, ignore_index=True)
-                df_agrupado = df_todos.groupby('Funcionário').agg({
-                    'Sábados Trabalhados': 'sum',
-                    'Domingos Trabalhados': 'sum',
-                    'Total Fim de Semana': 'sum',
-                    'Rodada Domingo': 'max',
-                    'Rodada Sábado': 'max'
-                }).reset_index()
-                
-                contadores = df_agrupado.sort_values('Domingos Trabalhados').head(50).to_dict('records')
+                contadores = sorted(registros, key=lambda r: r['Domingos Trabalhados'])[:50]
                 titulo = f"Contadores Acumulados do Ano {ano}"
                 
             else:  # Mês específico
@@ -215,7 +347,7 @@ def contadores():
                     flash(f'Escala não encontrada para {mes:02d}/{ano}', 'warning')
                     return render_template('contadores.html')
                 
-                df_contadores = pd.read_excel(arquivo, sheet_name='CONTADORES_FIM_SEMANA')
+                df_contadores = compactar_contadores(sistema.ler_contadores_fim_semana(ano, mes))
                 contadores = df_contadores.sort_values('Domingos Trabalhados').head(50).to_dict('records')
                 titulo = f"Contadores de {mes:02d}/{ano}"
             
@@ -230,7 +362,7 @@ def contadores():
     
     return render_template('contadores.html')
 
-@app.route('/gerar_relatorio', methods=['GET', 'POST'])
+@escalas.route('/gerar_relatorio', methods=['GET', 'POST'])
 def gerar_relatorio():
     """Gerar relatório anual"""
     if request.method == 'POST':
@@ -252,7 +384,7 @@ def gerar_relatorio():
     
     return render_template('relatorio.html')
 
-@app.route('/verificar_rodizio', methods=['GET', 'POST'])
+@escalas.route('/verificar_rodizio', methods=['GET', 'POST'])
 def verificar_rodizio():
     """Verificar rodízio perfeito"""
     if request.method == 'POST':
@@ -266,11 +398,10 @@ def verificar_rodizio():
                 flash(f'Escala não encontrada para {mes:02d}/{ano}', 'warning')
                 return render_template('rodizio.html')
             
-            df_escala = pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA')
-            rodizio = sistema.verificar_rodizio_perfeito(df_escala)
+            rodizio = sistema.carregar_validacao(ano, mes)['rodizio']
             
             # Carregar contadores para detalhes
-            df_contadores = pd.read_excel(arquivo, sheet_name='CONTADORES_FIM_SEMANA')
+            df_contadores = compactar_contadores(sistema.ler_contadores_fim_semana(ano, mes))
             
             # Estatísticas por ilha
             stats_ilha = []
@@ -308,7 +439,7 @@ def verificar_rodizio():
     
     return render_template('rodizio.html')
 
-@app.route('/verificar_disponibilidade', methods=['GET', 'POST'])
+@escalas.route('/verificar_disponibilidade', methods=['GET', 'POST'])
 def verificar_disponibilidade():
     """Verificar disponibilidade por data"""
     if request.method == 'POST':
@@ -318,47 +449,41 @@ def verificar_disponibilidade():
             semana = int(request.form['semana'])
             dia = request.form['dia'].lower()
             
-            # Mapear dia para coluna
-            mapa_dias = {
-                'seg': 'Seg', 'ter': 'Ter', 'qua': 'Qua', 'qui': 'Qui',
-                'sex': 'Sex', 'sab': 'Sáb', 'dom': 'Dom'
-            }
-            
-            if dia not in mapa_dias:
+            if dia not in DIAS_CONSULTA:
                 flash('Dia inválido', 'danger')
                 return render_template('disponibilidade.html')
             
-            coluna_dia = mapa_dias[dia]
-            arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
-            
-            if not os.path.exists(arquivo):
+            if sistema.obter_indice_disponibilidade(ano, mes) is None:
                 flash(f'Escala não encontrada para {mes:02d}/{ano}', 'warning')
                 return render_template('disponibilidade.html')
             
-            df_escala = pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA')
-            df_dia = df_escala[df_escala['Semana do Mês'] == semana].copy()
-            
-            disponiveis = df_dia[df_dia[coluna_dia] == 'P']
-            folga = df_dia[df_dia[coluna_dia] == 'F']
+            # Consulta no índice de disponibilidade (sem abrir a planilha)
+            consulta = sistema.consultar_disponibilidade((ano, mes, semana, DIAS_CONSULTA.index(dia)))
             
             # Agrupar por ilha
+            por_ilha = {}
+            for pessoa in consulta['disponiveis']:
+                por_ilha.setdefault(pessoa['ilha'], []).append(pessoa['nome'])
+            
             disponiveis_por_ilha = []
-            for ilha in disponiveis['Ilha'].unique():
-                funcs = disponiveis[disponiveis['Ilha'] == ilha]['Funcionário'].tolist()
+            for ilha, funcs in por_ilha.items():
                 disponiveis_por_ilha.append({
                     'ilha': ilha,
                     'quantidade': len(funcs),
                     'funcionarios': [{'nome': f.split()[0] + ' ' + f.split()[1], 'completo': f} for f in funcs[:5]]
                 })
             
-            amostra_disponiveis = disponiveis.head(10).to_dict('records')
+            amostra_disponiveis = [
+                {'Funcionário': pessoa['nome'], 'Ilha': pessoa['ilha']}
+                for pessoa in consulta['disponiveis'][:10]
+            ]
             
             return render_template('disponibilidade.html',
                                  disponiveis_por_ilha=disponiveis_por_ilha,
                                  amostra_disponiveis=amostra_disponiveis,
-                                 total=len(df_dia),
-                                 disponiveis=len(disponiveis),
-                                 folga=len(folga),
+                                 total=consulta['total'],
+                                 disponiveis=len(consulta['disponiveis']),
+                                 folga=len(consulta['folga']),
                                  ano=ano,
                                  mes=mes,
                                  semana=semana,
@@ -369,7 +494,152 @@ def verificar_disponibilidade():
     
     return render_template('disponibilidade.html')
 
-@app.route('/rodizio_folgas', methods=['GET', 'POST'])
+@escalas.route('/api/disponibilidade')
+def api_disponibilidade():
+    """
+    Disponibilidade em JSON (dia, intervalo ou vários meses)
+    
+    Parâmetros: ano, mes, semana, dia (seg..dom) e, opcionalmente, ano_fim,
+    mes_fim, semana_fim, dia_fim, ilha e modo ('todos' ou 'algum'). O
+    intervalo vai até MESES_CONSULTA_MAX meses.
+    """
+    try:
+        args = request.args
+        inicio = (int(args['ano']), int(args['mes']), int(args['semana']),
+                  DIAS_CONSULTA.index(args['dia'].lower()))
+        fim = (int(args.get('ano_fim', inicio[0])), int(args.get('mes_fim', inicio[1])),
+               int(args.get('semana_fim', inicio[2])),
+               DIAS_CONSULTA.index(args.get('dia_fim', args['dia']).lower()))
+        modo = args.get('modo', 'todos')
+        
+        if modo not in ('todos', 'algum') or fim < inicio:
+            raise ValueError('intervalo ou modo inválido')
+        if not all(1 <= mes <= 12 for mes in (inicio[1], fim[1])):
+            raise ValueError('mês fora de 1..12')
+        if not all(1 <= semana <= 6 for semana in (inicio[2], fim[2])):
+            raise ValueError('semana fora de 1..6')
+        
+        meses = (fim[0] - inicio[0]) * 12 + fim[1] - inicio[1] + 1
+        if meses > MESES_CONSULTA_MAX:
+            raise ValueError(f'intervalo de {meses} meses (máximo {MESES_CONSULTA_MAX})')
+        
+    except (KeyError, ValueError) as e:
+        return jsonify({'erro': f'Parâmetros inválidos: {e}'}), 400
+    
+    consulta = sistema.consultar_disponibilidade(inicio, fim, args.get('ilha'), modo)
+    
+    por_ilha = {}
+    for pessoa in consulta['disponiveis']:
+        por_ilha[pessoa['ilha']] = por_ilha.get(pessoa['ilha'], 0) + 1
+    
+    return jsonify({
+        'inicio': inicio,
+        'fim': fim,
+        'modo': modo,
+        'ilha': args.get('ilha'),
+        'dias_consultados': consulta['dias_consultados'],
+        'total': consulta['total'],
+        'quantidade_disponiveis': len(consulta['disponiveis']),
+        'quantidade_folga': len(consulta['folga']),
+        'por_ilha': por_ilha,
+        'disponiveis': consulta['disponiveis'],
+        'folga': consulta['folga']
+    })
+
+@escalas.route('/api/funcionario/<nome>')
+def api_funcionario(nome):
+    """Histórico de um funcionário em JSON (parâmetro opcional: desde=AAAA-MM)"""
+    historico = sistema.historico_funcionario(nome, request.args.get('desde'))
+    
+    if historico is None:
+        return jsonify({'erro': f'Funcionário não encontrado: {nome}'}), 404
+    
+    return jsonify(historico)
+
+@escalas.route('/api/escala/<int:ano>/<int:mes>')
+def api_escala(ano, mes):
+    """
+    Escala de um mês em JSON, paginada por cursor
+    
+    Parâmetros opcionais: cursor (proximo_cursor da página anterior), limite
+    (até LIMITE_PAGINA_MAX), colunas (separadas por vírgula), ilha, semana e
+    funcionario (trecho do nome).
+    """
+    versao = sistema.versao_http(ano, mes)
+    
+    if versao is None:
+        return jsonify({'erro': f'Escala não encontrada para {mes:02d}/{ano}'}), 404
+    
+    if cliente_atualizado(versao['etag'], versao['mtime_conteudo']):
+        return marcar_versao(make_response('', 304), versao['etag'], versao['mtime_conteudo'])
+    
+    try:
+        args = request.args
+        pagina = sistema.pagina_escala(
+            ano, mes,
+            cursor=int(args.get('cursor', 0)),
+            limite=min(int(args.get('limite', 100)), LIMITE_PAGINA_MAX),
+            colunas=args['colunas'].split(',') if args.get('colunas') else None,
+            ilha=args.get('ilha') or None,
+            semana=int(args['semana']) if args.get('semana') else None,
+            funcionario=args.get('funcionario') or None
+        )
+    except ValueError as e:
+        return jsonify({'erro': f'Parâmetros inválidos: {e}'}), 400
+    
+    return marcar_versao(jsonify(pagina), versao['etag'], versao['mtime_conteudo'])
+
+@escalas.route('/api/edicao/<int:ano>/<int:mes>/<tipo>', methods=['POST'])
+def api_edicao(ano, mes, tipo):
+    """
+    Edição incremental de uma escala salva (JSON ou formulário)
+    
+    Tipos e parâmetros:
+        ausencia: funcionario, semana, dias (lista seg..dom ou 0..6)
+        troca: semana, funcionario_a, funcionario_b e, opcionalmente, dias ([d, e])
+        admissao: ilha, funcionario e, opcionalmente, a_partir_semana
+    """
+    dados = request.get_json(silent=True) or request.form.to_dict()
+    if not isinstance(dados, dict):
+        return jsonify({'erro': 'Edição inválida: o corpo deve ser um objeto JSON'}), 400
+    
+    def dias(valor):
+        """Lista de dias 0..6 a partir de abreviações ('seg'), números ou 'seg,ter'"""
+        valor = valor.split(',') if isinstance(valor, str) else valor
+        if not isinstance(valor, list):
+            raise ValueError(f"dias deve ser uma lista: {valor!r}")
+        
+        resultado = []
+        for d in valor:
+            if isinstance(d, str) and d.strip().lower() in DIAS_CONSULTA:
+                resultado.append(DIAS_CONSULTA.index(d.strip().lower()))
+            elif isinstance(d, str) and d.strip().isdigit() and int(d) < len(DIAS_CONSULTA):
+                resultado.append(int(d))
+            elif isinstance(d, int) and not isinstance(d, bool) and 0 <= d < len(DIAS_CONSULTA):
+                resultado.append(d)
+            else:
+                raise ValueError(f"dia inválido: {d!r} (use {', '.join(DIAS_CONSULTA)} ou 0 a 6)")
+        return resultado
+    
+    try:
+        if tipo == 'ausencia':
+            relatorio = editor.registrar_ausencia(ano, mes, dados['funcionario'], int(dados['semana']),
+                                                  dias(dados['dias']))
+        elif tipo == 'troca':
+            relatorio = editor.trocar(ano, mes, int(dados['semana']), dados['funcionario_a'],
+                                      dados['funcionario_b'], dias(dados['dias']) if dados.get('dias') else None)
+        elif tipo == 'admissao':
+            relatorio = editor.admitir_funcionario(ano, mes, dados['ilha'], dados['funcionario'],
+                                                   int(dados.get('a_partir_semana', 1)))
+        else:
+            return jsonify({'erro': f'Tipo de edição desconhecido: {tipo}'}), 404
+        
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({'erro': f'Edição inválida: {e}'}), 400
+    
+    return jsonify(relatorio)
+
+@escalas.route('/rodizio_folgas', methods=['GET', 'POST'])
 def rodizio_folgas():
     """Verificar rodízio de folgas"""
     if request.method == 'POST':
@@ -383,9 +653,9 @@ def rodizio_folgas():
                 flash(f'Escala não encontrada para {mes:02d}/{ano}', 'warning')
                 return render_template('rodizio_folgas.html')
             
-            # Carregar dados de folgas
-            df_folgas = pd.read_excel(arquivo, sheet_name='RODÍZIO_FOLGAS')
-            df_estatisticas = pd.read_excel(arquivo, sheet_name='ESTAT_FOLGAS')
+            # Carregar dados de folgas (com as edições do mês)
+            df_folgas = sistema.ler_rodizio_folgas(ano, mes)
+            df_estatisticas = sistema.estatisticas_rodizio_folgas(df_folgas)
             
             # Encontrar funcionários desbalanceados
             desbalanceados = []
@@ -417,7 +687,44 @@ def rodizio_folgas():
     
     return render_template('rodizio_folgas.html')
 
+def criar_app(aquecer: bool = True) -> Flask:
+    """
+    Cria a aplicação Flask com as rotas de escalas
+    
+    Args:
+        aquecer: Iniciar o aquecimento do histórico em segundo plano
+                 (conforme ESCALA_AQUECER_MESES)
+    
+    Returns:
+        Aplicação configurada
+    """
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('ESCALA_SECRET_KEY', 'escala_rodizio_secreto_2024')
+    app.register_blueprint(escalas)
+    
+    # Pré-carregamento opcional do histórico (ESCALA_AQUECER_MESES > 0)
+    aquecimento = Aquecimento.do_ambiente(sistema) if aquecer else Aquecimento(sistema)
+    app.extensions['aquecimento'] = aquecimento
+    aquecimento.iniciar()
+    
+    return app
+
+def __getattr__(nome: str):
+    """
+    Aplicação padrão (desenvolvimento), criada no primeiro acesso a app_escala.app
+    
+    Só importar o módulo (como faz wsgi.py) não cria a aplicação padrão nem
+    inicia a thread de aquecimento. Em produção use wsgi.py.
+    """
+    if nome == 'app':
+        global app
+        app = criar_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 if __name__ == '__main__':
+    app = criar_app()
+    
     # Criar diretórios necessários
     os.makedirs('templates', exist_ok=True)
     
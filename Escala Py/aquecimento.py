@@ -0,0 +1,107 @@
+"""
+Aquecimento do histórico na inicialização
+
+Depois de um reinício, a primeira consulta a cada mês paga a leitura do Excel
+(se a cópia codificada estiver ausente ou desatualizada) e a montagem dos
+índices. O aquecimento faz esse trabalho numa thread em segundo plano, dos
+meses mais recentes para os mais antigos, sem bloquear o servidor, e para
+quando o orçamento de meses ou de tempo acaba.
+
+Configuração por variáveis de ambiente:
+    ESCALA_AQUECER_MESES: meses mais recentes a pré-carregar (0 desativa)
+    ESCALA_AQUECER_SEGUNDOS: tempo máximo do aquecimento
+"""
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class Aquecimento:
+    """Pré-carrega manifesto, meses recentes e contadores do ano nos caches do processo"""
+
+    def __init__(self, sistema, meses: int = 0, orcamento_segundos: float = 30.0):
+        """
+        Args:
+            sistema: SistemaEscalaExcel cujos caches serão aquecidos
+            meses: Quantidade de meses mais recentes a carregar (0 desativa)
+            orcamento_segundos: Tempo máximo do aquecimento
+        """
+        self.sistema = sistema
+        self.meses = meses
+        self.orcamento_segundos = orcamento_segundos
+        self.thread: Optional[threading.Thread] = None
+        self.estado = {
+            'estado': 'desativado' if meses <= 0 else 'pendente',
+            'meses_aquecidos': [],
+            'contadores_ano': None,
+            'duracao_segundos': None,
+            'erro': None
+        }
+
+    @classmethod
+    def do_ambiente(cls, sistema) -> 'Aquecimento':
+        """Cria o aquecimento a partir de ESCALA_AQUECER_MESES / ESCALA_AQUECER_SEGUNDOS"""
+        return cls(sistema,
+                   meses=int(os.environ.get('ESCALA_AQUECER_MESES', 0)),
+                   orcamento_segundos=float(os.environ.get('ESCALA_AQUECER_SEGUNDOS', 30)))
+
+    @property
+    def pronto(self) -> bool:
+        """Caches prontos (ou aquecimento desativado)"""
+        return self.estado['estado'] in ('desativado', 'pronto', 'orcamento_esgotado', 'erro')
+
+    def iniciar(self):
+        """Dispara o aquecimento numa thread daemon (retorna imediatamente)"""
+        if self.meses <= 0 or self.thread is not None:
+            return
+
+        self.thread = threading.Thread(target=self.executar, name='aquecimento-historico', daemon=True)
+        self.thread.start()
+
+    def executar(self):
+        """Aquece os caches (executado na thread; também pode ser chamado diretamente)"""
+        inicio = time.perf_counter()
+        limite = inicio + self.orcamento_segundos
+        self.estado['estado'] = 'aquecendo'
+
+        try:
+            # Manifesto (reconstruído se não existir)
+            entradas = self.sistema.listar_historico()
+
+            for entrada in reversed(entradas[-self.meses:]):
+                if time.perf_counter() > limite:
+                    self.estado['estado'] = 'orcamento_esgotado'
+                    break
+
+                ano, mes = entrada['ano'], entrada['mes']
+                self.sistema.carregar_escala_codificada(ano, mes)
+                self.sistema.obter_indice_disponibilidade(ano, mes)
+                self.sistema.carregar_agregados_mes(ano, mes)
+                self.sistema.carregar_validacao(ano, mes)
+                self.estado['meses_aquecidos'].append(entrada['periodo'])
+
+            if self.estado['estado'] == 'aquecendo' and time.perf_counter() <= limite:
+                ano_atual = datetime.now().year
+                self.estado['contadores_ano'] = len(self.sistema.carregar_contadores_anuais(ano_atual))
+                self.estado['estado'] = 'pronto'
+            elif self.estado['estado'] == 'aquecendo':
+                self.estado['estado'] = 'orcamento_esgotado'
+
+        except Exception as e:
+            self.estado['estado'] = 'erro'
+            self.estado['erro'] = str(e)
+            print(f"⚠️  Erro no aquecimento do histórico: {e}")
+
+        self.estado['duracao_segundos'] = round(time.perf_counter() - inicio, 3)
+
+        if self.estado['estado'] != 'erro':
+            print(f"🔥 Aquecimento: {len(self.estado['meses_aquecidos'])} meses em "
+                  f"{self.estado['duracao_segundos']}s ({self.estado['estado']})")
+
+    def resumo(self) -> Dict:
+        """Estado atual para o endpoint de saúde"""
+        return dict(self.estado, pronto=self.pronto, meses_configurados=self.meses,
+                    orcamento_segundos=self.orcamento_segundos,
+                    meses_aquecidos=list(self.estado['meses_aquecidos']))
@@ -0,0 +1,486 @@
+"""
+Edição incremental de escalas já salvas
+
+Ausências, trocas e admissões são aplicadas sobre o mês salvo sem regerar a
+escala. Cada edição recalcula apenas a ilha-semana afetada, atualiza os
+contadores de forma incremental e é gravada como um delta em
+ESCALAS_HISTORICO/DELTAS/ESCALA_{ano}_{mes}.jsonl. O Excel do mês continua
+sendo a base; o diário de deltas é reaplicado por cima dele na leitura.
+
+As operações rodam com a trava exclusiva do período (ver travas.py); leitores
+do diário não travam e ignoram uma última linha ainda incompleta.
+"""
+import os
+import json
+import time
+from functools import wraps
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from esquema import DIAS_SEMANA, compactar_escala
+from indices import mascaras_semanais
+from regras import FIM_DE_SEMANA
+from travas import trava_periodo
+
+
+def caminho_diario(diretorio: str, ano: int, mes: int) -> str:
+    """Arquivo de deltas de um mês"""
+    return f"{diretorio}/DELTAS/ESCALA_{ano}_{mes:02d}.jsonl"
+
+
+def ler_edicoes(diretorio: str, ano: int, mes: int) -> List[Dict]:
+    """Edições registradas para o mês, na ordem em que foram aplicadas"""
+    caminho = caminho_diario(diretorio, ano, mes)
+
+    if not os.path.exists(caminho):
+        return []
+
+    with open(caminho, encoding='utf-8') as f:
+        # Linha sem '\n' final: edição ainda sendo gravada por outro processo
+        return [json.loads(linha) for linha in f if linha.strip() and linha.endswith('\n')]
+
+
+def aplicar_edicoes(df_escala: pd.DataFrame, edicoes: List[Dict]) -> pd.DataFrame:
+    """
+    Reaplica edições sobre a escala base do mês
+
+    Args:
+        df_escala: Escala base (compacta)
+        edicoes: Edições lidas com ler_edicoes
+
+    Returns:
+        Nova escala compacta com as linhas editadas
+    """
+    if not edicoes:
+        return df_escala
+
+    linhas = []
+    for edicao in edicoes:
+        linhas.extend(edicao['linhas'])
+
+    return definir_mascaras(df_escala, linhas)
+
+
+def definir_mascaras(df_escala: pd.DataFrame, linhas: List[Dict]) -> pd.DataFrame:
+    """
+    Define a máscara semanal de linhas (semana, funcionário), criando as que faltam
+
+    Args:
+        df_escala: Escala compacta
+        linhas: Lista de {semana, funcionario, ilha, mascara}
+
+    Returns:
+        Nova escala compacta
+    """
+    df = df_escala.astype({'Funcionário': str, 'Ilha': str})
+    chaves = {(int(s), f): i for i, (s, f) in enumerate(zip(df['Semana do Mês'], df['Funcionário']))}
+    ano, mes = int(df['Ano'].iloc[0]), int(df['Mês'].iloc[0])
+    novas = []
+
+    for linha in linhas:
+        dias = [bool(linha['mascara'] >> d & 1) for d in range(len(DIAS_SEMANA))]
+        valores = dict(zip(DIAS_SEMANA, dias), **{
+            'Dias Trabalhados': sum(dias),
+            'Folgas': len(DIAS_SEMANA) - sum(dias)
+        })
+        posicao = chaves.get((linha['semana'], linha['funcionario']))
+
+        if posicao is None:
+            novas.append(dict(valores, **{
+                'Ano': ano, 'Mês': mes, 'Semana do Mês': linha['semana'],
+                'Funcionário': linha['funcionario'], 'Ilha': linha['ilha']
+            }))
+        else:
+            for coluna, valor in valores.items():
+                df.iat[posicao, df.columns.get_loc(coluna)] = valor
+
+    if novas:
+        df = pd.concat([df, pd.DataFrame(novas)[df.columns]], ignore_index=True)
+        df = df.sort_values(['Semana do Mês'], kind='stable').reset_index(drop=True)
+
+    return compactar_escala(df)
+
+
+def dias_da_mascara(mascara: int) -> List[bool]:
+    """Lista de 7 booleanos (trabalha) a partir da máscara"""
+    return [bool(mascara >> d & 1) for d in range(len(DIAS_SEMANA))]
+
+
+def _escritor_do_periodo(operacao):
+    """
+    Executa a operação (ano, mes, ...) com a trava exclusiva do período
+
+    Sem trava do mês anterior e sem a RLock de trava_geracao: a edição parte
+    só do próprio mês e não altera o estado em memória do sistema (ver travas.py).
+    """
+    @wraps(operacao)
+    def travada(self, ano: int, mes: int, *args, **kwargs):
+        with trava_periodo(self.diretorio, ano, mes):
+            return operacao(self, ano, mes, *args, **kwargs)
+    return travada
+
+
+class EditorEscala:
+    """Aplica edições pontuais em escalas salvas do SistemaEscalaExcel"""
+
+    def __init__(self, sistema):
+        self.sistema = sistema
+        self.diretorio = sistema.diretorio_escalas
+        os.makedirs(f"{self.diretorio}/DELTAS", exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Operações
+    # ------------------------------------------------------------------
+
+    @_escritor_do_periodo
+    def registrar_ausencia(self, ano: int, mes: int, funcionario: str,
+                           semana: int, dias: List[int]) -> Dict:
+        """
+        Registra ausência (atestado, licença) em dias de uma semana
+
+        Os dias ficam como folga. Se a pessoa cobria sábado ou domingo, outra
+        pessoa da mesma ilha assume o dia, trocando uma folga de fim de semana
+        por uma folga em dia útil dentro das regras.
+
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            funcionario: Nome do funcionário ausente
+            semana: Semana do mês
+            dias: Dias ausentes (0=Seg ... 6=Dom)
+
+        Returns:
+            Relatório da edição (linhas alteradas, contadores e revalidação)
+        """
+        df, mascaras = self._carregar(ano, mes)
+        linha = self._linha(df, semana, funcionario)
+        ilha = str(df.at[linha, 'Ilha'])
+        antes = int(mascaras[linha])
+
+        novas = {funcionario: antes & ~sum(1 << d for d in dias)}
+        ausencias = {funcionario: sorted(dias)}
+
+        # Cobertura de fim de semana: alguém da ilha assume o dia
+        for dia in (5, 6):
+            if dia in dias and antes >> dia & 1:
+                substituto, mascara = self._escolher_substituto(df, mascaras, semana, ilha, dia,
+                                                                excluir={funcionario})
+                novas[substituto] = mascara
+
+        return self._registrar(ano, mes, 'ausencia', df, mascaras, semana, novas, ausencias)
+
+    @_escritor_do_periodo
+    def trocar(self, ano: int, mes: int, semana: int, funcionario_a: str,
+               funcionario_b: str, dias: Optional[List[int]] = None) -> Dict:
+        """
+        Troca entre dois funcionários da mesma ilha em uma semana
+
+        Sem `dias`, troca a semana inteira. Com `dias=[d, e]`, A passa o dia d
+        (que trabalha) para B e recebe dele o dia e.
+
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            semana: Semana do mês
+            funcionario_a: Primeiro funcionário
+            funcionario_b: Segundo funcionário
+            dias: Par [d, e] de dias trocados (opcional)
+
+        Returns:
+            Relatório da edição
+        """
+        df, mascaras = self._carregar(ano, mes)
+        linha_a = self._linha(df, semana, funcionario_a)
+        linha_b = self._linha(df, semana, funcionario_b)
+
+        if df.at[linha_a, 'Ilha'] != df.at[linha_b, 'Ilha']:
+            raise ValueError("Troca permitida apenas entre funcionários da mesma ilha")
+
+        mascara_a, mascara_b = int(mascaras[linha_a]), int(mascaras[linha_b])
+
+        if dias is None:
+            novas = {funcionario_a: mascara_b, funcionario_b: mascara_a}
+        else:
+            d, e = dias
+            if not (mascara_a >> d & 1 and not mascara_b >> d & 1
+                    and mascara_b >> e & 1 and not mascara_a >> e & 1):
+                raise ValueError("A troca exige que A trabalhe no dia d e B no dia e (e folgue no outro)")
+            troca = (1 << d) | (1 << e)
+            novas = {funcionario_a: mascara_a ^ troca, funcionario_b: mascara_b ^ troca}
+
+            for nome, mascara in novas.items():
+                if not self.sistema.regras.padrao_valido(mascara, str(df.at[linha_a, 'Ilha'])):
+                    raise ValueError(f"A troca deixaria {nome} fora das regras da semana")
+
+        return self._registrar(ano, mes, 'troca', df, mascaras, semana, novas)
+
+    @_escritor_do_periodo
+    def admitir_funcionario(self, ano: int, mes: int, ilha: str, funcionario: str,
+                            a_partir_semana: int = 1) -> Dict:
+        """
+        Inclui um funcionário novo em uma ilha a partir de uma semana
+
+        O novo funcionário entra de segunda a sexta (sem fim de semana) até a
+        próxima geração; a geração do mês seguinte o inclui no rodízio a
+        partir do diário do mês (depois de consolidado o mês, ele precisa
+        estar no cadastro). Todas as semanas vão para o diário de uma vez.
+
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            ilha: Ilha do novo funcionário
+            funcionario: Nome do novo funcionário
+            a_partir_semana: Primeira semana na escala
+
+        Returns:
+            Relatório da edição
+        """
+        df, mascaras = self._carregar(ano, mes)
+
+        if ilha not in set(df['Ilha'].astype(str)):
+            raise ValueError(f"Ilha desconhecida: {ilha}")
+        if funcionario in set(df['Funcionário'].astype(str)):
+            raise ValueError(f"{funcionario} já está na escala")
+
+        inicio = time.perf_counter()
+        semana_dias_uteis = sum(1 << d for d in range(5))
+        edicoes = []
+        for semana in range(a_partir_semana, int(df['Semana do Mês'].max()) + 1):
+            edicao, df = self._preparar('admissao', df, mascaras, semana,
+                                        {funcionario: semana_dias_uteis}, ilha=ilha)
+            mascaras = mascaras_semanais(df)
+            edicoes.append(edicao)
+
+        if not edicoes:
+            raise ValueError(f"Semana {a_partir_semana} fora da escala")
+
+        return self._gravar(ano, mes, edicoes, df, inicio)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _carregar(self, ano: int, mes: int):
+        df = self.sistema.carregar_escala(ano, mes)
+        if df is None:
+            raise ValueError(f"Escala não encontrada para {mes:02d}/{ano}")
+        return df, mascaras_semanais(df)
+
+    def _linha(self, df: pd.DataFrame, semana: int, funcionario: str) -> int:
+        encontrado = np.flatnonzero((df['Semana do Mês'].to_numpy() == semana)
+                                    & (df['Funcionário'].astype(str).to_numpy() == funcionario))
+        if not len(encontrado):
+            raise ValueError(f"{funcionario} não está escalado na semana {semana}")
+        return int(encontrado[0])
+
+    def _escolher_substituto(self, df: pd.DataFrame, mascaras: np.ndarray, semana: int,
+                             ilha: str, dia: int, excluir: set):
+        """
+        Escolhe quem cobre um dia de fim de semana na ilha-semana
+
+        Candidatos folgam no dia; o novo padrão precisa ser válido, manter o
+        outro dia do fim de semana como estava (quem cobre o domingo não é
+        puxado para o sábado) e é o mais próximo do atual. Empate: menos fins
+        de semana no rodízio e folga no dia útil com menos folgas históricas,
+        ambos lidos do que está salvo (Excel mais diário), não da memória.
+        """
+        ano, mes = int(df['Ano'].iloc[0]), int(df['Mês'].iloc[0])
+        coluna = 'Sábados Trabalhados' if dia == 5 else 'Domingos Trabalhados'
+        fins_de_semana = dict(self.sistema.ler_contadores_fim_semana(ano, mes)[['Funcionário', coluna]].itertuples(index=False))
+        colunas_folgas = [f'Folgas {nome}' for nome in ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']]
+        folgas = {row[0]: row[1:] for row in
+                  self.sistema.ler_rodizio_folgas(ano, mes)[['Funcionário'] + colunas_folgas].itertuples(index=False)}
+
+        melhor = None
+        linhas = np.flatnonzero((df['Semana do Mês'].to_numpy() == semana)
+                                & (df['Ilha'].astype(str).to_numpy() == ilha))
+
+        for linha in linhas:
+            nome = str(df.at[linha, 'Funcionário'])
+            atual = int(mascaras[linha])
+
+            if nome in excluir or atual >> dia & 1:
+                continue
+
+            fim_de_semana = (atual & FIM_DE_SEMANA) | (1 << dia)
+
+            for padrao in self.sistema.regras.padroes_validos(ilha):
+                if padrao & FIM_DE_SEMANA != fim_de_semana:
+                    continue
+
+                distancia = bin(padrao ^ atual).count('1')
+                nova_folga = [d for d in range(5) if atual >> d & 1 and not padrao >> d & 1]
+                custo = (
+                    distancia,
+                    fins_de_semana.get(nome, 0),
+                    sum(folgas[nome][d] for d in nova_folga) if nome in folgas else 0
+                )
+
+                if melhor is None or custo < melhor[0]:
+                    melhor = (custo, nome, padrao)
+
+        if melhor is None:
+            raise ValueError(f"Ninguém disponível em {ilha} para cobrir {DIAS_SEMANA[dia]} da semana {semana}")
+
+        return melhor[1], melhor[2]
+
+    def _registrar(self, ano: int, mes: int, tipo: str, df: pd.DataFrame, mascaras: np.ndarray,
+                   semana: int, novas: Dict[str, int], ausencias: Optional[Dict] = None,
+                   ilha: Optional[str] = None) -> Dict:
+        """Calcula deltas, grava o diário e atualiza os derivados da ilha-semana"""
+        inicio = time.perf_counter()
+        edicao, df_editado = self._preparar(tipo, df, mascaras, semana, novas, ausencias, ilha)
+        return self._gravar(ano, mes, [edicao], df_editado, inicio)
+
+    def _preparar(self, tipo: str, df: pd.DataFrame, mascaras: np.ndarray, semana: int,
+                  novas: Dict[str, int], ausencias: Optional[Dict] = None,
+                  ilha: Optional[str] = None):
+        """
+        Calcula os deltas de uma edição e a escala editada, sem gravar nada
+
+        A edição é recusada se criar um erro de cobertura de fim de semana que
+        a semana não tinha.
+
+        Returns:
+            (edição no formato do diário, escala com a edição aplicada)
+        """
+        nomes = df['Funcionário'].astype(str).to_numpy()
+        ilhas = df['Ilha'].astype(str).to_numpy()
+        da_semana = df['Semana do Mês'].to_numpy() == semana
+
+        linhas = []
+        contadores = {}
+        folgas = {}
+
+        for nome, depois in novas.items():
+            posicao = np.flatnonzero(da_semana & (nomes == nome))
+            antes = int(mascaras[posicao[0]]) if len(posicao) else 0
+            ilha_func = ilhas[posicao[0]] if len(posicao) else ilha
+
+            linhas.append({'semana': semana, 'funcionario': nome, 'ilha': ilha_func, 'mascara': int(depois)})
+
+            d_antes, d_depois = dias_da_mascara(antes), dias_da_mascara(depois)
+            contadores[nome] = [int(d_depois[5]) - int(d_antes[5]), int(d_depois[6]) - int(d_antes[6])]
+            if len(posicao):
+                # Folgas em dia útil: +1 onde passou a folgar, -1 onde passou a trabalhar
+                folgas[nome] = {d: int(d_antes[d]) - int(d_depois[d]) for d in range(5) if d_antes[d] != d_depois[d]}
+
+        df_editado = definir_mascaras(df, linhas)
+        novos_erros = set(self._erros_cobertura(df_editado, semana)) - set(self._erros_cobertura(df, semana))
+        if novos_erros:
+            raise ValueError("Edição recusada: " + "; ".join(sorted(novos_erros)))
+
+        edicao = {
+            'tipo': tipo,
+            'momento': time.time(),
+            'semana': semana,
+            'linhas': linhas,
+            'contadores': contadores,
+            'folgas': folgas,
+            'ausencias': ausencias or {}
+        }
+
+        return edicao, df_editado
+
+    def _gravar(self, ano: int, mes: int, edicoes: List[Dict], df_editado: pd.DataFrame,
+                inicio: float) -> Dict:
+        """
+        Acrescenta as edições ao diário e atualiza só as semanas e
+        funcionários tocados nos derivados do mês
+        """
+        versao_anterior = self.sistema.versao_periodo(ano, mes)
+
+        with open(caminho_diario(self.diretorio, ano, mes), 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(edicao, ensure_ascii=False) + '\n' for edicao in edicoes))
+
+        linhas = [linha for edicao in edicoes for linha in edicao['linhas']]
+        semanas = sorted({edicao['semana'] for edicao in edicoes})
+        tocados = list(dict.fromkeys(linha['funcionario'] for linha in linhas))
+        self.sistema.atualizar_derivados_edicao(ano, mes, df_editado, semanas=semanas,
+                                                funcionarios=tocados, versao_anterior=versao_anterior)
+
+        contadores = {}
+        erros = []
+        ausencias = self._ausencias_do_mes(ano, mes)
+        for edicao in edicoes:
+            for nome, (delta_sab, delta_dom) in edicao['contadores'].items():
+                total = contadores.setdefault(nome, [0, 0])
+                total[0] += delta_sab
+                total[1] += delta_dom
+            validacao = self.revalidar(df_editado, edicao['semana'],
+                                       [linha['funcionario'] for linha in edicao['linhas']], ausencias)
+            erros.extend(erro for erro in validacao['erros'] if erro not in erros)
+
+        return {
+            'tipo': edicoes[0]['tipo'],
+            'ano': ano,
+            'mes': mes,
+            'semana': edicoes[0]['semana'],
+            'linhas': linhas,
+            'contadores': contadores,
+            'validacao': {'ok': not erros, 'erros': erros},
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 1)
+        }
+
+    def _ausencias_do_mes(self, ano: int, mes: int) -> Dict:
+        ausencias = {}
+        for edicao in ler_edicoes(self.diretorio, ano, mes):
+            for nome, dias in edicao['ausencias'].items():
+                ausencias.setdefault((edicao['semana'], nome), set()).update(dias)
+        return ausencias
+
+    def revalidar(self, df: pd.DataFrame, semana: int, funcionarios: List[str],
+                  ausencias: Optional[Dict] = None) -> Dict:
+        """
+        Revalida apenas as linhas tocadas e a cobertura da semana editada
+
+        Dias de ausência registrada não contam contra a regra dos 5 dias.
+        """
+        ausencias = ausencias or {}
+        erros = []
+        da_semana = df[df['Semana do Mês'] == semana]
+        tocadas = da_semana[da_semana['Funcionário'].astype(str).isin(funcionarios)]
+
+        for _, row in tocadas.iterrows():
+            nome = str(row['Funcionário'])
+            regras = self.sistema.regras.da_ilha(str(row['Ilha']))
+            dias = [bool(row[dia]) for dia in DIAS_SEMANA]
+            justificadas = len(ausencias.get((semana, nome), ()))
+
+            if sum(dias) + justificadas != regras['dias_trabalhados']:
+                erros.append(f"{nome} tem {sum(dias)} dias trabalhados")
+            if dias[5] and dias[6] and not regras['sabado_e_domingo']:
+                erros.append(f"{nome} trabalha sábado e domingo")
+            for i in range(4):
+                if not dias[i] and not dias[i + 1] and not justificadas and not regras['folgas_seguidas_uteis']:
+                    erros.append(f"{nome} tem folgas seguidas: {self.sistema.dias_completos[i]} e "
+                                 f"{self.sistema.dias_completos[i + 1]}")
+                    break
+
+        erros.extend(self._erros_cobertura(df, semana))
+
+        return {'ok': not erros, 'erros': erros}
+
+    def _erros_cobertura(self, df: pd.DataFrame, semana: int) -> List[str]:
+        """Erros de cobertura de fim de semana (site e ilhas) na semana"""
+        regras = self.sistema.regras
+        da_semana = df[df['Semana do Mês'] == semana]
+        ilhas = da_semana['Ilha'].astype(str)
+        erros = []
+
+        for dia, nome_dia in (('Sáb', 'sábado'), ('Dom', 'domingo')):
+            meta = regras.cobertura.get(dia)
+            pessoas = int(da_semana[dia].sum())
+            if meta is not None and pessoas != meta:
+                erros.append(f"Semana {semana}: {pessoas} pessoas no {nome_dia} (deveria ser {meta})")
+
+            for ilha, cobertura in regras.cobertura_ilhas.items():
+                meta = cobertura.get(dia)
+                pessoas = int(da_semana.loc[ilhas == ilha, dia].sum())
+                if meta is not None and pessoas != meta:
+                    erros.append(f"Semana {semana}: {pessoas} pessoas no {nome_dia} em {ilha} "
+                                 f"(deveria ser {meta})")
+
+        return erros
@@ -0,0 +1,377 @@
+"""
+Linha de comando para operações em lote (sem servidor HTTP)
+
+    python -m escala_cli gerar 2026 5 --ate 2026-08 --motor portfolio --jobs 4
+    python -m escala_cli validar --desde 2026-01 --estrito
+    python -m escala_cli relatorio 2025 2026 --comparativo
+    python -m escala_cli exportar escala csv --desde 2026-01 -o escalas.csv
+    python -m escala_cli backfill --jobs 4
+    python -m escala_cli consolidar --desde 2026-01
+    python -m escala_cli benchmark
+    python -m escala_cli manifesto
+
+Só a biblioteca padrão é importada no topo. pandas, numpy e o motor de escalas
+são importados dentro de cada comando, então `--help` e `manifesto` respondem
+em milissegundos.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+def _periodo(texto: str) -> Tuple[int, int]:
+    """AAAA-MM -> (ano, mês)"""
+    try:
+        ano, mes = (int(parte) for parte in texto.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"período inválido: {texto} (use AAAA-MM)")
+    if not 1 <= mes <= 12:
+        raise argparse.ArgumentTypeError(f"mês inválido: {texto}")
+    return ano, mes
+
+
+def _meses_entre(inicio: Tuple[int, int], fim: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Meses de inicio a fim, inclusive"""
+    meses = []
+    ano, mes = inicio
+    while (ano, mes) <= fim:
+        meses.append((ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+def _periodos_do_historico(sistema, desde: Optional[Tuple[int, int]], ate: Optional[Tuple[int, int]]):
+    """Meses do manifesto dentro do intervalo"""
+    return [
+        (e['ano'], e['mes']) for e in sistema.listar_historico()
+        if (desde is None or (e['ano'], e['mes']) >= desde) and (ate is None or (e['ano'], e['mes']) <= ate)
+    ]
+
+
+def _criar_sistema(silencioso: bool = False):
+    """Importa e instancia o motor (import pesado adiado até aqui)"""
+    with contextlib.redirect_stdout(io.StringIO()) if silencioso else contextlib.nullcontext():
+        from sistema_escala import SistemaEscalaExcel
+        return SistemaEscalaExcel()
+
+
+def _validar_periodo(ano: int, mes: int) -> dict:
+    """Validação de um mês (executada também em processo filho)"""
+    sistema = _criar_sistema(silencioso=True)
+    validacao = sistema.carregar_validacao(ano, mes)
+    return {
+        'periodo': f"{ano}-{mes:02d}",
+        **validacao['resumo'],
+        'balanceamento_perfeito': validacao['rodizio']['balanceamento_perfeito'],
+        'erros_detectados': validacao['regras']['erros'][:5]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Comandos
+# ---------------------------------------------------------------------------
+
+def comando_manifesto(args) -> int:
+    from historico import DIRETORIO_PADRAO, listar_entradas
+
+    entradas = listar_entradas(args.diretorio or DIRETORIO_PADRAO)
+
+    if args.json:
+        print(json.dumps(entradas, ensure_ascii=False, indent=2))
+        return 0
+
+    for e in entradas:
+        validacao = e.get('validacao') or {}
+        print(f"{e['periodo']}  {e['linhas']:>6} linhas  {e['funcionarios']:>5} func.  "
+              f"{e['tamanho'] / 1024:>8.1f} KB  regras {validacao.get('regras_ok', '-')}/"
+              f"{validacao.get('total_regras', '-')}  {e['checksum'][:12]}")
+    print(f"{len(entradas)} escalas")
+    return 0
+
+
+def comando_gerar(args) -> int:
+    from travas import trava_geracao
+
+    sistema = _criar_sistema()
+    fim = args.ate or (args.ano, args.mes)
+
+    for ano, mes in _meses_entre((args.ano, args.mes), fim):
+        # Meses em sequência: cada um parte do rodízio deixado pelo anterior.
+        # A trava cobre geração e gravação: o servidor não grava o mês no meio
+        with trava_geracao(sistema.diretorio_escalas, ano, mes):
+            if args.motor == 'portfolio':
+                df_escala = sistema.gerar_escala_portfolio(ano, mes, args.semanas, args.candidatos,
+                                                           max_processos=args.jobs)
+                if args.otimizar:
+                    df_escala = sistema.otimizar_folgas(df_escala, args.tempo_otimizacao)
+            else:
+                df_escala = sistema.gerar_escala_mensal(ano, mes, args.semanas, motor=args.motor,
+                                                        tempo_limite=args.tempo_limite, otimizar=args.otimizar,
+                                                        tempo_otimizacao=args.tempo_otimizacao)
+
+            if not args.sem_salvar:
+                sistema.salvar_escala_excel(df_escala, ano, mes)
+
+    return 0
+
+
+def comando_validar(args) -> int:
+    sistema = _criar_sistema(silencioso=True)
+    periodos = _periodos_do_historico(sistema, args.desde, args.ate)
+
+    # Cópias codificadas em dia antes de paralelizar (os filhos só leem)
+    sistema.atualizar_periodos(periodos, max_processos=args.jobs)
+
+    processos = min(args.jobs or os.cpu_count() or 1, len(periodos))
+    if processos > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_validar_periodo, *zip(*periodos)))
+    else:
+        resultados = [_validar_periodo(ano, mes) for ano, mes in periodos]
+
+    falhas = 0
+    for r in resultados:
+        ok = r['erros'] == 0 and r['balanceamento_perfeito']
+        falhas += not ok
+        if args.json:
+            continue
+        print(f"{r['periodo']}  {'✅' if ok else '❌'}  regras {r['regras_ok']}/{r['total_regras']}  "
+              f"erros {r['erros']}  rodízio {'OK' if r['balanceamento_perfeito'] else 'desbalanceado'}")
+        for erro in r['erros_detectados'] if not ok else []:
+            print(f"      • {erro}")
+
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+
+    return 1 if args.estrito and falhas else 0
+
+
+def comando_relatorio(args) -> int:
+    sistema = _criar_sistema()
+
+    if args.comparativo:
+        return 0 if sistema.gerar_relatorio_comparativo(args.anos) else 1
+
+    arquivos = [sistema.gerar_relatorio_anual(ano) for ano in args.anos]
+    return 0 if all(arquivos) else 1
+
+
+def comando_exportar(args) -> int:
+    import exportacao
+
+    sistema = _criar_sistema(silencioso=True)
+    periodos = _periodos_do_historico(sistema, args.desde, args.ate)
+
+    with (open(args.saida, 'w', encoding='utf-8', newline='') if args.saida
+          else contextlib.nullcontext(sys.stdout)) as destino:
+        for bloco in exportacao.exportar(sistema, args.tipo, args.formato, periodos):
+            destino.write(bloco)
+
+    return 0
+
+
+def comando_backfill(args) -> int:
+    sistema = _criar_sistema()
+
+    if args.reindexar:
+        sistema.reindexar_historico()
+
+    periodos = _periodos_do_historico(sistema, args.desde, args.ate)
+    inicio = time.perf_counter()
+
+    atualizados = sistema.atualizar_periodos(periodos, max_processos=args.jobs, forcar=args.forcar)
+    print(f"✅ Derivados regerados: {len(atualizados)} de {len(periodos)} meses")
+
+    # Agregados e validações que ainda faltarem nos meses já em dia
+    sistema.carregar_agregados_periodos(periodos)
+    for ano, mes in periodos:
+        sistema.carregar_validacao(ano, mes)
+
+    for ano in sorted({ano for ano, _ in periodos}):
+        if args.forcar:
+            sistema.reconstruir_contadores_anuais(ano)
+        else:
+            sistema.carregar_contadores_anuais(ano)
+
+    if args.forcar:
+        sistema.reconstruir_linha_do_tempo()
+
+    print(f"⏱️  Backfill concluído em {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+def comando_consolidar(args) -> int:
+    from edicao import caminho_diario
+
+    sistema = _criar_sistema(silencioso=True)
+    periodos = [
+        (ano, mes) for ano, mes in _periodos_do_historico(sistema, args.desde, args.ate)
+        if os.path.exists(caminho_diario(sistema.diretorio_escalas, ano, mes))
+    ]
+
+    for ano, mes in periodos:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.consolidar_edicoes(ano, mes)
+        print(f"✅ {ano}-{mes:02d}: edições consolidadas no Excel")
+
+    print(f"{len(periodos)} meses com edições pendentes")
+    return 0
+
+
+def comando_benchmark(args) -> int:
+    inicio_import = time.perf_counter()
+    sistema = _criar_sistema(silencioso=True)
+    tempo_import = time.perf_counter() - inicio_import
+
+    periodos = _periodos_do_historico(sistema, None, None)
+    if not periodos:
+        print("📭 Nenhuma escala no histórico para medir")
+        return 1
+
+    ano, mes = periodos[-1]
+    proximo = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    df_escala = sistema.carregar_escala(ano, mes)
+
+    def leitura_fria():
+        sistema.escalas_em_memoria.clear()
+        sistema.carregar_escala_codificada(ano, mes)
+
+    def validacao():
+        df_escala.attrs.pop('validacao', None)
+        sistema.validar_escala(df_escala)
+
+    def geracao():
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema.gerar_escala_mensal(*proximo, args.semanas)
+
+    operacoes = [
+        ('manifesto', sistema.listar_historico),
+        ('escala codificada (fria)', leitura_fria),
+        ('escala codificada (memória)', lambda: sistema.carregar_escala_codificada(ano, mes)),
+        ('página de 100 linhas', lambda: sistema.pagina_escala(ano, mes, limite=100)),
+        ('validação do mês', validacao),
+        ('índice de disponibilidade', lambda: sistema.obter_indice_disponibilidade(ano, mes)),
+        ('agregados do ano', lambda: sistema.carregar_agregados_periodos([(ano, m) for m in range(1, 13)])),
+        (f'geração gulosa {proximo[1]:02d}/{proximo[0]}', geracao),
+    ]
+
+    resultados = {'import_motor_ms': round(tempo_import * 1000, 1)}
+    for nome, operacao in operacoes:
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            operacao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultados[nome] = round(statistics.median(tempos), 2)
+
+    # Memória do mês em cada representação: 'P'/'F' (como no Excel), compacta e codificada
+    from esquema import expandir_escala, memoria_escala
+    memoria = {
+        'escala P/F': memoria_escala(expandir_escala(df_escala)),
+        'escala compacta': memoria_escala(df_escala),
+        'escala codificada': sistema.carregar_escala_codificada(ano, mes).memoria()
+    }
+
+    if args.json:
+        print(json.dumps(dict(resultados, memoria_bytes=memoria), ensure_ascii=False, indent=2))
+    else:
+        print(f"Benchmark sobre {mes:02d}/{ano} (mediana de {args.repeticoes} execuções, ms)")
+        for nome, valor in resultados.items():
+            print(f"  {nome:<32} {valor:>10}")
+        print(f"Memória do mês ({len(df_escala)} linhas, KB)")
+        for nome, valor in memoria.items():
+            print(f"  {nome:<32} {valor / 1024:>10.1f}")
+
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Argumentos
+# ---------------------------------------------------------------------------
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m escala_cli',
+                                     description='Operações em lote do sistema de escalas 5x2')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='processos em paralelo (padrão: núcleos da CPU)')
+
+    # --jobs também depois do comando (escala_cli backfill -j 4); sem valor, fica o de antes dele
+    paralelo = argparse.ArgumentParser(add_help=False)
+    paralelo.add_argument('--jobs', '-j', type=int, default=argparse.SUPPRESS,
+                          help='processos em paralelo (padrão: núcleos da CPU)')
+
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p = sub.add_parser('manifesto', help='lista as escalas do histórico (rápido, sem pandas)')
+    p.add_argument('--diretorio', default=None)
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(funcao=comando_manifesto)
+
+    p = sub.add_parser('gerar', parents=[paralelo], help='gera e salva um mês ou um período')
+    p.add_argument('ano', type=int)
+    p.add_argument('mes', type=int, choices=range(1, 13), metavar='mes')
+    p.add_argument('--ate', type=_periodo, help='último mês do período (AAAA-MM)')
+    p.add_argument('--semanas', type=int, default=4)
+    p.add_argument('--motor', choices=['guloso', 'exato', 'portfolio'], default='guloso')
+    p.add_argument('--candidatos', type=int, default=8, help='candidatos do motor portfolio')
+    p.add_argument('--tempo-limite', type=float, default=30, help='segundos do motor exato')
+    p.add_argument('--otimizar', action='store_true', help='redistribui as folgas em dias úteis')
+    p.add_argument('--tempo-otimizacao', type=float, default=2.0)
+    p.add_argument('--sem-salvar', action='store_true')
+    p.set_defaults(funcao=comando_gerar)
+
+    p = sub.add_parser('validar', parents=[paralelo], help='valida as escalas salvas')
+    p.add_argument('--desde', type=_periodo)
+    p.add_argument('--ate', type=_periodo)
+    p.add_argument('--estrito', action='store_true', help='código de saída 1 se algum mês falhar')
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(funcao=comando_validar)
+
+    p = sub.add_parser('relatorio', help='relatório anual (ou comparativo entre anos)')
+    p.add_argument('anos', type=int, nargs='+')
+    p.add_argument('--comparativo', action='store_true')
+    p.set_defaults(funcao=comando_relatorio)
+
+    p = sub.add_parser('exportar', help='exporta em CSV/NDJSON (em fluxo)')
+    p.add_argument('tipo', choices=['escala', 'contadores', 'estatisticas'])
+    p.add_argument('formato', choices=['csv', 'ndjson'])
+    p.add_argument('--desde', type=_periodo)
+    p.add_argument('--ate', type=_periodo)
+    p.add_argument('--saida', '-o', help='arquivo de saída (padrão: stdout)')
+    p.set_defaults(funcao=comando_exportar)
+
+    p = sub.add_parser('backfill', parents=[paralelo], help='regera derivados (índices, agregados, validação) do histórico')
+    p.add_argument('--desde', type=_periodo)
+    p.add_argument('--ate', type=_periodo)
+    p.add_argument('--forcar', action='store_true', help='regera também os meses já em dia')
+    p.add_argument('--reindexar', action='store_true', help='reconstrói o manifesto antes')
+    p.set_defaults(funcao=comando_backfill)
+
+    p = sub.add_parser('consolidar', help='grava no Excel as edições pendentes no diário e o descarta')
+    p.add_argument('--desde', type=_periodo)
+    p.add_argument('--ate', type=_periodo)
+    p.set_defaults(funcao=comando_consolidar)
+
+    p = sub.add_parser('benchmark', help='mede as operações principais sobre o último mês')
+    p.add_argument('--repeticoes', type=int, default=5)
+    p.add_argument('--semanas', type=int, default=4)
+    p.add_argument('--json', action='store_true')
+    p.set_defaults(funcao=comando_benchmark)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    return args.funcao(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
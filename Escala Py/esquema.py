@@ -0,0 +1,112 @@
+"""
+Esquema compacto dos DataFrames de escala
+
+Internamente as escalas usam categorias para funcionário e ilha, booleanos
+para os dias (True = presente) e inteiros pequenos para os contadores. O
+formato 'P'/'F' só é usado na gravação em Excel e nos templates.
+"""
+import pandas as pd
+import numpy as np
+from typing import List
+
+DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"]
+
+COLUNAS_ESCALA = ['Ano', 'Mês', 'Semana do Mês', 'Funcionário', 'Ilha'] + DIAS_SEMANA + ['Dias Trabalhados', 'Folgas']
+
+COLUNAS_CATEGORICAS = ['Funcionário', 'Ilha']
+
+TIPOS_CONTADORES = {
+    'Ano': 'uint16',
+    'Mês': 'uint8',
+    'Semana do Mês': 'uint8',
+    'Dias Trabalhados': 'uint8',
+    'Folgas': 'uint8'
+}
+
+
+def presenca(serie: pd.Series) -> pd.Series:
+    """Série booleana de presença, aceitando o formato compacto ou 'P'/'F'"""
+    if serie.dtype == bool:
+        return serie
+    return serie == 'P'
+
+
+def compactar_escala(df_escala: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte uma escala para o esquema compacto
+
+    Args:
+        df_escala: DataFrame de escala (em 'P'/'F' ou já compacto)
+
+    Returns:
+        Novo DataFrame com categorias, booleanos e inteiros pequenos
+    """
+    df = df_escala.copy()
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('category')
+
+    for dia in DIAS_SEMANA:
+        if dia in df.columns:
+            df[dia] = presenca(df[dia]).astype(bool)
+
+    for coluna, tipo in TIPOS_CONTADORES.items():
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(tipo)
+
+    return df
+
+
+def expandir_escala(df_escala: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte uma escala compacta de volta para 'P'/'F' (Excel e templates)
+
+    Args:
+        df_escala: DataFrame de escala compacto
+
+    Returns:
+        Novo DataFrame com textos e inteiros comuns
+    """
+    df = df_escala.copy()
+
+    for coluna in COLUNAS_CATEGORICAS:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype(str)
+
+    for dia in DIAS_SEMANA:
+        if dia in df.columns and df[dia].dtype == bool:
+            df[dia] = np.where(df[dia], 'P', 'F')
+
+    for coluna in TIPOS_CONTADORES:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('int64')
+
+    return df
+
+
+def concatenar_escalas(escalas: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatena escalas mantendo o esquema compacto (categorias unificadas)"""
+    df = pd.concat(
+        [e.astype({c: str for c in COLUNAS_CATEGORICAS if c in e.columns}) for e in escalas],
+        ignore_index=True
+    )
+    return compactar_escala(df)
+
+
+def compactar_contadores(df_contadores: pd.DataFrame) -> pd.DataFrame:
+    """Reduz as colunas inteiras de uma aba de contadores ao menor tipo possível"""
+    df = df_contadores.copy()
+
+    if 'Funcionário' in df.columns:
+        df['Funcionário'] = df['Funcionário'].astype('category')
+
+    for coluna in df.select_dtypes('integer').columns:
+        df[coluna] = pd.to_numeric(df[coluna], downcast='integer')
+
+    return df
+
+
+def memoria_escala(df_escala: pd.DataFrame) -> int:
+    """Memória ocupada pelo DataFrame em bytes (incluindo textos)"""
+    return int(df_escala.memory_usage(deep=True).sum())
@@ -0,0 +1,271 @@
+"""
+Exportação em fluxo (CSV e NDJSON)
+
+Os registros saem de geradores que percorrem o histórico um mês (ou um ano)
+por vez, a partir da cópia codificada e dos agregados em cache, e são
+serializados em blocos de texto. Nenhuma etapa monta o conjunto completo em
+memória ou em disco, então a exportação de vários anos custa o mesmo que a de
+um mês em memória.
+"""
+import io
+import csv
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from esquema import COLUNAS_ESCALA, expandir_escala
+
+# Registros decodificados/serializados por vez
+BLOCO_LINHAS = 1000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8'
+}
+
+COLUNAS_EXPORTACAO = {
+    'escala': COLUNAS_ESCALA,
+    'contadores': ['Ano', 'Mês', 'Funcionário', 'Sábados Trabalhados',
+                   'Domingos Trabalhados', 'Total Fim de Semana'],
+    'estatisticas': ['Ano', 'Funcionário', 'Ilha', 'Dias Trabalhados', 'Sáb', 'Dom',
+                     'Total Fim de Semana', 'Meses']
+}
+
+# Maior recorte aceito na planilha filtrada (linhas de escala)
+LIMITE_LINHAS_XLSX = 50000
+
+# AAAA-MM com mês de 01 a 12
+PADRAO_PERIODO = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+def periodos_entre(entradas: List[Dict], desde: Optional[str] = None,
+                   ate: Optional[str] = None) -> List[Tuple[int, int]]:
+    """
+    Períodos do manifesto dentro do intervalo (inclusive)
+
+    Args:
+        entradas: Entradas do manifesto (listar_historico)
+        desde: Primeiro período (AAAA-MM), opcional
+        ate: Último período (AAAA-MM), opcional
+
+    Returns:
+        Lista de (ano, mês) em ordem
+    """
+    for periodo in (desde, ate):
+        if periodo is not None and not PADRAO_PERIODO.match(periodo):
+            raise ValueError(f"Período inválido: {periodo} (use AAAA-MM)")
+
+    return [
+        (e['ano'], e['mes']) for e in entradas
+        if (desde is None or e['periodo'] >= desde) and (ate is None or e['periodo'] <= ate)
+    ]
+
+
+def registros_escala(sistema, periodos: List[Tuple[int, int]]) -> Iterator[Dict]:
+    """Linhas das escalas ('P'/'F'), decodificadas em blocos de BLOCO_LINHAS"""
+    for ano, mes in periodos:
+        escala = sistema.carregar_escala_codificada(ano, mes)
+        if escala is None:
+            continue
+
+        for inicio in range(0, len(escala), BLOCO_LINHAS):
+            linhas = np.arange(inicio, min(inicio + BLOCO_LINHAS, len(escala)))
+            yield from expandir_escala(escala.dataframe(linhas)).to_dict('records')
+
+
+def registros_contadores(sistema, periodos: List[Tuple[int, int]]) -> Iterator[Dict]:
+    """Sábados e domingos trabalhados por funcionário em cada mês (edições incluídas)"""
+    for ano, mes in periodos:
+        escala = sistema.carregar_escala_codificada(ano, mes)
+        if escala is None:
+            continue
+
+        for funcionario, cont in escala.contadores_fim_semana().items():
+            yield {
+                'Ano': ano,
+                'Mês': mes,
+                'Funcionário': funcionario,
+                'Sábados Trabalhados': cont['sabados'],
+                'Domingos Trabalhados': cont['domingos'],
+                'Total Fim de Semana': cont['total']
+            }
+
+
+def registros_estatisticas(sistema, periodos: List[Tuple[int, int]]) -> Iterator[Dict]:
+    """Estatísticas anuais por funcionário, um ano por vez a partir dos agregados mensais"""
+    for ano in sorted({a for a, _ in periodos}):
+        agregados = sistema.carregar_agregados_periodos([p for p in periodos if p[0] == ano])
+        if not agregados:
+            continue
+
+        stats_func, _, _ = sistema.consolidar_agregados(list(agregados.values()))
+
+        for registro in stats_func.to_dict('records'):
+            yield dict(registro, Ano=ano, Meses=len(agregados))
+
+
+FONTES = {
+    'escala': registros_escala,
+    'contadores': registros_contadores,
+    'estatisticas': registros_estatisticas
+}
+
+
+def serializar_csv(registros: Iterable[Dict], colunas: List[str]) -> Iterator[str]:
+    """CSV com cabeçalho, emitido em blocos de BLOCO_LINHAS linhas"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=colunas, extrasaction='ignore')
+    escritor.writeheader()
+
+    for quantidade, registro in enumerate(registros, 1):
+        escritor.writerow(registro)
+
+        if quantidade % BLOCO_LINHAS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def serializar_ndjson(registros: Iterable[Dict], colunas: List[str]) -> Iterator[str]:
+    """Um objeto JSON por linha (na ordem de `colunas`), em blocos de BLOCO_LINHAS linhas"""
+    bloco = []
+
+    for registro in registros:
+        bloco.append(json.dumps({c: registro.get(c) for c in colunas}, ensure_ascii=False))
+
+        if len(bloco) == BLOCO_LINHAS:
+            yield '\n'.join(bloco) + '\n'
+            bloco = []
+
+    if bloco:
+        yield '\n'.join(bloco) + '\n'
+
+
+SERIALIZADORES = {'csv': serializar_csv, 'ndjson': serializar_ndjson}
+
+
+def planilha_filtrada(escala, linhas: np.ndarray, nome_aba: str) -> io.BytesIO:
+    """
+    Monta em memória um xlsx com as linhas selecionadas de uma escala
+
+    Usa o modo write_only do openpyxl (linhas gravadas em fluxo, sem manter
+    células em memória) e decodifica a escala em blocos de BLOCO_LINHAS.
+
+    Args:
+        escala: EscalaCodificada do mês
+        linhas: Posições das linhas (saída de EscalaCodificada.filtrar)
+        nome_aba: Nome da aba
+
+    Returns:
+        Buffer posicionado no início, pronto para send_file
+    """
+    if len(linhas) > LIMITE_LINHAS_XLSX:
+        raise OverflowError(f"Recorte com {len(linhas)} linhas excede o limite de {LIMITE_LINHAS_XLSX}")
+
+    livro = Workbook(write_only=True)
+    _gravar_escala(livro.create_sheet(nome_aba), escala, linhas)
+
+    buffer = io.BytesIO()
+    livro.save(buffer)
+    buffer.seek(0)
+
+    return buffer
+
+
+def planilha_editada(escala, abas: Dict[str, pd.DataFrame]) -> io.BytesIO:
+    """
+    Monta em memória o xlsx de um mês com as edições do diário aplicadas
+
+    O Excel salvo e o diário ficam como estão: a aba ESCALA_COMPLETA sai da
+    cópia codificada (que já inclui as edições), seguida das abas recebidas.
+
+    Args:
+        escala: EscalaCodificada do mês
+        abas: Abas adicionais {nome: DataFrame}, na ordem de gravação
+
+    Returns:
+        Buffer posicionado no início, pronto para send_file
+    """
+    livro = Workbook(write_only=True)
+    _gravar_escala(livro.create_sheet('ESCALA_COMPLETA'), escala, np.arange(len(escala)))
+    _gravar_abas(livro, abas)
+
+    buffer = io.BytesIO()
+    livro.save(buffer)
+    buffer.seek(0)
+
+    return buffer
+
+
+def gravar_relatorio_anual(destino: str, escalas: Iterable, abas: Dict[str, pd.DataFrame]):
+    """
+    Grava o xlsx do relatório anual, com a aba DADOS_ANUAIS em fluxo
+
+    As escalas do ano são consumidas uma por vez (cada mês é decodificado em
+    blocos e descartado antes do próximo), então o custo em memória da aba
+    DADOS_ANUAIS é o de um bloco, não o do ano inteiro.
+
+    Args:
+        destino: Caminho do arquivo a gravar
+        escalas: Iterável de EscalaCodificada, na ordem dos meses
+        abas: Abas seguintes {nome: DataFrame}, na ordem de gravação
+    """
+    livro = Workbook(write_only=True)
+    aba = livro.create_sheet('DADOS_ANUAIS')
+    aba.append(COLUNAS_ESCALA)
+
+    for escala in escalas:
+        _gravar_linhas(aba, escala, np.arange(len(escala)))
+
+    _gravar_abas(livro, abas)
+    livro.save(destino)
+
+
+def _gravar_abas(livro, abas: Dict[str, pd.DataFrame]):
+    """Grava cada DataFrame em uma aba própria (cabeçalho e linhas)"""
+    for nome_aba, df in abas.items():
+        aba = livro.create_sheet(nome_aba)
+        aba.append(list(df.columns))
+        for linha in df.itertuples(index=False):
+            aba.append(list(linha))
+
+
+def _gravar_escala(aba, escala, linhas: np.ndarray):
+    """Grava cabeçalho e linhas da escala na aba, decodificando em blocos"""
+    aba.append(COLUNAS_ESCALA)
+    _gravar_linhas(aba, escala, linhas)
+
+
+def _gravar_linhas(aba, escala, linhas: np.ndarray):
+    """Grava as linhas da escala na aba, decodificando em blocos de BLOCO_LINHAS"""
+    for inicio in range(0, len(linhas), BLOCO_LINHAS):
+        bloco = expandir_escala(escala.dataframe(linhas[inicio:inicio + BLOCO_LINHAS]))
+        for linha in bloco[COLUNAS_ESCALA].itertuples(index=False):
+            aba.append(list(linha))
+
+
+def exportar(sistema, tipo: str, formato: str, periodos: List[Tuple[int, int]]) -> Iterator[str]:
+    """
+    Gerador de texto de uma exportação
+
+    Args:
+        sistema: SistemaEscalaExcel
+        tipo: 'escala', 'contadores' ou 'estatisticas'
+        formato: 'csv' ou 'ndjson'
+        periodos: Lista de (ano, mês) a exportar
+
+    Returns:
+        Iterador de blocos de texto
+    """
+    if tipo not in FONTES:
+        raise ValueError(f"Tipo de exportação desconhecido: {tipo}")
+    if formato not in SERIALIZADORES:
+        raise ValueError(f"Formato desconhecido: {formato}")
+
+    return SERIALIZADORES[formato](FONTES[tipo](sistema, periodos), COLUNAS_EXPORTACAO[tipo])
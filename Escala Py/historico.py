@@ -0,0 +1,282 @@
+"""
+Acesso ao diretório de histórico de escalas
+
+Manifesto do histórico e leitura em lote das planilhas salvas. Este módulo só
+importa a biblioteca padrão no topo; pandas é importado apenas quando uma
+planilha precisa ser lida.
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, List, Tuple, Optional, Union
+
+from travas import trava_arquivo
+
+
+def _ler_planilha(arquivo: str, sheet_name: Union[str, List[str]],
+                  transformar: Optional[Callable] = None):
+    """Lê uma ou mais abas de um arquivo Excel (executado no processo filho)"""
+    import pandas as pd
+    dados = pd.read_excel(arquivo, sheet_name=sheet_name)
+    return transformar(dados) if transformar else dados
+
+
+def carregar_planilhas(arquivos: List[str], sheet_name: Union[str, List[str]],
+                       max_processos: Optional[int] = None,
+                       transformar: Optional[Callable] = None) -> Tuple[List, List[Tuple[str, str]]]:
+    """
+    Carrega várias planilhas em paralelo, uma por processo
+
+    Args:
+        arquivos: Caminhos dos arquivos Excel
+        sheet_name: Aba (ou lista de abas) a ler em cada arquivo
+        max_processos: Limite de processos simultâneos (padrão: núcleos da CPU)
+        transformar: Função (de nível de módulo) aplicada a cada resultado
+            ainda no processo filho, p.ex. compactar_escala
+
+    Returns:
+        Tupla (dados, falhas): dados na mesma ordem de `arquivos`, com None nos
+        arquivos que falharam; falhas como lista de (arquivo, mensagem de erro)
+    """
+    dados = [None] * len(arquivos)
+    falhas = []
+
+    if not arquivos:
+        return dados, falhas
+
+    limite = max_processos or os.cpu_count() or 1
+    limite = max(1, min(limite, len(arquivos)))
+
+    if limite == 1:
+        # Um arquivo só (ou paralelismo desligado): sem custo de subir processos
+        for i, arquivo in enumerate(arquivos):
+            try:
+                dados[i] = _ler_planilha(arquivo, sheet_name, transformar)
+            except Exception as e:
+                falhas.append((arquivo, f"{type(e).__name__}: {e}"))
+        return dados, falhas
+
+    with ProcessPoolExecutor(max_workers=limite) as executor:
+        futuros = [executor.submit(_ler_planilha, arquivo, sheet_name, transformar) for arquivo in arquivos]
+
+        for i, (arquivo, futuro) in enumerate(zip(arquivos, futuros)):
+            try:
+                dados[i] = futuro.result()
+            except Exception as e:
+                falhas.append((arquivo, f"{type(e).__name__}: {e}"))
+
+    return dados, falhas
+
+
+# ---------------------------------------------------------------------------
+# Manifesto do histórico
+# ---------------------------------------------------------------------------
+
+DIRETORIO_PADRAO = 'ESCALAS_HISTORICO'
+ARQUIVO_MANIFESTO = 'MANIFESTO.json'
+PADRAO_ESCALA = re.compile(r'^ESCALA_(\d{4})_(\d{2})\.xlsx$')
+
+_trava_manifesto = threading.Lock()
+_cache_manifesto = {}
+
+
+def arquivo_temporario(caminho: str, sufixo: str = '.tmp') -> str:
+    """Nome temporário ao lado de `caminho`, único por processo e thread"""
+    return f"{caminho}.{os.getpid()}.{threading.get_ident()}{sufixo}"
+
+
+@contextmanager
+def escrita_atomica(caminho: str, sufixo: str = '.tmp'):
+    """
+    Fornece um caminho temporário e, ao final do bloco, renomeia para `caminho`
+
+    Leitores abrem `caminho` sem trava e veem a versão anterior inteira ou a
+    nova inteira. Se o bloco falhar, o temporário é removido e o arquivo
+    original fica intacto.
+    """
+    temporario = arquivo_temporario(caminho, sufixo)
+
+    try:
+        yield temporario
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def gravar_json_atomico(caminho: str, dados):
+    """Grava JSON em arquivo temporário e renomeia (leitores nunca veem meio arquivo)"""
+    with escrita_atomica(caminho) as temporario:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+
+
+def calcular_checksum(arquivo: Union[str, BinaryIO]) -> str:
+    """SHA-256 do conteúdo do arquivo (caminho ou arquivo binário já aberto, relido do início)"""
+    h = hashlib.sha256()
+
+    with (open(arquivo, 'rb') if isinstance(arquivo, str) else nullcontext(arquivo)) as f:
+        f.seek(0)
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+        f.seek(0)
+
+    return h.hexdigest()
+
+
+def criar_entrada(diretorio: str, ano: int, mes: int, linhas: int,
+                  funcionarios: int, validacao: Optional[dict] = None) -> dict:
+    """
+    Monta a entrada do manifesto para uma escala já gravada
+
+    Args:
+        diretorio: Diretório do histórico
+        ano: Ano da escala
+        mes: Mês da escala
+        linhas: Linhas da aba ESCALA_COMPLETA
+        funcionarios: Funcionários distintos na escala
+        validacao: Resumo da verificação de regras
+
+    Returns:
+        Dicionário com período, caminho, tamanho, mtime, contagens e checksum
+    """
+    arquivo = f"ESCALA_{ano}_{mes:02d}.xlsx"
+    caminho = f"{diretorio}/{arquivo}"
+    info = os.stat(caminho)
+
+    return {
+        'periodo': f"{ano}-{mes:02d}",
+        'ano': ano,
+        'mes': mes,
+        'arquivo': arquivo,
+        'caminho': caminho,
+        'tamanho': info.st_size,
+        'mtime': info.st_mtime,
+        'mtime_ns': info.st_mtime_ns,
+        'linhas': linhas,
+        'funcionarios': funcionarios,
+        'checksum': calcular_checksum(caminho),
+        'validacao': validacao or {}
+    }
+
+
+def ler_manifesto(diretorio: str) -> Optional[dict]:
+    """
+    Lê o manifesto do histórico (None se ainda não existir)
+
+    O conteúdo fica em memória enquanto o arquivo não mudar, então chamadas
+    repetidas custam apenas um stat. Cada gravação cria um arquivo novo
+    (renomeação), então o inode identifica a versão mesmo dentro do mesmo
+    tique do relógio.
+    """
+    caminho = f"{diretorio}/{ARQUIVO_MANIFESTO}"
+
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+
+    versao = (info.st_mtime_ns, info.st_ino)
+
+    em_cache = _cache_manifesto.get(caminho)
+    if em_cache and em_cache[0] == versao:
+        return em_cache[1]
+
+    with open(caminho, encoding='utf-8') as f:
+        manifesto = json.load(f)
+
+    _cache_manifesto[caminho] = (versao, manifesto)
+    return manifesto
+
+
+def registrar_no_manifesto(diretorio: str, entrada: dict):
+    """Adiciona ou substitui a entrada de um período no manifesto"""
+    if ler_manifesto(diretorio) is None:
+        # Primeiro registro: incorporar as escalas que já estão no diretório
+        reindexar_historico(diretorio)
+
+    # Leitura-modificação-gravação: uma thread e um processo por vez
+    with _trava_manifesto, trava_arquivo(f"{diretorio}/{ARQUIVO_MANIFESTO}.lock"):
+        manifesto = ler_manifesto(diretorio) or {'escalas': {}}
+        escalas = dict(manifesto['escalas'])
+        escalas[entrada['periodo']] = entrada
+        gravar_json_atomico(f"{diretorio}/{ARQUIVO_MANIFESTO}",
+                            {'escalas': dict(sorted(escalas.items()))})
+
+
+def listar_entradas(diretorio: str) -> List[dict]:
+    """Entradas do manifesto em ordem de período (reindexa se não existir)"""
+    manifesto = ler_manifesto(diretorio)
+
+    if manifesto is None:
+        manifesto = reindexar_historico(diretorio)
+
+    return list(manifesto['escalas'].values())
+
+
+def reindexar_historico(diretorio: str) -> dict:
+    """
+    Reconstrói o manifesto varrendo o diretório (recuperação)
+
+    Lê cada escala para obter contagens de linhas e o resumo de validação
+    gravado nas abas VERIFICACAO_REGRAS e ERROS_DETECTADOS (esta só existe
+    quando há erros e guarda no máximo os 10 primeiros, então a contagem de
+    erros reconstruída satura em 10).
+
+    Args:
+        diretorio: Diretório do histórico
+
+    Returns:
+        Manifesto reconstruído
+    """
+    import pandas as pd
+
+    escalas = {}
+
+    for arquivo in sorted(os.listdir(diretorio)):
+        encontrado = PADRAO_ESCALA.match(arquivo)
+        if not encontrado:
+            continue
+
+        ano, mes = int(encontrado.group(1)), int(encontrado.group(2))
+
+        try:
+            with pd.ExcelFile(f"{diretorio}/{arquivo}") as planilha:
+                nomes = ['ESCALA_COMPLETA', 'VERIFICACAO_REGRAS']
+                if 'ERROS_DETECTADOS' in planilha.sheet_names:
+                    nomes.append('ERROS_DETECTADOS')
+                abas = pd.read_excel(planilha, sheet_name=nomes)
+        except Exception as e:
+            print(f"⚠️  {arquivo} ignorado na reindexação: {e}")
+            continue
+
+        df_escala = abas['ESCALA_COMPLETA']
+        status = abas['VERIFICACAO_REGRAS']['Status'].astype(str)
+        validacao = {
+            'regras_ok': int(status.str.contains('OK').sum()),
+            'total_regras': len(status),
+            'erros': len(abas.get('ERROS_DETECTADOS', []))
+        }
+
+        entrada = criar_entrada(diretorio, ano, mes, len(df_escala),
+                                int(df_escala['Funcionário'].nunique()), validacao)
+        escalas[entrada['periodo']] = entrada
+
+    manifesto = {'escalas': escalas}
+
+    with _trava_manifesto, trava_arquivo(f"{diretorio}/{ARQUIVO_MANIFESTO}.lock"):
+        gravar_json_atomico(f"{diretorio}/{ARQUIVO_MANIFESTO}", manifesto)
+
+    print(f"✅ Manifesto reconstruído: {len(escalas)} escalas")
+    return manifesto
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Uso: python historico.py [diretorio]  -> reconstrói o manifesto
+    reindexar_historico(sys.argv[1] if len(sys.argv) > 1 else DIRETORIO_PADRAO)
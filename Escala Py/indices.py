@@ -0,0 +1,431 @@
+"""
+Índices derivados das escalas salvas
+
+Os índices são gravados em ESCALAS_HISTORICO/INDICES a cada salvamento e
+respondem consultas sem abrir as planilhas. Funcionários recebem um ID global
+e permanente (registro de funcionários), de modo que conjuntos de pessoas de
+meses diferentes possam ser combinados com operações de bits.
+"""
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from historico import gravar_json_atomico
+from travas import trava_arquivo
+from esquema import DIAS_SEMANA, presenca
+
+_trava_registro = threading.Lock()
+_cache_json = {}
+
+
+def _ler_json_em_cache(caminho: str) -> Optional[dict]:
+    """Lê um JSON mantendo-o em memória enquanto o arquivo não mudar"""
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+
+    # O inode muda a cada os.replace, mesmo dentro do mesmo tique do relógio
+    versao = (info.st_mtime_ns, info.st_ino)
+    em_cache = _cache_json.get(caminho)
+    if em_cache and em_cache[0] == versao:
+        return em_cache[1]
+
+    with open(caminho, encoding='utf-8') as f:
+        dados = json.load(f)
+
+    _cache_json[caminho] = (versao, dados)
+    return dados
+
+
+def _para_bits(mascara: np.ndarray) -> int:
+    """Converte um vetor booleano (posição = ID) em um inteiro de bits"""
+    return int.from_bytes(np.packbits(mascara, bitorder='little').tobytes(), 'little')
+
+
+def ids_do_conjunto(bits: int) -> List[int]:
+    """IDs presentes em um conjunto de bits, em ordem crescente"""
+    ids = []
+    while bits:
+        menor = bits & -bits
+        ids.append(menor.bit_length() - 1)
+        bits ^= menor
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# Registro global de funcionários
+# ---------------------------------------------------------------------------
+
+def carregar_registro(diretorio: str) -> List[str]:
+    """Nomes dos funcionários, na ordem dos IDs"""
+    registro = _ler_json_em_cache(f"{diretorio}/FUNCIONARIOS.json")
+    return registro['nomes'] if registro else []
+
+
+def registrar_funcionarios(diretorio: str, nomes) -> Dict[str, int]:
+    """
+    Garante um ID para cada nome e devolve o mapa nome -> ID
+
+    IDs nunca são reaproveitados: funcionários novos vão para o fim.
+    """
+    with _trava_registro, trava_arquivo(f"{diretorio}/FUNCIONARIOS.json.lock"):
+        registrados = list(carregar_registro(diretorio))
+        ids = {nome: i for i, nome in enumerate(registrados)}
+        novos = [nome for nome in dict.fromkeys(nomes) if nome not in ids]
+
+        if novos:
+            for nome in novos:
+                ids[nome] = len(registrados)
+                registrados.append(nome)
+            gravar_json_atomico(f"{diretorio}/FUNCIONARIOS.json", {'nomes': registrados})
+
+    return ids
+
+
+# ---------------------------------------------------------------------------
+# Índice de disponibilidade (bitsets por semana e dia)
+# ---------------------------------------------------------------------------
+
+def construir_indice_disponibilidade(diretorio: str, ano: int, mes: int,
+                                     df_escala: pd.DataFrame,
+                                     semanas: Optional[List[int]] = None) -> dict:
+    """
+    Constrói e grava o índice de disponibilidade de um mês
+
+    Para cada (semana, dia) guarda o conjunto de IDs de quem trabalha, além do
+    conjunto de escalados na semana e de uma máscara por ilha.
+
+    Args:
+        diretorio: Diretório dos índices
+        ano: Ano da escala
+        mes: Mês da escala
+        df_escala: Escala do mês (compacta ou 'P'/'F')
+        semanas: Recalcular só estas semanas sobre o índice gravado (opcional)
+
+    Returns:
+        Índice gravado
+    """
+    nomes = df_escala['Funcionário'].astype(str).to_numpy()
+    mapa_ids = registrar_funcionarios(diretorio, nomes)
+    ids = np.array([mapa_ids[nome] for nome in nomes], dtype=np.int64)
+    tamanho = int(ids.max()) + 1 if len(ids) else 0
+
+    def conjunto(linhas: np.ndarray) -> str:
+        mascara = np.zeros(tamanho, dtype=bool)
+        mascara[ids[linhas]] = True
+        return format(_para_bits(mascara), 'x')
+
+    caminho = f"{diretorio}/DISPONIBILIDADE_{ano}_{mes:02d}.json"
+    existente = _ler_json_em_cache(caminho) if semanas is not None else None
+
+    semanas_escala = df_escala['Semana do Mês'].to_numpy()
+    presentes = np.column_stack([presenca(df_escala[dia]).to_numpy() for dia in DIAS_SEMANA])
+
+    if existente is None:
+        semanas = sorted(set(semanas_escala.tolist()))
+
+    # Semanas não editadas continuam como estão no índice gravado
+    semanas_indice = dict(existente['semanas']) if existente else {}
+    for semana in sorted(set(semanas)):
+        da_semana = semanas_escala == semana
+        semanas_indice[str(semana)] = {
+            'todos': conjunto(da_semana),
+            'dias': [conjunto(da_semana & presentes[:, d]) for d in range(len(DIAS_SEMANA))]
+        }
+
+    ilhas_escala = df_escala['Ilha'].astype(str).to_numpy()
+    ilhas = {ilha: conjunto(ilhas_escala == ilha) for ilha in dict.fromkeys(ilhas_escala)}
+
+    indice = {'ano': ano, 'mes': mes, 'semanas': semanas_indice, 'ilhas': ilhas}
+    gravar_json_atomico(caminho, indice)
+
+    return indice
+
+
+class IndiceDisponibilidade:
+    """Índice de disponibilidade de um mês com os conjuntos já em inteiros"""
+
+    def __init__(self, dados: dict):
+        self.ano = dados['ano']
+        self.mes = dados['mes']
+        self.semanas = {
+            int(semana): (int(info['todos'], 16), [int(d, 16) for d in info['dias']])
+            for semana, info in dados['semanas'].items()
+        }
+        self.ilhas = {ilha: int(bits, 16) for ilha, bits in dados['ilhas'].items()}
+
+    def presentes(self, semana: int, dia: int, ilha: Optional[str] = None) -> int:
+        """Conjunto de quem trabalha no dia (0=Seg ... 6=Dom) da semana"""
+        if semana not in self.semanas:
+            return 0
+        bits = self.semanas[semana][1][dia]
+        return bits & self.ilhas.get(ilha, 0) if ilha else bits
+
+    def escalados(self, semana: int, ilha: Optional[str] = None) -> int:
+        """Conjunto de quem está escalado na semana"""
+        if semana not in self.semanas:
+            return 0
+        bits = self.semanas[semana][0]
+        return bits & self.ilhas.get(ilha, 0) if ilha else bits
+
+    def ilha_de(self, id_funcionario: int) -> Optional[str]:
+        """Ilha do funcionário neste mês"""
+        for ilha, bits in self.ilhas.items():
+            if bits >> id_funcionario & 1:
+                return ilha
+        return None
+
+
+_cache_indices = {}
+
+
+def carregar_indice_disponibilidade(diretorio: str, ano: int, mes: int) -> Optional[IndiceDisponibilidade]:
+    """Carrega o índice de um mês (em memória enquanto o arquivo não mudar)"""
+    caminho = f"{diretorio}/DISPONIBILIDADE_{ano}_{mes:02d}.json"
+    dados = _ler_json_em_cache(caminho)
+
+    if dados is None:
+        return None
+
+    em_cache = _cache_indices.get(caminho)
+    if em_cache is None or em_cache[0] is not dados:
+        em_cache = (dados, IndiceDisponibilidade(dados))
+        _cache_indices[caminho] = em_cache
+
+    return em_cache[1]
+
+
+def posicoes_intervalo(inicio: Tuple[int, int, int, int],
+                       fim: Tuple[int, int, int, int]) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    """
+    Expande um intervalo (ano, mês, semana, dia) em posições por mês
+
+    Returns:
+        Dicionário {(ano, mês): [(semana, dia), ...]}; as semanas de cada mês
+        vão de 1 a 6 e são filtradas depois pelas semanas existentes
+    """
+    posicoes = {}
+    ano, mes = inicio[0], inicio[1]
+
+    while (ano, mes) <= (fim[0], fim[1]):
+        lista = []
+        for semana in range(1, 7):
+            for dia in range(len(DIAS_SEMANA)):
+                if inicio <= (ano, mes, semana, dia) <= fim:
+                    lista.append((semana, dia))
+        posicoes[(ano, mes)] = lista
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    return posicoes
+
+
+def consultar_disponibilidade(indices: Dict[Tuple[int, int], IndiceDisponibilidade],
+                              inicio: Tuple[int, int, int, int],
+                              fim: Optional[Tuple[int, int, int, int]] = None,
+                              ilha: Optional[str] = None,
+                              modo: str = 'todos') -> Dict:
+    """
+    Consulta quem trabalha em um dia ou intervalo, só com operações de bits
+
+    Args:
+        indices: Índices por (ano, mês)
+        inicio: (ano, mês, semana, dia) inicial
+        fim: (ano, mês, semana, dia) final (padrão: igual ao início)
+        ilha: Restringir a uma ilha
+        modo: 'todos' (trabalha em todos os dias) ou 'algum' (em pelo menos um)
+
+    Returns:
+        Dicionário com os conjuntos 'disponiveis' e 'escalados' e o número de
+        dias consultados
+    """
+    fim = fim or inicio
+    disponiveis = None
+    escalados = 0
+    dias_consultados = 0
+
+    for periodo, posicoes in posicoes_intervalo(inicio, fim).items():
+        indice = indices.get(periodo)
+        if indice is None:
+            continue
+
+        for semana, dia in posicoes:
+            if semana not in indice.semanas:
+                continue
+
+            bits = indice.presentes(semana, dia, ilha)
+            escalados |= indice.escalados(semana, ilha)
+            dias_consultados += 1
+
+            if disponiveis is None:
+                disponiveis = bits
+            elif modo == 'todos':
+                disponiveis &= bits
+            else:
+                disponiveis |= bits
+
+    return {
+        'disponiveis': disponiveis or 0,
+        'escalados': escalados,
+        'dias_consultados': dias_consultados
+    }
+
+
+# ---------------------------------------------------------------------------
+# Linha do tempo por funcionário (uma máscara uint8 por semana)
+# ---------------------------------------------------------------------------
+
+def mascaras_semanais(df_escala: pd.DataFrame) -> np.ndarray:
+    """Máscara de presença por linha: bit d = trabalha no dia d (0=Seg ... 6=Dom)"""
+    mascaras = np.zeros(len(df_escala), dtype=np.uint8)
+
+    for d, dia in enumerate(DIAS_SEMANA):
+        mascaras |= presenca(df_escala[dia]).to_numpy().astype(np.uint8) << d
+
+    return mascaras
+
+
+def atualizar_linha_do_tempo(diretorio: str, ano: int, mes: int, df_escala: pd.DataFrame,
+                             funcionarios: Optional[List[str]] = None):
+    """
+    Grava (ou substitui) o mês na linha do tempo de cada funcionário
+
+    A linha do tempo guarda, por ID de funcionário e período, a ilha e uma
+    sequência de bytes (hex) com a máscara de cada semana.
+
+    Args:
+        diretorio: Diretório dos índices
+        ano: Ano da escala
+        mes: Mês da escala
+        df_escala: Escala do mês (compacta ou 'P'/'F')
+        funcionarios: Substituir o mês só destes funcionários (opcional)
+    """
+    caminho = f"{diretorio}/LINHA_DO_TEMPO.json"
+    periodo = f"{ano}-{mes:02d}"
+
+    if funcionarios is not None:
+        df_escala = df_escala[df_escala['Funcionário'].astype(str).isin(funcionarios)]
+
+    mapa_ids = registrar_funcionarios(diretorio, df_escala['Funcionário'].astype(str).to_numpy())
+    do_mes = _periodos_da_escala(df_escala, mapa_ids)
+    substituidos = None if funcionarios is None else {str(mapa_ids[nome]) for nome in funcionarios if nome in mapa_ids}
+
+    # Leitura-modificação-gravação: um processo por vez
+    with trava_arquivo(f"{caminho}.lock"):
+        linha_do_tempo = dict(_ler_json_em_cache(caminho) or {'funcionarios': {}})
+        por_funcionario = {id_func: dict(periodos) for id_func, periodos in linha_do_tempo['funcionarios'].items()}
+
+        # Regeração do mês: remover o período de quem não está mais na escala
+        for id_func, periodos in por_funcionario.items():
+            if substituidos is None or id_func in substituidos:
+                periodos.pop(periodo, None)
+
+        for id_func, dados in do_mes.items():
+            por_funcionario.setdefault(id_func, {})[periodo] = dados
+
+        _gravar_linha_do_tempo(caminho, por_funcionario)
+
+
+def reconstruir_linha_do_tempo(diretorio: str, escalas: Dict[Tuple[int, int], pd.DataFrame]):
+    """
+    Monta a linha do tempo inteira em memória e grava uma única vez
+
+    Args:
+        diretorio: Diretório dos índices
+        escalas: {(ano, mês): escala do mês}, em ordem cronológica
+    """
+    caminho = f"{diretorio}/LINHA_DO_TEMPO.json"
+    mapa_ids = registrar_funcionarios(diretorio, [nome for df_escala in escalas.values()
+                                                  for nome in df_escala['Funcionário'].astype(str)])
+
+    funcionarios = {}
+    for (ano, mes), df_escala in escalas.items():
+        for id_func, dados in _periodos_da_escala(df_escala, mapa_ids).items():
+            funcionarios.setdefault(id_func, {})[f"{ano}-{mes:02d}"] = dados
+
+    with trava_arquivo(f"{caminho}.lock"):
+        _gravar_linha_do_tempo(caminho, funcionarios)
+
+
+def _periodos_da_escala(df_escala: pd.DataFrame, mapa_ids: Dict[str, int]) -> Dict[str, dict]:
+    """Entrada do mês na linha do tempo de cada funcionário: {ID: {'ilha', 'semanas'}}"""
+    nomes = df_escala['Funcionário'].astype(str).to_numpy()
+    ordem = np.lexsort((df_escala['Semana do Mês'].to_numpy(), nomes))
+    mascaras = mascaras_semanais(df_escala)[ordem]
+    nomes_ordenados = nomes[ordem]
+    ilhas = df_escala['Ilha'].astype(str).to_numpy()[ordem]
+
+    periodos = {}
+    inicio = 0
+    while inicio < len(nomes_ordenados):
+        fim = inicio
+        while fim < len(nomes_ordenados) and nomes_ordenados[fim] == nomes_ordenados[inicio]:
+            fim += 1
+
+        periodos[str(mapa_ids[nomes_ordenados[inicio]])] = {
+            'ilha': ilhas[inicio],
+            'semanas': mascaras[inicio:fim].tobytes().hex()
+        }
+        inicio = fim
+
+    return periodos
+
+
+def _gravar_linha_do_tempo(caminho: str, funcionarios: Dict[str, Dict[str, dict]]):
+    gravar_json_atomico(caminho, {
+        'funcionarios': {id_func: dict(sorted(periodos.items()))
+                         for id_func, periodos in funcionarios.items() if periodos}
+    })
+
+
+def carregar_linha_do_tempo(diretorio: str) -> Optional[dict]:
+    """Linha do tempo de todos os funcionários (None se ainda não existir)"""
+    return _ler_json_em_cache(f"{diretorio}/LINHA_DO_TEMPO.json")
+
+
+def resumir_linha_do_tempo(periodos: Dict[str, dict], desde: Optional[str] = None) -> Dict:
+    """
+    Calcula histórico, fins de semana e distribuição de folgas de um funcionário
+
+    Args:
+        periodos: Entradas da linha do tempo do funcionário ({período: dados})
+        desde: Período inicial 'AAAA-MM' (inclusive)
+
+    Returns:
+        Dicionário com semanas por período e totais
+    """
+    selecionados = {p: dados for p, dados in periodos.items() if not desde or p >= desde}
+
+    historico = []
+    todas = []
+    for periodo, dados in selecionados.items():
+        mascaras = np.frombuffer(bytes.fromhex(dados['semanas']), dtype=np.uint8)
+        todas.append(mascaras)
+        historico.append({
+            'periodo': periodo,
+            'ilha': dados['ilha'],
+            'semanas': [
+                ''.join('P' if m >> d & 1 else 'F' for d in range(len(DIAS_SEMANA)))
+                for m in mascaras.tolist()
+            ]
+        })
+
+    mascaras = np.concatenate(todas) if todas else np.zeros(0, dtype=np.uint8)
+    # Matriz semanas x 7 (coluna d = trabalha no dia d)
+    dias = np.unpackbits(mascaras[:, None], axis=1, bitorder='little')[:, :len(DIAS_SEMANA)].astype(bool)
+
+    sabados = int(dias[:, 5].sum())
+    domingos = int(dias[:, 6].sum())
+
+    return {
+        'historico': historico,
+        'semanas': int(len(mascaras)),
+        'sabados_trabalhados': sabados,
+        'domingos_trabalhados': domingos,
+        'fins_de_semana_trabalhados': int((dias[:, 5] | dias[:, 6]).sum()),
+        'folgas_por_dia': {dia: int((~dias[:, d]).sum()) for d, dia in enumerate(DIAS_SEMANA)}
+    }
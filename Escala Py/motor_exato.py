@@ -0,0 +1,320 @@
+"""
+Motor exato de geração de escala (programação inteira)
+
+Formula o mês inteiro como um problema inteiro sobre os padrões semanais
+válidos de padroes.py: cada funcionário recebe exatamente um padrão por
+semana entre os permitidos pelas regras da sua ilha (regras.py), o que já
+garante os dias trabalhados, o fim de semana e as folgas seguidas sem
+restrições extras no modelo. As restrições de cobertura usam as mesmas metas
+por ilha do motor guloso (cobertura das regras repartida entre as ilhas,
+RegrasEscala.metas_fim_de_semana).
+
+O objetivo combina dois critérios de justiça por ilha:
+- diferença entre quem mais e quem menos trabalhou sábados e domingos dentro
+  do mês, com os mesmos pesos de pontuar_escala (que ordena os candidatos do
+  portfólio), para que o motor exato não perca para o guloso nessa pontuação;
+- diferença acumulada (contadores históricos + mês), com peso maior, para
+  compensar ao longo dos meses quem ficou com mais fins de semana.
+Completa o objetivo o desvio das folgas por dia útil (mês e histórico).
+
+O modelo é resolvido com scipy.optimize.milp (HiGHS). Se o SciPy não estiver
+instalado, SCIPY_DISPONIVEL é False e o sistema usa o motor guloso.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from padroes import PADROES_VALIDOS
+from regras import REGRAS, RegrasEscala
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    from scipy.sparse import coo_matrix
+    SCIPY_DISPONIVEL = True
+except ImportError:
+    SCIPY_DISPONIVEL = False
+
+# Pesos do objetivo (domingo > sábado > folgas, como no rodízio guloso)
+PESO_DOMINGO = 100
+PESO_SABADO = 50
+# Diferença dentro do mês, com os pesos de SistemaEscalaExcel.pontuar_escala
+PESO_DOMINGO_MES = 10
+PESO_SABADO_MES = 5
+PESO_FOLGAS_DIA = 5
+PESO_HISTORICO_FOLGAS = 1
+
+# Diferença máxima dentro do mês (mesmos limites de verificar_rodizio_perfeito)
+DIFERENCA_MAX_DOMINGOS = 1
+DIFERENCA_MAX_SABADOS = 2
+
+SABADO, DOMINGO = 5, 6
+PADROES = np.array(PADROES_VALIDOS, dtype=np.uint8)
+DIAS_PADRAO = np.unpackbits(PADROES[:, None], axis=1, bitorder='little')[:, :7].astype(bool)
+
+# Variáveis auxiliares por ilha
+AUXILIARES = ['dom_max', 'dom_min', 'sab_max', 'sab_min',
+              'dom_mes_max', 'dom_mes_min', 'sab_mes_max', 'sab_mes_min',
+              'desvio_seg', 'desvio_ter', 'desvio_qua', 'desvio_qui', 'desvio_sex']
+
+
+class ModeloEscala:
+    """
+    Modelo inteiro de um mês
+
+    Minimiza, por ilha, a diferença acumulada de domingos e sábados (histórico
+    + mês), a diferença dentro do mês (a mesma de pontuar_escala) e o desvio
+    das folgas por dia útil; ver os pesos PESO_* no início do módulo.
+
+    Args:
+        funcionarios: Dicionário {ilha: [funcionários]} na ordem do sistema
+        semanas: Número de semanas do mês
+        historico: {funcionário: {'sabados': n, 'domingos': n, 'folgas': {0..4: n}}}
+        ciclo_sem_domingo: Ilha com uma pessoa a menos em cada semana (padrão: uma ilha por semana, em ordem)
+        regras: Regras compiladas (padrões permitidos e cobertura por ilha)
+    """
+
+    def __init__(self, funcionarios: Dict[str, List[str]], semanas: int, historico: Dict,
+                 ciclo_sem_domingo: Optional[List[int]] = None, regras: RegrasEscala = REGRAS):
+        self.ilhas = list(funcionarios)
+        self.nomes = [f for ilha in self.ilhas for f in funcionarios[ilha]]
+        self.ilha_de = np.array([i for i, ilha in enumerate(self.ilhas) for _ in funcionarios[ilha]])
+        self.semanas = semanas
+        self.ciclo_sem_domingo = ciclo_sem_domingo or list(range(len(self.ilhas)))
+
+        # Pessoas por ilha no sábado e no domingo de cada semana (semana x ilha x 2), como no motor guloso
+        self.metas = np.array([regras.metas_fim_de_semana(self.ilhas, w, self.ciclo_sem_domingo)
+                               for w in range(semanas)])
+
+        # Padrões permitidos por funcionário (regras da ilha), funcionário x padrão
+        self.permitidos = regras.tabelas(self.ilhas)[:, PADROES][self.ilha_de]
+
+        self.hist_sab = np.array([historico.get(f, {}).get('sabados', 0) for f in self.nomes], dtype=float)
+        self.hist_dom = np.array([historico.get(f, {}).get('domingos', 0) for f in self.nomes], dtype=float)
+        hist_folgas = np.array([[historico.get(f, {}).get('folgas', {}).get(d, 0) for d in range(5)]
+                                for f in self.nomes], dtype=float)
+        # Só importa a diferença entre os dias de cada pessoa
+        self.hist_folgas = hist_folgas - hist_folgas.min(axis=1, keepdims=True)
+
+        self.qtd_x = len(self.nomes) * semanas * len(PADROES)
+        self.qtd_variaveis = self.qtd_x + len(self.ilhas) * len(AUXILIARES)
+
+        self._montar()
+
+    # ------------------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------------------
+
+    def indice_x(self, funcionario: int, semana: int, padrao: int) -> int:
+        return (funcionario * self.semanas + semana) * len(PADROES) + padrao
+
+    def indice_aux(self, ilha: int, nome: str) -> int:
+        return self.qtd_x + ilha * len(AUXILIARES) + AUXILIARES.index(nome)
+
+    # ------------------------------------------------------------------
+    # Montagem
+    # ------------------------------------------------------------------
+
+    def _montar(self):
+        linhas, colunas, valores, inferior, superior = [], [], [], [], []
+
+        def restricao(termos, minimo, maximo):
+            linha = len(inferior)
+            for coluna, valor in termos:
+                linhas.append(linha)
+                colunas.append(coluna)
+                valores.append(valor)
+            inferior.append(minimo)
+            superior.append(maximo)
+
+        qtd_padroes = len(PADROES)
+        faz_sab = np.flatnonzero(DIAS_PADRAO[:, SABADO])
+        faz_dom = np.flatnonzero(DIAS_PADRAO[:, DOMINGO])
+
+        # Um padrão por funcionário-semana
+        for f in range(len(self.nomes)):
+            for w in range(self.semanas):
+                restricao([(self.indice_x(f, w, p), 1) for p in range(qtd_padroes)], 1, 1)
+
+        for i in range(len(self.ilhas)):
+            membros = np.flatnonzero(self.ilha_de == i)
+
+            # Cobertura por ilha: metas da semana no sábado e no domingo
+            for w in range(self.semanas):
+                sabado, domingo = self.metas[w, i]
+                restricao([(self.indice_x(f, w, p), 1) for f in membros for p in faz_sab], sabado, sabado)
+                restricao([(self.indice_x(f, w, p), 1) for f in membros for p in faz_dom], domingo, domingo)
+
+            # Justiça acumulada (histórico + mês) e diferença dentro do mês
+            for f in membros:
+                termos_dom = [(self.indice_x(f, w, p), 1) for w in range(self.semanas) for p in faz_dom]
+                termos_sab = [(self.indice_x(f, w, p), 1) for w in range(self.semanas) for p in faz_sab]
+
+                restricao(termos_dom + [(self.indice_aux(i, 'dom_max'), -1)], -np.inf, -self.hist_dom[f])
+                restricao(termos_dom + [(self.indice_aux(i, 'dom_min'), -1)], -self.hist_dom[f], np.inf)
+                restricao(termos_sab + [(self.indice_aux(i, 'sab_max'), -1)], -np.inf, -self.hist_sab[f])
+                restricao(termos_sab + [(self.indice_aux(i, 'sab_min'), -1)], -self.hist_sab[f], np.inf)
+                restricao(termos_dom + [(self.indice_aux(i, 'dom_mes_max'), -1)], -np.inf, 0)
+                restricao(termos_dom + [(self.indice_aux(i, 'dom_mes_min'), -1)], 0, np.inf)
+                restricao(termos_sab + [(self.indice_aux(i, 'sab_mes_max'), -1)], -np.inf, 0)
+                restricao(termos_sab + [(self.indice_aux(i, 'sab_mes_min'), -1)], 0, np.inf)
+
+            restricao([(self.indice_aux(i, 'dom_mes_max'), 1), (self.indice_aux(i, 'dom_mes_min'), -1)],
+                      -np.inf, DIFERENCA_MAX_DOMINGOS)
+            restricao([(self.indice_aux(i, 'sab_mes_max'), 1), (self.indice_aux(i, 'sab_mes_min'), -1)],
+                      -np.inf, DIFERENCA_MAX_SABADOS)
+
+            # Máximo e mínimo do mês ficam dos dois lados da média da ilha.
+            # Redundante para o modelo inteiro, mas sem isso a relaxação
+            # linear aceita max = min e o HiGHS não fecha o gap no tempo limite
+            if len(membros):
+                for nome, turnos in (('sab', self.metas[:, i, 0].sum()), ('dom', self.metas[:, i, 1].sum())):
+                    restricao([(self.indice_aux(i, f'{nome}_mes_max'), 1)], np.ceil(turnos / len(membros)), np.inf)
+                    restricao([(self.indice_aux(i, f'{nome}_mes_min'), 1)], -np.inf, np.floor(turnos / len(membros)))
+
+            # Folgas da ilha por dia útil: cada turno de fim de semana gera
+            # exatamente uma folga em dia útil, então a média é fixa
+            turnos = self.metas[:, i].sum()
+            media = turnos / 5
+            for d in range(5):
+                folgam = np.flatnonzero(~DIAS_PADRAO[:, d])
+                termos = [(self.indice_x(f, w, p), 1) for f in membros for w in range(self.semanas) for p in folgam]
+                desvio = self.indice_aux(i, AUXILIARES[8 + d])
+                restricao(termos + [(desvio, -1)], -np.inf, media)
+                restricao(termos + [(desvio, 1)], media, np.inf)
+
+        self.matriz = coo_matrix((valores, (linhas, colunas)),
+                                 shape=(len(inferior), self.qtd_variaveis)).tocsr()
+        self.inferior = np.array(inferior)
+        self.superior = np.array(superior)
+
+        # Objetivo
+        c = np.zeros(self.qtd_variaveis)
+        folgas_padrao = (~DIAS_PADRAO[:, :5]).astype(float)
+        custo_folgas = self.hist_folgas @ folgas_padrao.T  # funcionário x padrão
+        for f in range(len(self.nomes)):
+            for w in range(self.semanas):
+                inicio = self.indice_x(f, w, 0)
+                c[inicio:inicio + len(PADROES)] = PESO_HISTORICO_FOLGAS * custo_folgas[f]
+
+        for i in range(len(self.ilhas)):
+            c[self.indice_aux(i, 'dom_max')] = PESO_DOMINGO
+            c[self.indice_aux(i, 'dom_min')] = -PESO_DOMINGO
+            c[self.indice_aux(i, 'sab_max')] = PESO_SABADO
+            c[self.indice_aux(i, 'sab_min')] = -PESO_SABADO
+            c[self.indice_aux(i, 'dom_mes_max')] = PESO_DOMINGO_MES
+            c[self.indice_aux(i, 'dom_mes_min')] = -PESO_DOMINGO_MES
+            c[self.indice_aux(i, 'sab_mes_max')] = PESO_SABADO_MES
+            c[self.indice_aux(i, 'sab_mes_min')] = -PESO_SABADO_MES
+            for d in range(5):
+                c[self.indice_aux(i, AUXILIARES[8 + d])] = PESO_FOLGAS_DIA
+
+        self.objetivo = c
+
+    # ------------------------------------------------------------------
+    # Soluções
+    # ------------------------------------------------------------------
+
+    def vetor_solucao(self, mascaras: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Converte máscaras semanais (funcionário x semana) em vetor do modelo
+
+        Returns:
+            Vetor com as auxiliares no valor ótimo, ou None se algum padrão
+            não for válido
+        """
+        posicao = {int(m): p for p, m in enumerate(PADROES)}
+        z = np.zeros(self.qtd_variaveis)
+
+        for f in range(len(self.nomes)):
+            for w in range(self.semanas):
+                p = posicao.get(int(mascaras[f, w]))
+                if p is None or not self.permitidos[f, p]:
+                    return None
+                z[self.indice_x(f, w, p)] = 1
+
+        dias = DIAS_PADRAO[self._padroes(z)]  # funcionário x semana x dia
+        dom_mes = dias[:, :, DOMINGO].sum(axis=1)
+        sab_mes = dias[:, :, SABADO].sum(axis=1)
+
+        for i in range(len(self.ilhas)):
+            membros = self.ilha_de == i
+            z[self.indice_aux(i, 'dom_max')] = (self.hist_dom + dom_mes)[membros].max()
+            z[self.indice_aux(i, 'dom_min')] = (self.hist_dom + dom_mes)[membros].min()
+            z[self.indice_aux(i, 'sab_max')] = (self.hist_sab + sab_mes)[membros].max()
+            z[self.indice_aux(i, 'sab_min')] = (self.hist_sab + sab_mes)[membros].min()
+            z[self.indice_aux(i, 'dom_mes_max')] = dom_mes[membros].max()
+            z[self.indice_aux(i, 'dom_mes_min')] = dom_mes[membros].min()
+            z[self.indice_aux(i, 'sab_mes_max')] = sab_mes[membros].max()
+            z[self.indice_aux(i, 'sab_mes_min')] = sab_mes[membros].min()
+
+            turnos = self.metas[:, i].sum()
+            folgas_dia = (~dias[membros][:, :, :5]).sum(axis=(0, 1))
+            for d in range(5):
+                z[self.indice_aux(i, AUXILIARES[8 + d])] = abs(folgas_dia[d] - turnos / 5)
+
+        return z
+
+    def viavel(self, z: np.ndarray) -> bool:
+        """Se o vetor satisfaz todas as restrições do modelo"""
+        valores = self.matriz @ z
+        return bool(np.all(valores >= self.inferior - 1e-6) and np.all(valores <= self.superior + 1e-6))
+
+    def _padroes(self, z: np.ndarray) -> np.ndarray:
+        """Índice do padrão escolhido por funcionário-semana"""
+        x = z[:self.qtd_x].reshape(len(self.nomes), self.semanas, len(PADROES))
+        return x.argmax(axis=2)
+
+    def mascaras(self, z: np.ndarray) -> np.ndarray:
+        """Máscaras semanais (funcionário x semana) de uma solução"""
+        return PADROES[self._padroes(z)]
+
+    def resolver(self, tempo_limite: Optional[float] = None,
+                 inicial: Optional[np.ndarray] = None) -> Dict:
+        """
+        Resolve o modelo
+
+        O HiGHS do SciPy não aceita solução inicial. Quando `inicial` é
+        informada e viável, ela é devolvida se o solver não encontrar nada
+        melhor dentro do tempo limite (usá-la como corte no objetivo deixa o
+        HiGHS muito mais lento neste modelo).
+
+        Args:
+            tempo_limite: Tempo máximo em segundos (None = sem limite)
+            inicial: Vetor de uma solução conhecida (ex.: do motor guloso)
+
+        Returns:
+            Dicionário com status, objetivo, mascaras (ou None) e origem
+        """
+        referencia = None
+        if inicial is not None and self.viavel(inicial):
+            referencia = float(self.objetivo @ inicial)
+
+        integralidade = np.zeros(self.qtd_variaveis)
+        integralidade[:self.qtd_x] = 1
+        limites_sup = np.full(self.qtd_variaveis, np.inf)
+        # Padrões fora das regras da ilha ficam fixos em 0
+        limites_sup[:self.qtd_x] = np.repeat(self.permitidos[:, None, :], self.semanas, axis=1).ravel()
+
+        opcoes = {'disp': False}
+        if tempo_limite:
+            opcoes['time_limit'] = float(tempo_limite)
+
+        resultado = milp(self.objetivo, constraints=LinearConstraint(self.matriz, self.inferior, self.superior),
+                         integrality=integralidade, bounds=Bounds(0, limites_sup), options=opcoes)
+
+        if resultado.x is not None and (referencia is None or resultado.fun <= referencia):
+            return {
+                'status': 'otimo' if resultado.status == 0 else 'limite_tempo',
+                'objetivo': float(resultado.fun),
+                'mascaras': self.mascaras(np.round(resultado.x)),
+                'origem': 'exato',
+                'mensagem': resultado.message
+            }
+
+        if referencia is not None:
+            return {'status': 'otimo' if resultado.status == 0 else 'limite_tempo',
+                    'objetivo': referencia, 'mascaras': self.mascaras(inicial),
+                    'origem': 'inicial', 'mensagem': resultado.message}
+
+        return {'status': 'sem_solucao', 'objetivo': None, 'mascaras': None,
+                'origem': None, 'mensagem': resultado.message}
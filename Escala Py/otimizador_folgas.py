@@ -0,0 +1,293 @@
+"""
+Distribuição e otimização de folgas em dias úteis
+
+atribuir_folgas_semana distribui de uma vez as folgas de uma ilha-semana
+(problema de atribuição). O OtimizadorFolgas é uma busca local com
+recozimento simulado aplicada depois da geração do mês.
+
+Depois da geração, as folgas de segunda a sexta são redistribuídas dentro de
+cada ilha-semana sem tocar no fim de semana: cada movimento troca o padrão
+semanal de uma pessoa por outro padrão válido com o mesmo sábado/domingo, ou
+troca dias de folga entre duas pessoas da mesma ilha-semana. Os movimentos
+só produzem padrões permitidos pela tabela de regras da ilha (regras.py),
+então nenhum precisa de revalidação completa.
+
+O custo tem duas parcelas, ambas atualizadas por delta:
+    - cobertura: soma dos quadrados das folgas por ilha-semana-dia (quanto
+      menor, mais espalhadas as folgas entre os dias)
+    - histórico: variância, por ilha e dia, das folgas acumuladas de cada
+      pessoa (o mesmo critério do ESTAT_FOLGAS)
+"""
+import math
+import time
+import random
+from typing import Dict, Optional
+
+import numpy as np
+
+from padroes import PADROES_VALIDOS
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+PESO_COBERTURA = 1.0
+PESO_HISTORICO = 1.0
+
+# Atribuição semanal: cada folga a mais no mesmo dia custa mais que qualquer
+# diferença de histórico, e repetir o dia da última folga é desestimulado
+PESO_CARGA_DIA = 100.0
+PESO_REPETICAO = 0.5
+
+_PADROES = np.array(PADROES_VALIDOS, dtype=np.uint8)
+_VALIDO = np.zeros(128, dtype=bool)
+_VALIDO[_PADROES] = True
+
+# Folga em dia útil por máscara (128 x 5)
+FOLGAS_UTEIS = (~np.unpackbits(np.arange(128, dtype=np.uint8)[:, None], axis=1,
+                               bitorder='little')[:, :5].astype(bool)).astype(np.int64)
+
+# Padrões alternativos com o mesmo fim de semana, por máscara válida
+_ALTERNATIVAS = {
+    int(m): np.array([p for p in PADROES_VALIDOS if p != m and (p & 0b1100000) == (m & 0b1100000)],
+                     dtype=np.int64)
+    for m in PADROES_VALIDOS
+}
+
+
+def atribuir_folgas_semana(contadores: np.ndarray, ultimas: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Escolhe o dia útil de folga de cada pessoa de uma ilha-semana, em conjunto
+
+    Cada dia tem ceil(k/5) vagas e a n-ésima vaga do dia custa n *
+    PESO_CARGA_DIA, de modo que as folgas se espalham pelos dias antes de
+    qualquer outra coisa; entre dias com a mesma carga vale o histórico
+    (contador_folgas) de cada pessoa. Resolvido com linear_sum_assignment;
+    sem SciPy, cada pessoa escolhe a vaga mais barata em sequência.
+
+    Args:
+        contadores: Folgas anteriores por pessoa e dia útil (k x 5)
+        ultimas: Dia da última folga de cada pessoa (-1 se nenhuma)
+
+    Returns:
+        Dia de folga (0=Seg ... 4=Sex) de cada pessoa
+    """
+    contadores = np.asarray(contadores, dtype=float)
+    k = len(contadores)
+    if not k:
+        return np.zeros(0, dtype=np.int64)
+
+    vagas = -(-k // 5)
+    base = contadores - contadores.min(axis=1, keepdims=True)
+    if ultimas is not None:
+        base = base + PESO_REPETICAO * (np.arange(5)[None, :] == np.asarray(ultimas)[:, None])
+
+    # Custo por (pessoa, dia, vaga) achatado em (pessoa, 5 * vagas)
+    custos = (base[:, :, None] + PESO_CARGA_DIA * np.arange(vagas)[None, None, :]).reshape(k, 5 * vagas)
+
+    if linear_sum_assignment is not None:
+        linhas, colunas = linear_sum_assignment(custos)
+        dias = np.empty(k, dtype=np.int64)
+        dias[linhas] = colunas // vagas
+        return dias
+
+    dias = np.empty(k, dtype=np.int64)
+    livres = np.ones(5 * vagas, dtype=bool)
+    for pessoa in np.argsort(custos.min(axis=1)):
+        coluna = int(np.argmin(np.where(livres, custos[pessoa], np.inf)))
+        livres[coluna] = False
+        dias[pessoa] = coluna // vagas
+    return dias
+
+
+class OtimizadorFolgas:
+    """
+    Estado da busca local sobre as máscaras semanais de um mês
+
+    Args:
+        mascaras: Máscara de cada linha (funcionário-semana), bit d = trabalha no dia d
+        funcionario_idx: Índice do funcionário de cada linha (0..n_funcionarios-1)
+        ilha_idx: Índice da ilha de cada linha
+        semana_idx: Índice da semana de cada linha (0..n_semanas-1)
+        historico: Folgas anteriores ao mês por funcionário e dia útil (n_funcionarios x 5)
+        peso_cobertura: Peso da parcela de cobertura
+        peso_historico: Peso da parcela de histórico
+        validos: Tabela de padrões válidos por ilha (n_ilhas x 128, RegrasEscala.tabelas);
+            sem ela, vale a união de padroes.PADROES_VALIDOS para todas
+    """
+
+    def __init__(self, mascaras: np.ndarray, funcionario_idx: np.ndarray, ilha_idx: np.ndarray,
+                 semana_idx: np.ndarray, historico: np.ndarray,
+                 peso_cobertura: float = PESO_COBERTURA, peso_historico: float = PESO_HISTORICO,
+                 validos: Optional[np.ndarray] = None):
+        self.mascaras = mascaras.astype(np.int64).copy()
+        self.funcionario_idx = funcionario_idx
+        self.ilha_idx = ilha_idx
+        self.semana_idx = semana_idx
+        self.peso_cobertura = peso_cobertura
+        self.peso_historico = peso_historico
+
+        n_funcionarios = historico.shape[0]
+        n_ilhas = int(ilha_idx.max()) + 1
+        n_semanas = int(semana_idx.max()) + 1
+        self.validos = validos if validos is not None else np.tile(_VALIDO, (n_ilhas, 1))
+
+        self.originais = self.mascaras.copy()
+        folgas = FOLGAS_UTEIS[self.mascaras]
+        self.acumulado = historico.astype(np.int64).copy()
+        np.add.at(self.acumulado, funcionario_idx, folgas)
+
+        ilha_funcionario = np.zeros(n_funcionarios, dtype=np.int64)
+        ilha_funcionario[funcionario_idx] = ilha_idx
+        self.tamanho_ilha = np.bincount(ilha_funcionario, minlength=n_ilhas).astype(float)
+        self.soma_ilha = np.zeros((n_ilhas, 5), dtype=np.int64)
+        np.add.at(self.soma_ilha, ilha_funcionario, self.acumulado)
+
+        self.cobertura = np.zeros((n_ilhas, n_semanas, 5), dtype=np.int64)
+        np.add.at(self.cobertura, (ilha_idx, semana_idx), folgas)
+
+        # Linhas móveis (padrão válido) agrupadas por ilha-semana
+        self.moveis = np.flatnonzero(self.validos[ilha_idx, self.mascaras])
+        grupo = ilha_idx * n_semanas + semana_idx
+        self.grupos = {g: self.moveis[grupo[self.moveis] == g] for g in np.unique(grupo[self.moveis])}
+        self.grupo = grupo
+
+    def custo(self) -> float:
+        """Custo total do estado atual"""
+        cobertura = float((self.cobertura ** 2).sum())
+        historico = float((self.acumulado ** 2).sum() - ((self.soma_ilha ** 2) / self.tamanho_ilha[:, None]).sum())
+        return self.peso_cobertura * cobertura + self.peso_historico * historico
+
+    # ------------------------------------------------------------------
+    # Movimentos
+    # ------------------------------------------------------------------
+
+    def deltas_padrao(self, linha: int, candidatos: np.ndarray) -> np.ndarray:
+        """Delta de custo (vetorizado) de trocar o padrão de uma linha por cada candidato"""
+        d = FOLGAS_UTEIS[candidatos] - FOLGAS_UTEIS[self.mascaras[linha]]  # k x 5
+        f, i, w = self.funcionario_idx[linha], self.ilha_idx[linha], self.semana_idx[linha]
+
+        d_cobertura = (2 * self.cobertura[i, w] * d + d * d).sum(axis=1)
+        d_historico = ((2 * self.acumulado[f] * d + d * d).sum(axis=1)
+                       - (2 * self.soma_ilha[i] * d + d * d).sum(axis=1) / self.tamanho_ilha[i])
+
+        return self.peso_cobertura * d_cobertura + self.peso_historico * d_historico
+
+    def aplicar_padrao(self, linha: int, nova: int):
+        d = FOLGAS_UTEIS[nova] - FOLGAS_UTEIS[self.mascaras[linha]]
+        f, i, w = self.funcionario_idx[linha], self.ilha_idx[linha], self.semana_idx[linha]
+
+        self.cobertura[i, w] += d
+        self.acumulado[f] += d
+        self.soma_ilha[i] += d
+        self.mascaras[linha] = nova
+
+    def troca_entre(self, linha_a: int, linha_b: int, rng: random.Random):
+        """
+        Sorteia uma troca de folga entre duas linhas da mesma ilha-semana
+
+        Returns:
+            (nova_a, nova_b, delta) ou None se não houver troca válida
+        """
+        a, b = self.mascaras[linha_a], self.mascaras[linha_b]
+        so_a = [d for d in range(5) if not a >> d & 1 and b >> d & 1]  # A folga, B trabalha
+        so_b = [d for d in range(5) if not b >> d & 1 and a >> d & 1]
+
+        if not so_a or not so_b:
+            return None
+
+        d, e = rng.choice(so_a), rng.choice(so_b)
+        nova_a = (a | (1 << d)) & ~(1 << e)
+        nova_b = (b | (1 << e)) & ~(1 << d)
+
+        i = self.ilha_idx[linha_a]
+        if not (self.validos[i, nova_a] and self.validos[i, nova_b]):
+            return None
+
+        # Cobertura e somas da ilha não mudam; só o acumulado das duas pessoas
+        fa, fb = self.funcionario_idx[linha_a], self.funcionario_idx[linha_b]
+        x = self.acumulado
+        delta = (-2 * x[fa, d] + 1 + 2 * x[fa, e] + 1) + (-2 * x[fb, e] + 1 + 2 * x[fb, d] + 1)
+
+        return nova_a, nova_b, self.peso_historico * float(delta)
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def otimizar(self, tempo_limite: float = 2.0, max_iteracoes: Optional[int] = None,
+                 temperatura_inicial: float = 4.0, temperatura_final: float = 0.05,
+                 semente: Optional[int] = None) -> Dict:
+        """
+        Recozimento simulado com orçamento de tempo
+
+        Args:
+            tempo_limite: Tempo máximo em segundos
+            max_iteracoes: Limite de iterações (opcional)
+            temperatura_inicial: Temperatura no início (aceita pioras)
+            temperatura_final: Temperatura no fim (quase só melhoras)
+            semente: Semente do sorteio
+
+        Returns:
+            Relatório com custos, iterações e movimentos aceitos
+        """
+        rng = random.Random(semente)
+        custo_inicial = custo = self.custo()
+        melhor_custo, melhor_mascaras = custo, self.mascaras.copy()
+        grupos = [g for g in self.grupos.values() if len(g)]
+
+        inicio = time.perf_counter()
+        iteracoes = aceitos = 0
+        temperatura = temperatura_inicial
+
+        while grupos:
+            if iteracoes % 256 == 0:
+                fracao = (time.perf_counter() - inicio) / tempo_limite if tempo_limite else 1.0
+                if fracao >= 1 or (max_iteracoes and iteracoes >= max_iteracoes):
+                    break
+                temperatura = temperatura_inicial * (temperatura_final / temperatura_inicial) ** fracao
+            iteracoes += 1
+
+            linhas = rng.choice(grupos)
+            linha = linhas[rng.randrange(len(linhas))]
+
+            if rng.random() < 0.5 or len(linhas) < 2:
+                candidatos = _ALTERNATIVAS[int(self.mascaras[linha])]
+                candidatos = candidatos[self.validos[self.ilha_idx[linha], candidatos]]
+                if not len(candidatos):
+                    continue
+                deltas = self.deltas_padrao(linha, candidatos)
+                j = rng.randrange(len(candidatos))
+                delta = float(deltas[j])
+                if delta <= 0 or rng.random() < math.exp(-delta / temperatura):
+                    self.aplicar_padrao(linha, int(candidatos[j]))
+                    custo += delta
+                    aceitos += 1
+            else:
+                outra = linhas[rng.randrange(len(linhas))]
+                troca = self.troca_entre(linha, outra, rng) if outra != linha else None
+                if troca is None:
+                    continue
+                nova_a, nova_b, delta = troca
+                if delta <= 0 or rng.random() < math.exp(-delta / temperatura):
+                    self.aplicar_padrao(linha, nova_a)
+                    self.aplicar_padrao(outra, nova_b)
+                    custo += delta
+                    aceitos += 1
+
+            if custo < melhor_custo - 1e-9:
+                melhor_custo, melhor_mascaras = custo, self.mascaras.copy()
+
+        # Voltar ao melhor estado visto
+        for linha in np.flatnonzero(melhor_mascaras != self.mascaras):
+            self.aplicar_padrao(linha, int(melhor_mascaras[linha]))
+
+        return {
+            'custo_inicial': round(custo_inicial, 3),
+            'custo_final': round(self.custo(), 3),
+            'iteracoes': iteracoes,
+            'aceitos': aceitos,
+            'linhas_alteradas': int((self.mascaras != self.originais).sum()),
+            'segundos': round(time.perf_counter() - inicio, 3)
+        }
@@ -0,0 +1,204 @@
+"""
+Codificação das escalas por padrão semanal
+
+Cada funcionário-semana é uma das poucas combinações válidas de P/F. A escala
+de um mês é guardada como um byte (ID do padrão) por funcionário-semana, mais o
+dicionário de padrões (máscaras uint8, bit d = trabalha no dia d). O DataFrame
+só é montado quando pedido; contagens saem direto do histograma de padrões.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from esquema import DIAS_SEMANA, compactar_escala
+from historico import escrita_atomica
+from indices import mascaras_semanais
+from regras import REGRAS
+
+# Máscaras válidas em alguma ilha segundo regras_escala.json (ver regras.py)
+PADROES_VALIDOS: List[int] = np.flatnonzero(REGRAS.todos).tolist()
+
+
+def matriz_dias(dicionario: np.ndarray) -> np.ndarray:
+    """Matriz padrões x 7 com 1 nos dias trabalhados"""
+    return np.unpackbits(dicionario[:, None], axis=1, bitorder='little')[:, :len(DIAS_SEMANA)]
+
+
+def codificar_escala(df_escala: pd.DataFrame, ids_funcionarios: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """
+    Codifica uma escala em arrays compactos
+
+    Args:
+        df_escala: Escala do mês (compacta ou 'P'/'F')
+        ids_funcionarios: Mapa nome -> ID global do funcionário
+
+    Returns:
+        Dicionário de arrays prontos para np.savez
+    """
+    mascaras = mascaras_semanais(df_escala)
+
+    # Padrões válidos têm IDs fixos; máscaras fora da regra vão para o fim
+    extras = sorted(set(mascaras.tolist()) - set(PADROES_VALIDOS))
+    dicionario = np.array(PADROES_VALIDOS + extras, dtype=np.uint8)
+    id_por_mascara = np.zeros(1 << 8, dtype=np.uint8)
+    id_por_mascara[dicionario] = np.arange(len(dicionario), dtype=np.uint8)
+
+    ilhas = df_escala['Ilha'].astype(str).to_numpy()
+    nomes_ilhas, codigos_ilhas = np.unique(ilhas, return_inverse=True)
+
+    return {
+        'ano': np.array(int(df_escala['Ano'].iloc[0]), dtype=np.uint16),
+        'mes': np.array(int(df_escala['Mês'].iloc[0]), dtype=np.uint8),
+        'funcionarios': np.array([ids_funcionarios[n] for n in df_escala['Funcionário'].astype(str)],
+                                 dtype=np.uint32),
+        'ilhas': codigos_ilhas.astype(np.uint8),
+        'nomes_ilhas': nomes_ilhas.astype(str),
+        'semanas': df_escala['Semana do Mês'].to_numpy().astype(np.uint8),
+        'padroes': id_por_mascara[mascaras],
+        'dicionario': dicionario
+    }
+
+
+class EscalaCodificada:
+    """Escala de um mês em IDs de padrão, com decodificação sob demanda"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], nomes: List[str]):
+        self.ano = int(arrays['ano'])
+        self.mes = int(arrays['mes'])
+        self.funcionarios = arrays['funcionarios']
+        self.ilhas = arrays['ilhas']
+        self.nomes_ilhas = [str(i) for i in arrays['nomes_ilhas']]
+        self.semanas = arrays['semanas']
+        self.padroes = arrays['padroes']
+        self.dicionario = arrays['dicionario']
+        self.versao = arrays['versao'].tolist() if 'versao' in arrays else None
+        self.nomes = nomes
+
+    def __len__(self):
+        return len(self.padroes)
+
+    def memoria(self) -> int:
+        """Memória ocupada pelos arrays da escala em bytes (sem o registro de nomes)"""
+        return sum(a.nbytes for a in (self.funcionarios, self.ilhas, self.semanas, self.padroes, self.dicionario))
+
+    def histograma(self) -> np.ndarray:
+        """Quantidade de funcionário-semanas por padrão"""
+        return np.bincount(self.padroes, minlength=len(self.dicionario))
+
+    def dias_por_funcionario(self) -> Dict[str, np.ndarray]:
+        """
+        Dias trabalhados por dia da semana de cada funcionário, via histograma
+        (funcionário x padrão) multiplicado pela matriz de dias dos padrões
+        """
+        ids, posicao = np.unique(self.funcionarios, return_inverse=True)
+        qtd_padroes = len(self.dicionario)
+        histograma = np.bincount(posicao * qtd_padroes + self.padroes,
+                                 minlength=len(ids) * qtd_padroes).reshape(len(ids), qtd_padroes)
+        dias = histograma @ matriz_dias(self.dicionario).astype(np.int64)
+
+        return {self.nomes[i]: dias[k] for k, i in enumerate(ids.tolist())}
+
+    def contadores_fim_semana(self) -> Dict[str, Dict[str, int]]:
+        """Sábados, domingos e total por funcionário (mesmo formato de calcular_contadores)"""
+        return {
+            nome: {'sabados': int(dias[5]), 'domingos': int(dias[6]), 'total': int(dias[5] + dias[6])}
+            for nome, dias in self.dias_por_funcionario().items()
+        }
+
+    def resumo(self) -> Dict[str, int]:
+        """Registros, semanas, funcionários e dias trabalhados do mês, sem decodificar"""
+        dias_por_padrao = matriz_dias(self.dicionario).sum(axis=1).astype(np.int64)
+        return {
+            'registros': len(self),
+            'semanas': len(np.unique(self.semanas)),
+            'funcionarios': len(np.unique(self.funcionarios)),
+            'dias_trabalhados': int(self.histograma() @ dias_por_padrao)
+        }
+
+    def filtrar(self, ilha: Optional[str] = None, semana: Optional[int] = None,
+                funcionario: Optional[str] = None, semanas: Optional[Tuple[int, int]] = None,
+                funcionarios: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Posições das linhas que atendem aos filtros, sem decodificar a escala
+
+        Args:
+            ilha: Nome exato da ilha
+            semana: Semana do mês
+            funcionario: Trecho do nome do funcionário (sem diferenciar maiúsculas)
+            semanas: Intervalo (inicial, final) de semanas, inclusive
+            funcionarios: Nomes exatos dos funcionários
+        """
+        selecao = np.ones(len(self), dtype=bool)
+
+        if ilha is not None:
+            if ilha not in self.nomes_ilhas:
+                return np.array([], dtype=np.int64)
+            selecao &= self.ilhas == self.nomes_ilhas.index(ilha)
+
+        if semana is not None:
+            selecao &= self.semanas == semana
+
+        if semanas is not None:
+            selecao &= (self.semanas >= semanas[0]) & (self.semanas <= semanas[1])
+
+        if funcionarios is not None:
+            procurados = set(funcionarios)
+            ids = [i for i in np.unique(self.funcionarios).tolist() if self.nomes[i] in procurados]
+            selecao &= np.isin(self.funcionarios, ids)
+
+        if funcionario:
+            trecho = funcionario.casefold()
+            ids = [i for i in np.unique(self.funcionarios).tolist() if trecho in self.nomes[i].casefold()]
+            selecao &= np.isin(self.funcionarios, ids)
+
+        return np.flatnonzero(selecao)
+
+    def mascaras(self) -> np.ndarray:
+        """Máscara uint8 de cada funcionário-semana"""
+        return self.dicionario[self.padroes]
+
+    def dataframe(self, linhas: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Decodifica para DataFrame compacto (todas as linhas ou apenas `linhas`)
+
+        Args:
+            linhas: Índices ou máscara booleana das linhas desejadas
+        """
+        sel = slice(None) if linhas is None else linhas
+        dias = matriz_dias(self.dicionario)[self.padroes[sel]].astype(bool)
+        trabalhados = dias.sum(axis=1).astype(np.uint8)
+        nomes = np.array(self.nomes, dtype=object)
+
+        df = pd.DataFrame({
+            'Ano': self.ano,
+            'Mês': self.mes,
+            'Semana do Mês': self.semanas[sel],
+            'Funcionário': nomes[self.funcionarios[sel]],
+            'Ilha': np.array(self.nomes_ilhas, dtype=object)[self.ilhas[sel]]
+        })
+        for d, dia in enumerate(DIAS_SEMANA):
+            df[dia] = dias[:, d]
+        df['Dias Trabalhados'] = trabalhados
+        df['Folgas'] = len(DIAS_SEMANA) - trabalhados
+
+        return compactar_escala(df)
+
+
+def gravar_escala_codificada(caminho: str, arrays: Dict[str, np.ndarray], versao: List[int]):
+    """Grava os arrays codificados (com a versão do Excel de origem)"""
+    with escrita_atomica(caminho, sufixo='.tmp.npz') as temporario:
+        np.savez_compressed(temporario, versao=np.array(versao, dtype=np.int64), **arrays)
+
+
+def ler_versao_codificada(caminho: str) -> Optional[List[int]]:
+    """Versão gravada numa escala codificada, sem ler os demais arrays"""
+    with np.load(caminho) as dados:
+        return dados['versao'].tolist() if 'versao' in dados.files else None
+
+
+def ler_escala_codificada(caminho: str, nomes: List[str]) -> EscalaCodificada:
+    """Lê uma escala codificada gravada por gravar_escala_codificada"""
+    with np.load(caminho) as dados:
+        return EscalaCodificada({chave: dados[chave] for chave in dados.files}, nomes)
@@ -0,0 +1,112 @@
+"""
+Busca em portfólio: várias gerações independentes do mesmo mês
+
+O motor guloso depende da ordem das filas de rodízio e de sorteios internos,
+então gerações com sementes diferentes chegam a escalas de qualidade
+diferente. Cada candidato roda em um processo próprio, a partir de uma cópia
+do estado do rodízio, com a saída do terminal silenciada; o sistema fica com
+o melhor candidato e adota o estado de rodízio que ele deixou.
+"""
+import io
+import os
+import copy
+import random
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _gerar_candidato(estado: Tuple, ano: int, mes: int, semanas: int, semente: int) -> Dict:
+    """Gera e pontua um candidato (executado no processo filho)"""
+    from sistema_escala import SistemaEscalaExcel
+
+    random.seed(semente)
+    np.random.seed(semente % 2 ** 32)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sistema = SistemaEscalaExcel()
+        # Cópia: no modo sem processos o estado chega por referência
+        funcionarios, sistema.rodizio_ilhas, sistema.rodizio_folgas = copy.deepcopy(estado)
+
+        # Ordem de desempate diferente por semente: as filas são reordenadas
+        # de forma estável a partir desta ordem (inclusive ao ler o histórico)
+        sistema.funcionarios = {ilha: random.sample(lista, len(lista)) for ilha, lista in funcionarios.items()}
+        for ilha, lista in sistema.funcionarios.items():
+            rodizio = sistema.rodizio_ilhas[ilha]
+            rodizio['fila_domingo'] = deque(sorted(lista, key=lambda f: rodizio['domingos_pegos'][f]))
+            rodizio['fila_sabado'] = deque(sorted(lista, key=lambda f: rodizio['sabados_pegos'][f]))
+
+        df_escala = sistema.gerar_escala_mensal(ano, mes, semanas)
+        pontuacao = sistema.pontuar_escala(df_escala)
+
+    # Voltar para a ordem oficial de funcionários
+    ordem = {f: i for i, f in enumerate(f for lista in funcionarios.values() for f in lista)}
+    posicoes = np.lexsort((df_escala['Funcionário'].astype(str).map(ordem).to_numpy(),
+                           df_escala['Semana do Mês'].to_numpy()))
+    df_escala = df_escala.iloc[posicoes].reset_index(drop=True)
+
+    return {
+        'semente': semente,
+        'escala': df_escala,
+        'estado': (sistema.rodizio_ilhas, sistema.rodizio_folgas),
+        'pontuacao': pontuacao
+    }
+
+
+def executar_portfolio(estado: Tuple, ano: int, mes: int, semanas: int,
+                       sementes: List[int], max_processos: Optional[int] = None) -> Tuple[List[Dict], List]:
+    """
+    Gera um candidato por semente, em paralelo
+
+    Args:
+        estado: (funcionarios, rodizio_ilhas, rodizio_folgas) no início do mês
+        ano: Ano da escala
+        mes: Mês da escala
+        semanas: Número de semanas
+        sementes: Uma semente por candidato
+        max_processos: Limite de processos simultâneos (padrão: núcleos da CPU)
+
+    Returns:
+        Tupla (candidatos, falhas), falhas como lista de (semente, mensagem)
+    """
+    candidatos = []
+    falhas = []
+
+    limite = max(1, min(max_processos or os.cpu_count() or 1, len(sementes)))
+
+    if limite == 1:
+        for semente in sementes:
+            try:
+                candidatos.append(_gerar_candidato(estado, ano, mes, semanas, semente))
+            except Exception as e:
+                falhas.append((semente, f"{type(e).__name__}: {e}"))
+        return candidatos, falhas
+
+    with ProcessPoolExecutor(max_workers=limite) as executor:
+        futuros = [executor.submit(_gerar_candidato, estado, ano, mes, semanas, semente) for semente in sementes]
+
+        for semente, futuro in zip(sementes, futuros):
+            try:
+                candidatos.append(futuro.result())
+            except Exception as e:
+                falhas.append((semente, f"{type(e).__name__}: {e}"))
+
+    return candidatos, falhas
+
+
+def resumir_pontuacoes(candidatos: List[Dict]) -> Dict:
+    """Distribuição das pontuações dos candidatos (menor é melhor)"""
+    valores = np.array([c['pontuacao']['total'] for c in candidatos], dtype=float)
+
+    return {
+        'candidatos': len(valores),
+        'melhor': float(valores.min()),
+        'pior': float(valores.max()),
+        'media': float(valores.mean()),
+        'mediana': float(np.median(valores)),
+        'p90': float(np.percentile(valores, 90)),
+        'pontuacoes': sorted(valores.tolist())
+    }
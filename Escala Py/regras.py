@@ -0,0 +1,347 @@
+"""
+Regras de negócio da escala: configuração declarativa compilada em NumPy
+
+As regras ficam em regras_escala.json (ou no arquivo apontado por
+ESCALA_REGRAS), com um bloco "padrao" para todas as ilhas, sobrescritas por
+ilha em "ilhas" e a cobertura do fim de semana do site em "cobertura" (só
+sábado e domingo, que são os dias que a geração distribui):
+
+    {
+      "padrao": {"dias_trabalhados": 5, "folgas_seguidas_uteis": false,
+                 "sabado_e_domingo": false, "tolerancia_folgas": 0.5},
+      "cobertura": {"Sáb": 8, "Dom": 3},
+      "ilhas": {"ILHA X": {"sabado_e_domingo": true, "cobertura": {"Sáb": 2}}}
+    }
+
+O arquivo é lido uma vez e compilado:
+    - por ilha, uma tabela de 128 posições diz se a máscara semanal (bit d =
+      trabalha no dia d) é válida. Geração, motor exato, otimizador e edição
+      escolhem padrões por essa tabela, e validar um padrão é uma consulta
+    - a cobertura do site é repartida entre as ilhas (metas_fim_de_semana):
+      ilhas com cobertura própria ficam com ela, as demais dividem o resto,
+      revezando semana a semana quem fica com uma pessoa a menos. A geração
+      (gulosa e exata) e a pontuação usam essas metas
+    - a verificação da escala inteira (dias, folgas seguidas, fim de semana,
+      cobertura e distribuição das folgas) são operações sobre a matriz
+      linhas x 7, sem laço por funcionário
+"""
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from esquema import DIAS_SEMANA
+
+REGRAS_PADRAO = {
+    'dias_trabalhados': 5,           # Dias trabalhados por semana
+    'folgas_seguidas_uteis': False,  # Permite duas folgas seguidas de segunda a sexta
+    'sabado_e_domingo': False,       # Permite trabalhar sábado e domingo na mesma semana
+    'tolerancia_folgas': 0.5         # Desvio aceito nas folgas por dia útil da ilha (fração da média)
+}
+
+COBERTURA_PADRAO = {'Sáb': 8, 'Dom': 3}
+DIAS_COBERTURA = list(COBERTURA_PADRAO)
+
+ARQUIVO_REGRAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regras_escala.json')
+
+SABADO, DOMINGO = DIAS_SEMANA.index('Sáb'), DIAS_SEMANA.index('Dom')
+
+# Dias trabalhados de cada máscara semanal possível (128 x 7)
+DIAS_MASCARA = np.unpackbits(np.arange(1 << len(DIAS_SEMANA), dtype=np.uint8)[:, None], axis=1,
+                             bitorder='little')[:, :len(DIAS_SEMANA)].astype(bool)
+
+FIM_DE_SEMANA = (1 << SABADO) | (1 << DOMINGO)
+
+
+def _folga_seguida(trabalha: np.ndarray) -> np.ndarray:
+    """Primeiro dia útil de um par de folgas seguidas por linha (-1 se não houver)"""
+    seguidas = ~trabalha[:, :SABADO - 1] & ~trabalha[:, 1:SABADO]
+    return np.where(seguidas.any(axis=1), seguidas.argmax(axis=1), -1)
+
+
+def compilar_padroes(regras: Dict) -> np.ndarray:
+    """
+    Tabela de validade das 128 máscaras semanais para um conjunto de regras
+
+    Args:
+        regras: Regras de uma ilha (REGRAS_PADRAO com sobrescritas)
+
+    Returns:
+        Vetor booleano indexado pela máscara
+    """
+    valido = DIAS_MASCARA.sum(axis=1) == regras['dias_trabalhados']
+
+    if not regras['sabado_e_domingo']:
+        valido &= ~(DIAS_MASCARA[:, SABADO] & DIAS_MASCARA[:, DOMINGO])
+    if not regras['folgas_seguidas_uteis']:
+        valido &= _folga_seguida(DIAS_MASCARA) < 0
+
+    return valido
+
+
+def _conferir_chaves(regras: Dict, permitidas, origem: str):
+    desconhecidas = set(regras) - set(permitidas)
+    if desconhecidas:
+        raise ValueError(f"Regras desconhecidas em {origem}: {', '.join(sorted(desconhecidas))}")
+
+
+class RegrasEscala:
+    """Regras do site e das ilhas, compiladas em tabelas de padrões"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: Dicionário no formato de regras_escala.json (None = regras padrão)
+        """
+        config = config or {}
+        _conferir_chaves(config, ['padrao', 'cobertura', 'ilhas'], 'regras')
+        _conferir_chaves(config.get('padrao', {}), REGRAS_PADRAO, 'padrao')
+        _conferir_chaves(config.get('cobertura', {}), DIAS_COBERTURA, 'cobertura')
+
+        self.config = config
+
+        self.padrao = dict(REGRAS_PADRAO, **config.get('padrao', {}))
+        self.cobertura = dict(COBERTURA_PADRAO, **config.get('cobertura', {}))
+        self.ilhas = {}
+        self.cobertura_ilhas = {}
+
+        for ilha, sobrescritas in config.get('ilhas', {}).items():
+            sobrescritas = dict(sobrescritas)
+            cobertura = sobrescritas.pop('cobertura', None)
+            _conferir_chaves(sobrescritas, REGRAS_PADRAO, ilha)
+
+            self.ilhas[ilha] = dict(self.padrao, **sobrescritas)
+            if cobertura:
+                _conferir_chaves(cobertura, DIAS_COBERTURA, f"{ilha}.cobertura")
+                self.cobertura_ilhas[ilha] = cobertura
+
+        self._tabelas = {ilha: compilar_padroes(regras) for ilha, regras in self.ilhas.items()}
+        self._tabela_padrao = compilar_padroes(self.padrao)
+
+        # União de todas as ilhas (dicionário de padrões do motor exato e da codificação)
+        self.todos = self._tabela_padrao.copy()
+        for tabela in self._tabelas.values():
+            self.todos |= tabela
+
+        # Muda sempre que alguma regra efetiva muda (invalida validações em cache)
+        efetivas = json.dumps([self.padrao, self.cobertura, self.ilhas, self.cobertura_ilhas],
+                              sort_keys=True, ensure_ascii=False)
+        self.assinatura = hashlib.sha1(efetivas.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def carregar(cls, caminho: Optional[str] = None) -> 'RegrasEscala':
+        """
+        Lê as regras de um arquivo JSON (regras padrão se ele não existir)
+
+        Args:
+            caminho: Arquivo de regras (padrão: ESCALA_REGRAS ou regras_escala.json)
+        """
+        caminho = caminho or os.environ.get('ESCALA_REGRAS') or ARQUIVO_REGRAS
+
+        if not os.path.exists(caminho):
+            return cls()
+
+        with open(caminho, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def com_cobertura(self, cobertura: Dict) -> 'RegrasEscala':
+        """Mesmas regras com outra cobertura do site (simulação de políticas)"""
+        return RegrasEscala(dict(self.config, cobertura=dict(self.cobertura, **cobertura)))
+
+    # ------------------------------------------------------------------
+    # Cobertura do fim de semana
+    # ------------------------------------------------------------------
+
+    def metas_fim_de_semana(self, ilhas: List[str], semana: int,
+                            ciclo: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Pessoas por ilha no sábado e no domingo de uma semana
+
+        Ilhas com cobertura própria ficam com a sua meta e o resto da meta do
+        site é dividido entre as demais. Se a divisão não for exata, as ilhas
+        com uma pessoa a menos se revezam: a sequência começa na ilha de
+        `ciclo` para a semana (como o ciclo da ilha sem domingo).
+
+        Args:
+            ilhas: Ilhas na ordem do sistema
+            semana: Semana do mês (0-based)
+            ciclo: Índice da ilha que começa o revezamento em cada semana
+
+        Returns:
+            Matriz ilhas x 2 (sábado, domingo)
+
+        Raises:
+            ValueError: Se a cobertura do site não puder ser repartida
+        """
+        ciclo = ciclo or list(range(len(ilhas)))
+        metas = np.zeros((len(ilhas), len(DIAS_COBERTURA)), dtype=np.int64)
+
+        for d, dia in enumerate(DIAS_COBERTURA):
+            proprias = {i: self.cobertura_ilhas[ilha][dia] for i, ilha in enumerate(ilhas)
+                        if dia in self.cobertura_ilhas.get(ilha, {})}
+            livres = [i for i in range(len(ilhas)) if i not in proprias]
+            resto = self.cobertura[dia] - sum(proprias.values())
+
+            if resto < 0 or (resto and not livres):
+                raise ValueError(f"Cobertura de {dia} do site ({self.cobertura[dia]}) incompatível "
+                                 f"com as metas das ilhas ({sum(proprias.values())})")
+
+            for i, meta in proprias.items():
+                metas[i, d] = meta
+            if not livres:
+                continue
+
+            base, extra = divmod(resto, len(livres))
+            inicio = ciclo[semana % len(ciclo)]
+            inicio = livres.index(inicio) if inicio in livres else inicio % len(livres)
+            com_menos = {livres[(inicio + j) % len(livres)] for j in range(len(livres) - extra)}
+
+            for i in livres:
+                metas[i, d] = base + (i not in com_menos)
+
+        return metas
+
+    def conferir_cobertura(self, funcionarios: Dict[str, List[str]], ciclo: Optional[List[int]] = None,
+                           semanas: int = 6):
+        """
+        Confere se a cobertura configurada pode ser gerada para as ilhas
+
+        Cada ilha precisa de pessoas distintas para o sábado e o domingo.
+
+        Raises:
+            ValueError: Com o motivo, se a cobertura for impossível
+        """
+        ilhas = list(funcionarios)
+        desconhecidas = set(self.cobertura_ilhas) - set(ilhas)
+        if desconhecidas:
+            raise ValueError(f"Cobertura para ilhas desconhecidas: {', '.join(sorted(desconhecidas))}")
+
+        for semana in range(semanas):
+            metas = self.metas_fim_de_semana(ilhas, semana, ciclo)
+            for ilha, (sabado, domingo) in zip(ilhas, metas):
+                if sabado + domingo > len(funcionarios[ilha]):
+                    raise ValueError(f"{ilha}: {sabado} no sábado e {domingo} no domingo com "
+                                     f"{len(funcionarios[ilha])} funcionários")
+
+    # ------------------------------------------------------------------
+    # Padrões semanais
+    # ------------------------------------------------------------------
+
+    def da_ilha(self, ilha: Optional[str] = None) -> Dict:
+        """Regras efetivas de uma ilha"""
+        return self.ilhas.get(ilha, self.padrao)
+
+    def tabela(self, ilha: Optional[str] = None) -> np.ndarray:
+        """Validade das 128 máscaras para a ilha"""
+        return self._tabelas.get(ilha, self._tabela_padrao)
+
+    def tabelas(self, ilhas: List[str]) -> np.ndarray:
+        """Tabelas de várias ilhas empilhadas (ilhas x 128)"""
+        return np.array([self.tabela(ilha) for ilha in ilhas], dtype=bool)
+
+    def padroes_validos(self, ilha: Optional[str] = None) -> List[int]:
+        """Máscaras válidas para a ilha, em ordem"""
+        return np.flatnonzero(self.tabela(ilha)).tolist()
+
+    def padrao_valido(self, mascara: int, ilha: Optional[str] = None) -> bool:
+        """Se a máscara semanal atende às regras da ilha"""
+        return bool(self.tabela(ilha)[int(mascara)])
+
+    def ajustar_padrao(self, mascara: int, ilha: Optional[str] = None) -> int:
+        """
+        Padrão válido mais próximo (menos dias alterados), mantendo o fim de semana
+
+        Se nenhum padrão válido tiver o mesmo sábado/domingo, o fim de semana
+        também pode mudar.
+        """
+        if self.padrao_valido(mascara, ilha):
+            return int(mascara)
+
+        validos = np.flatnonzero(self.tabela(ilha))
+        mesmo_fim = validos[(validos & FIM_DE_SEMANA) == (mascara & FIM_DE_SEMANA)]
+        candidatos = mesmo_fim if len(mesmo_fim) else validos
+        if not len(candidatos):
+            raise ValueError(f"Nenhum padrão semanal atende às regras de {ilha or 'padrao'}")
+
+        distancias = (DIAS_MASCARA[candidatos] != DIAS_MASCARA[mascara]).sum(axis=1)
+        return int(candidatos[distancias.argmin()])
+
+    # ------------------------------------------------------------------
+    # Verificação da escala
+    # ------------------------------------------------------------------
+
+    def verificar(self, trabalha: np.ndarray, ilhas: np.ndarray, semanas: np.ndarray,
+                  funcionarios: np.ndarray) -> Dict:
+        """
+        Aplica todas as regras a uma escala de uma vez
+
+        Args:
+            trabalha: Matriz linhas x 7 (True = trabalha)
+            ilhas: Ilha de cada linha
+            semanas: Semana do mês de cada linha
+            funcionarios: Funcionário de cada linha
+
+        Returns:
+            Dicionário de arrays: por linha (dias, dias_esperados, folga_seguida,
+            sabado_e_domingo), cobertura por semana, cobertura por ilha-semana
+            e folgas por ilha e dia útil
+        """
+        trabalha = np.asarray(trabalha, dtype=bool)
+        nomes_ilhas, ilha_idx = np.unique(np.asarray(ilhas).astype(str), return_inverse=True)
+        lista_semanas, semana_idx = np.unique(np.asarray(semanas), return_inverse=True)
+
+        # Regras de cada ilha como vetores indexados pela linha
+        regras_ilhas = [self.da_ilha(ilha) for ilha in nomes_ilhas]
+        dias_esperados = np.array([r['dias_trabalhados'] for r in regras_ilhas], dtype=np.int64)[ilha_idx]
+        proibe_seguidas = np.array([not r['folgas_seguidas_uteis'] for r in regras_ilhas], dtype=bool)[ilha_idx]
+        proibe_fim = np.array([not r['sabado_e_domingo'] for r in regras_ilhas], dtype=bool)[ilha_idx]
+
+        folga_seguida = np.where(proibe_seguidas, _folga_seguida(trabalha), -1)
+        sabado_e_domingo = proibe_fim & trabalha[:, SABADO] & trabalha[:, DOMINGO]
+
+        # Cobertura do site por semana
+        cobertura = {
+            dia: (np.bincount(semana_idx, weights=trabalha[:, DIAS_SEMANA.index(dia)],
+                              minlength=len(lista_semanas)).astype(np.int64), meta)
+            for dia, meta in self.cobertura.items()
+        }
+
+        # Cobertura por ilha-semana (só ilhas com meta própria)
+        por_ilha_semana = np.zeros((len(nomes_ilhas), len(lista_semanas), len(DIAS_SEMANA)), dtype=np.int64)
+        np.add.at(por_ilha_semana, (ilha_idx, semana_idx), trabalha)
+        cobertura_ilhas = []
+        for i, ilha in enumerate(nomes_ilhas):
+            for dia, meta in self.cobertura_ilhas.get(ilha, {}).items():
+                pessoas = por_ilha_semana[i, :, DIAS_SEMANA.index(dia)]
+                cobertura_ilhas.extend((ilha, lista_semanas[w], dia, int(pessoas[w]), meta)
+                                       for w in np.flatnonzero(pessoas != meta))
+
+        # Folgas por ilha e dia útil contra a média esperada
+        folgas_dia = np.zeros((len(nomes_ilhas), SABADO), dtype=np.int64)
+        np.add.at(folgas_dia, ilha_idx, ~trabalha[:, :SABADO])
+        _, funcionario_idx = np.unique(np.asarray(funcionarios).astype(str), return_inverse=True)
+        pares = np.unique(np.column_stack([ilha_idx, funcionario_idx]), axis=0)
+        funcionarios_ilha = np.bincount(pares[:, 0], minlength=len(nomes_ilhas))
+        folgas_semana = len(DIAS_SEMANA) - np.array([r['dias_trabalhados'] for r in regras_ilhas])
+        folgas_esperadas = funcionarios_ilha * folgas_semana * len(lista_semanas) / SABADO
+        tolerancia = np.array([r['tolerancia_folgas'] for r in regras_ilhas])
+        desbalanceadas = np.abs(folgas_dia - folgas_esperadas[:, None]) > (folgas_esperadas * tolerancia)[:, None]
+
+        return {
+            'dias': trabalha.sum(axis=1),
+            'dias_esperados': dias_esperados,
+            'folga_seguida': folga_seguida,
+            'sabado_e_domingo': sabado_e_domingo,
+            'semanas': lista_semanas,
+            'cobertura': cobertura,
+            'cobertura_ilhas': cobertura_ilhas,
+            'ilhas': nomes_ilhas,
+            'folgas_dia': folgas_dia,
+            'folgas_esperadas': folgas_esperadas,
+            'folgas_desbalanceadas': desbalanceadas
+        }
+
+
+REGRAS = RegrasEscala.carregar()
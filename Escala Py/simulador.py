@@ -0,0 +1,205 @@
+"""
+Simulador Monte Carlo de políticas de rodízio
+
+Roda muitos anos simulados do motor de rodízio para comparar políticas antes
+de adotá-las: cobertura do site no sábado e no domingo (cobertura, repartida
+entre as ilhas como na geração), ciclo da ilha sem domingo (ciclo_sem_domingo)
+e a regra "só repete quando todos já pegaram" (rodada_completa).
+
+A escolha de fim de semana e a distribuição de folgas usam os mesmos métodos
+da geração (escolher_fim_de_semana_ilha, distribuir_folgas_ilha,
+registrar_folga e reconstruir_rodizio a cada virada de mês); só a montagem
+do DataFrame e o Excel ficam de fora. Os resultados são acumulados em arrays
+NumPy (réplica x ano x funcionário) e as réplicas rodam em paralelo.
+
+Uso:
+    python simulador.py [--replicas N] [--anos N] [--sabado N] [--domingo N] [--ciclo 0,1,2,3]
+                        [--sem-rodada-completa] [--processos N]
+"""
+import io
+import os
+import json
+import random
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+POLITICA_PADRAO = {
+    'cobertura': {},                  # Sobrescreve a cobertura de regras_escala.json ({'Sáb': n, 'Dom': n})
+    'ciclo_sem_domingo': [0, 1, 2, 3],
+    'rodada_completa': True
+}
+
+PERCENTIS = [50, 90, 99]
+
+
+def _simular_replicas(politica: Dict, sementes: List[int], anos: int, semanas_por_mes: int) -> Dict:
+    """Simula um lote de réplicas (executado no processo filho)"""
+    from sistema_escala import SistemaEscalaExcel
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        base = SistemaEscalaExcel()
+
+    nomes = [f for lista in base.funcionarios.values() for f in lista]
+    posicao = {f: i for i, f in enumerate(nomes)}
+    forma = (len(sementes), anos, len(nomes))
+    domingos = np.zeros(forma, dtype=np.int16)
+    sabados = np.zeros(forma, dtype=np.int16)
+    folgas = np.zeros(forma + (5,), dtype=np.int16)
+
+    for r, semente in enumerate(sementes):
+        rng = random.Random(semente)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema = SistemaEscalaExcel()
+            for chave, valor in politica.items():
+                if chave == 'cobertura':
+                    sistema.regras = sistema.regras.com_cobertura(valor)
+                else:
+                    setattr(sistema, chave, valor)
+            sistema.regras.conferir_cobertura(sistema.funcionarios, sistema.ciclo_sem_domingo)
+
+            # Ordem inicial das filas diferente em cada réplica
+            sistema.funcionarios = {ilha: rng.sample(lista, len(lista)) for ilha, lista in base.funcionarios.items()}
+            sistema.inicializar_rodizio()
+            ilhas = list(sistema.funcionarios)
+
+            for ano in range(anos):
+                for mes in range(12):
+                    # Virada de mês: filas reordenadas pelos contadores acumulados
+                    sistema.reconstruir_rodizio({
+                        f: {'domingos_trabalhados': rodizio['domingos_pegos'][f],
+                            'sabados_trabalhados': rodizio['sabados_pegos'][f]}
+                        for rodizio in sistema.rodizio_ilhas.values() for f in rodizio['domingos_pegos']
+                    })
+
+                    for semana_num in range(1, semanas_por_mes + 1):
+                        metas = sistema.metas_fim_de_semana(semana_num)
+
+                        for ilha in ilhas:
+                            domingo, sabado = sistema.escolher_fim_de_semana_ilha(ilha, *metas[ilha])
+                            fim_de_semana = sabado + domingo
+
+                            for f in domingo:
+                                domingos[r, ano, posicao[f]] += 1
+                            for f in sabado:
+                                sabados[r, ano, posicao[f]] += 1
+
+                            escolhidas = sistema.distribuir_folgas_ilha(
+                                ilha, [f for f in sistema.funcionarios[ilha] if f in fim_de_semana]
+                            )
+                            for f, dias in escolhidas.items():
+                                for dia in dias:
+                                    sistema.registrar_folga(ilha, f, dia)
+                                    folgas[r, ano, posicao[f], dia] += 1
+
+    return {'domingos': domingos, 'sabados': sabados, 'folgas': folgas}
+
+
+def simular(politica: Optional[Dict] = None, replicas: int = 1000, anos: int = 1,
+            semanas_por_mes: int = 4, semente: int = 0, max_processos: Optional[int] = None) -> Dict:
+    """
+    Simula `replicas` históricos de `anos` anos sob uma política
+
+    Args:
+        politica: Atributos de política do SistemaEscalaExcel (padrão: POLITICA_PADRAO)
+        replicas: Quantidade de históricos independentes
+        anos: Anos simulados por réplica
+        semanas_por_mes: Semanas por mês (como na geração)
+        semente: Semente base
+        max_processos: Limite de processos simultâneos (padrão: núcleos da CPU)
+
+    Returns:
+        Dicionário com arrays 'domingos', 'sabados' (réplica x ano x funcionário),
+        'folgas' (réplica x ano x funcionário x dia útil), 'nomes' e 'ilhas'
+    """
+    from sistema_escala import SistemaEscalaExcel
+
+    politica = dict(POLITICA_PADRAO, **(politica or {}))
+    sementes = random.Random(semente).sample(range(2 ** 31), replicas)
+
+    limite = max(1, min(max_processos or os.cpu_count() or 1, replicas))
+    lotes = [sementes[i::limite] for i in range(limite)]
+
+    if limite == 1:
+        partes = [_simular_replicas(politica, sementes, anos, semanas_por_mes)]
+    else:
+        with ProcessPoolExecutor(max_workers=limite) as executor:
+            futuros = [executor.submit(_simular_replicas, politica, lote, anos, semanas_por_mes) for lote in lotes]
+            partes = [futuro.result() for futuro in futuros]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcionarios = SistemaEscalaExcel().funcionarios
+
+    resultado = {chave: np.concatenate([p[chave] for p in partes]) for chave in ('domingos', 'sabados', 'folgas')}
+    resultado['nomes'] = [f for lista in funcionarios.values() for f in lista]
+    resultado['ilhas'] = [ilha for ilha, lista in funcionarios.items() for _ in lista]
+    resultado['politica'] = politica
+
+    return resultado
+
+
+def resumir_simulacao(resultado: Dict) -> Dict:
+    """
+    Distribuição da justiça por ilha
+
+    Para cada réplica-ano, mede dentro da ilha a diferença entre quem mais e
+    quem menos fez domingos/sábados, e a maior diferença de folgas em um
+    mesmo dia útil. Reporta média, percentis e máximo dessas diferenças.
+
+    Args:
+        resultado: Saída de simular
+
+    Returns:
+        Dicionário {ilha: {métrica: {media, p50, p90, p99, max}}}
+    """
+    ilhas = np.array(resultado['ilhas'])
+    resumo = {}
+
+    def distribuicao(valores: np.ndarray) -> Dict:
+        estatisticas = {'media': round(float(valores.mean()), 3)}
+        for p, v in zip(PERCENTIS, np.percentile(valores, PERCENTIS)):
+            estatisticas[f"p{p}"] = float(v)
+        estatisticas['max'] = int(valores.max())
+        return estatisticas
+
+    for ilha in dict.fromkeys(resultado['ilhas']):
+        membros = ilhas == ilha
+        domingos = resultado['domingos'][:, :, membros]
+        sabados = resultado['sabados'][:, :, membros]
+        folgas = resultado['folgas'][:, :, membros, :]
+
+        resumo[ilha] = {
+            'diferenca_domingos': distribuicao(np.ptp(domingos, axis=2).ravel()),
+            'diferenca_sabados': distribuicao(np.ptp(sabados, axis=2).ravel()),
+            'diferenca_folgas_dia': distribuicao(np.ptp(folgas, axis=2).max(axis=2).ravel()),
+            'domingos_por_pessoa_ano': round(float(domingos.mean()), 2),
+            'sabados_por_pessoa_ano': round(float(sabados.mean()), 2)
+        }
+
+    return resumo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulador Monte Carlo de políticas de rodízio')
+    parser.add_argument('--replicas', type=int, default=1000)
+    parser.add_argument('--anos', type=int, default=1)
+    parser.add_argument('--sabado', type=int, default=None, help='pessoas no sábado no site (padrão: regras)')
+    parser.add_argument('--domingo', type=int, default=None, help='pessoas no domingo no site (padrão: regras)')
+    parser.add_argument('--ciclo', default=','.join(map(str, POLITICA_PADRAO['ciclo_sem_domingo'])))
+    parser.add_argument('--sem-rodada-completa', action='store_true')
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    politica = {
+        'cobertura': {dia: n for dia, n in (('Sáb', args.sabado), ('Dom', args.domingo)) if n is not None},
+        'ciclo_sem_domingo': [int(i) for i in args.ciclo.split(',')],
+        'rodada_completa': not args.sem_rodada_completa
+    }
+    resultado = simular(politica, args.replicas, args.anos, semente=args.semente, max_processos=args.processos)
+    print(json.dumps({'politica': politica, 'replicas': args.replicas, 'anos': args.anos,
+                      'ilhas': resumir_simulacao(resultado)}, ensure_ascii=False, indent=2))
@@ -4,11 +4,28 @@ from datetime import datetime, timedelta
 import random
 import os
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import BinaryIO, List, Dict, Tuple, Optional
 import warnings
+import json
+import copy
 from collections import defaultdict, deque, Counter
+from historico import (carregar_planilhas, criar_entrada, registrar_no_manifesto, listar_entradas, reindexar_historico,
+                       gravar_json_atomico, escrita_atomica, ler_manifesto, calcular_checksum, DIRETORIO_PADRAO)
+from travas import trava_arquivo, trava_geracao
+from esquema import presenca, compactar_escala, expandir_escala, COLUNAS_ESCALA
+import indices
+import padroes
+import exportacao
+import motor_exato
+import portfolio
+import otimizador_folgas
+from regras import REGRAS
+from edicao import caminho_diario, ler_edicoes, aplicar_edicoes
 warnings.filterwarnings('ignore')
 
+# Colunas dos agregados mensais por funcionário (AGREGADOS/ESCALA_{ano}_{mês}.json)
+COLUNAS_AGREGADOS = ['Funcionário', 'Ilha', 'Dias Trabalhados', 'Sáb', 'Dom']
+
 class SistemaEscalaExcel:
     """
     Sistema completo de escala 5x2 usando apenas Excel para histórico
@@ -46,15 +63,41 @@ class SistemaEscalaExcel:
         self.dias_completos = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
         
         # Diretório para salvar as escalas
-        self.diretorio_escalas = "ESCALAS_HISTORICO"
+        self.diretorio_escalas = DIRETORIO_PADRAO
         os.makedirs(self.diretorio_escalas, exist_ok=True)
         
+        # Diretório para agregados mantidos a cada salvamento
+        self.diretorio_agregados = f"{self.diretorio_escalas}/AGREGADOS"
+        os.makedirs(self.diretorio_agregados, exist_ok=True)
+        
+        # Diretório para os índices de consulta (disponibilidade etc.)
+        self.diretorio_indices = f"{self.diretorio_escalas}/INDICES"
+        os.makedirs(self.diretorio_indices, exist_ok=True)
+        
+        # Escalas codificadas já lidas neste processo: {(ano, mês): escala}, validadas pela versão
+        self.escalas_em_memoria = {}
+        
+        # Marcador regravado a cada salvamento/edição (coordena os caches entre processos)
+        self.arquivo_geracao = f"{self.diretorio_escalas}/GERACAO"
+        self.geracao_vista = self.geracao_atual()
+        
         # Sistema de rodízio por ilha
         self.rodizio_ilhas = {}
         
         # Sistema de rodízio de folgas (novo)
         self.rodizio_folgas = {}
         
+        # Folgas em dia útil distribuídas em lote por ilha-semana
+        self.folgas_em_lote = True
+        
+        # Política do rodízio de fim de semana (as pessoas por dia vêm da cobertura das regras)
+        self.ciclo_sem_domingo = [0, 1, 2, 3]    # Ilha com uma pessoa a menos em cada semana do mês (índice da ilha)
+        self.rodada_completa = True              # Só repete quando TODOS da ilha já pegaram
+        
+        # Regras de negócio compiladas (regras_escala.json, ver regras.py)
+        self.regras = REGRAS
+        self.regras.conferir_cobertura(self.funcionarios, self.ciclo_sem_domingo)
+        
         self.inicializar_rodizio()
     
     def inicializar_rodizio(self):
@@ -84,7 +127,7 @@ class SistemaEscalaExcel:
     
     def carregar_contadores_mes_anterior(self, ano: int, mes: int) -> Dict:
         """
-        Carrega os contadores de fim de semana do mês anterior a partir do Excel
+        Carrega os contadores de fim de semana e de folgas do mês anterior a partir do Excel
         
         Args:
             ano: Ano atual
@@ -109,8 +152,8 @@ class SistemaEscalaExcel:
         # Se existe arquivo do mês anterior, carrega os contadores
         if os.path.exists(arquivo_anterior):
             try:
-                # Carregar a aba de contadores
-                df_contadores = pd.read_excel(arquivo_anterior, sheet_name='CONTADORES_FIM_SEMANA')
+                # Carregar a aba de contadores (com as edições do mês)
+                df_contadores = self.ler_contadores_fim_semana(ano_anterior, mes_anterior)
                 
                 for _, row in df_contadores.iterrows():
                     funcionario = row['Funcionário']
@@ -125,7 +168,9 @@ class SistemaEscalaExcel:
                 print(f"✅ Contadores carregados de {mes_anterior:02d}/{ano_anterior}")
                 
                 # Reconstruir o sistema de rodízio com os dados históricos
+                self.incluir_admitidos(ano_anterior, mes_anterior)
                 self.reconstruir_rodizio(contadores)
+                self.carregar_rodizio_folgas(ano_anterior, mes_anterior)
                 
                 return contadores
                 
@@ -204,7 +249,10 @@ class SistemaEscalaExcel:
         # VERIFICAÇÃO FORTE: Verificar se TODOS já pegaram pelo menos 1 domingo
         todos_tem_domingo = all(v > 0 for v in rodizio['domingos_pegos'].values())
         
-        if not todos_tem_domingo:
+        if not self.rodada_completa:
+            # Política sem rodada completa: apenas a ordem da fila
+            funcionario = rodizio['fila_domingo'][0]
+        elif not todos_tem_domingo:
             # Se ainda não, pegar apenas quem tem 0 domingos
             candidatos = [f for f, v in rodizio['domingos_pegos'].items() if v == 0]
             
@@ -263,7 +311,10 @@ class SistemaEscalaExcel:
         # VERIFICAÇÃO FORTE: Verificar se TODOS já pegaram pelo menos 1 sábado
         todos_tem_sabado = all(v > 0 for v in rodizio['sabados_pegos'].values())
         
-        if not todos_tem_sabado:
+        if not self.rodada_completa:
+            # Política sem rodada completa: apenas a ordem da fila
+            funcionario = rodizio['fila_sabado'][0]
+        elif not todos_tem_sabado:
             # Se ainda não, pegar apenas quem tem 0 sábados
             candidatos = [f for f, v in rodizio['sabados_pegos'].items() if v == 0]
             
@@ -349,7 +400,10 @@ class SistemaEscalaExcel:
         
         return melhor_dia
     
-    def gerar_escala_mensal(self, ano: int, mes: int, semanas: int = 4) -> pd.DataFrame:
+    def gerar_escala_mensal(self, ano: int, mes: int, semanas: int = 4, motor: str = 'guloso',
+                            tempo_limite: Optional[float] = 30, partida_gulosa: bool = True,
+                            candidatos: int = 8, otimizar: bool = False,
+                            tempo_otimizacao: float = 2.0) -> pd.DataFrame:
         """
         Gera escala para um mês específico usando RODÍZIO PERFEITO
         
@@ -357,10 +411,31 @@ class SistemaEscalaExcel:
             ano: Ano da escala
             mes: Mês da escala
             semanas: Número de semanas
+            motor: 'guloso' (rodízio semana a semana), 'exato' (programação inteira)
+                ou 'portfolio' (melhor de vários gulosos em paralelo)
+            tempo_limite: Tempo máximo do motor exato em segundos
+            partida_gulosa: Se o motor exato usa a escala gulosa como ponto de partida
+            candidatos: Quantidade de gerações do motor portfolio
+            otimizar: Se redistribui as folgas em dias úteis depois da geração
+            tempo_otimizacao: Orçamento de tempo da otimização em segundos
             
         Returns:
             DataFrame com a escala mensal
         """
+        if otimizar:
+            df_escala = self.gerar_escala_mensal(ano, mes, semanas, motor, tempo_limite,
+                                                 partida_gulosa, candidatos)
+            return self.otimizar_folgas(df_escala, tempo_otimizacao)
+        
+        if motor == 'exato':
+            df_exata = self.gerar_escala_exata(ano, mes, semanas, tempo_limite, partida_gulosa)
+            if df_exata is not None:
+                return df_exata
+            print("⚠️  Motor exato indisponível ou sem solução: usando o motor guloso")
+        
+        if motor == 'portfolio':
+            return self.gerar_escala_portfolio(ano, mes, semanas, candidatos)
+        
         print(f"\n📊 GERANDO ESCALA PARA {mes:02d}/{ano}")
         print("=" * 50)
         print("📋 REGRAS DO RODÍZIO:")
@@ -446,7 +521,244 @@ class SistemaEscalaExcel:
                         contadores[func]['rodada_sabado'] = self.rodizio_ilhas[ilha]['rodada_sabado']
                         break
         
-        return df_escala_mensal
+        return compactar_escala(df_escala_mensal)
+    
+    def gerar_escala_exata(self, ano: int, mes: int, semanas: int = 4,
+                           tempo_limite: Optional[float] = 30,
+                           partida_gulosa: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Gera a escala do mês inteiro com o motor exato (motor_exato.py)
+        
+        Cobertura, 5 dias, sábado/domingo e folgas seguidas são restrições do
+        modelo; a justiça (dentro do mês e acumulada com os
+        contadores históricos) é o objetivo.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            semanas: Número de semanas
+            tempo_limite: Tempo máximo do solver em segundos
+            partida_gulosa: Se gera antes a escala gulosa para limitar a busca
+                e servir de resposta caso o tempo acabe
+            
+        Returns:
+            DataFrame com a escala mensal ou None se o motor não estiver
+            disponível ou não houver solução
+        """
+        if not motor_exato.SCIPY_DISPONIVEL:
+            return None
+        
+        print(f"\n🧮 MOTOR EXATO PARA {mes:02d}/{ano}")
+        
+        # Estado do rodízio no início do mês (com o histórico do mês anterior)
+        self.carregar_contadores_mes_anterior(ano, mes)
+        estado = copy.deepcopy((self.rodizio_ilhas, self.rodizio_folgas))
+        
+        historico = {}
+        for ilha, lista_func in self.funcionarios.items():
+            for func in lista_func:
+                historico[func] = {
+                    'sabados': self.rodizio_ilhas[ilha]['sabados_pegos'][func],
+                    'domingos': self.rodizio_ilhas[ilha]['domingos_pegos'][func],
+                    'folgas': self.rodizio_folgas[ilha]['contador_folgas'][func]
+                }
+        
+        modelo = motor_exato.ModeloEscala(self.funcionarios, semanas, historico,
+                                          self.ciclo_sem_domingo, self.regras)
+        
+        inicial = None
+        if partida_gulosa:
+            df_guloso = self.gerar_escala_mensal(ano, mes, semanas)
+            self.rodizio_ilhas, self.rodizio_folgas = estado
+            estado = copy.deepcopy(estado)
+            
+            mascara_de = dict(zip(zip(df_guloso['Funcionário'].astype(str), df_guloso['Semana do Mês']),
+                                  indices.mascaras_semanais(df_guloso)))
+            mascaras = np.array([[mascara_de.get((func, w + 1), 0) for w in range(semanas)]
+                                 for func in modelo.nomes])
+            inicial = modelo.vetor_solucao(mascaras)
+        
+        inicio = datetime.now()
+        resultado = modelo.resolver(tempo_limite, inicial)
+        segundos = (datetime.now() - inicio).total_seconds()
+        
+        if resultado['mascaras'] is None:
+            print(f"❌ Motor exato sem solução ({resultado['mensagem']})")
+            return None
+        
+        print(f"✅ Motor exato: {resultado['status']} em {segundos:.1f}s "
+              f"(objetivo {resultado['objetivo']:.0f}, origem: {resultado['origem']})")
+        
+        df_escala = self.montar_escala_mascaras(ano, mes, modelo.nomes, resultado['mascaras'])
+        self.registrar_escala_no_rodizio(df_escala)
+        
+        return df_escala
+    
+    def gerar_escala_portfolio(self, ano: int, mes: int, semanas: int = 4, candidatos: int = 8,
+                               max_processos: Optional[int] = None,
+                               semente: Optional[int] = None) -> pd.DataFrame:
+        """
+        Gera vários candidatos do mês em paralelo e fica com o melhor
+        
+        Cada candidato é uma geração gulosa com semente própria, pontuada por
+        pontuar_escala. O estado do rodízio passa a ser o deixado pelo melhor
+        candidato, e a distribuição das pontuações fica em df.attrs['portfolio'].
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            semanas: Número de semanas
+            candidatos: Quantidade de gerações independentes
+            max_processos: Limite de processos simultâneos (padrão: núcleos da CPU)
+            semente: Semente base (None = aleatória)
+            
+        Returns:
+            DataFrame com a melhor escala
+        """
+        print(f"\n🎲 PORTFÓLIO PARA {mes:02d}/{ano}: {candidatos} candidatos")
+        
+        sementes = random.Random(semente).sample(range(2 ** 31), candidatos)
+        estado = (self.funcionarios, self.rodizio_ilhas, self.rodizio_folgas)
+        inicio = datetime.now()
+        
+        resultados, falhas = portfolio.executar_portfolio(estado, ano, mes, semanas, sementes, max_processos)
+        
+        for semente_falha, erro in falhas:
+            print(f"⚠️  Candidato {semente_falha} falhou: {erro}")
+        
+        if not resultados:
+            print("⚠️  Nenhum candidato gerado: usando o motor guloso")
+            return self.gerar_escala_mensal(ano, mes, semanas)
+        
+        melhor = min(resultados, key=lambda r: r['pontuacao']['total'])
+        self.rodizio_ilhas, self.rodizio_folgas = melhor['estado']
+        
+        resumo = dict(portfolio.resumir_pontuacoes(resultados),
+                      semente=melhor['semente'],
+                      detalhes=melhor['pontuacao'],
+                      segundos=round((datetime.now() - inicio).total_seconds(), 2))
+        
+        print(f"✅ Melhor candidato: {resumo['melhor']:.0f} pontos "
+              f"(mediana {resumo['mediana']:.0f}, pior {resumo['pior']:.0f}) em {resumo['segundos']}s")
+        
+        df_escala = melhor['escala']
+        df_escala.attrs['portfolio'] = resumo
+        
+        return df_escala
+    
+    def otimizar_folgas(self, df_escala: pd.DataFrame, tempo_limite: float = 2.0,
+                        semente: Optional[int] = None) -> pd.DataFrame:
+        """
+        Redistribui as folgas em dias úteis de uma escala gerada
+        
+        Usa o OtimizadorFolgas (otimizador_folgas.py): o fim de semana e as
+        regras duras são mantidos, e o contador de folgas do rodízio é
+        ajustado para refletir as folgas finais.
+        
+        Args:
+            df_escala: Escala do mês (compacta), logo após a geração
+            tempo_limite: Orçamento de tempo em segundos
+            semente: Semente do sorteio
+            
+        Returns:
+            DataFrame com as folgas otimizadas (mesmas linhas, mesma ordem)
+        """
+        nomes, funcionario_idx = np.unique(df_escala['Funcionário'].astype(str).to_numpy(), return_inverse=True)
+        ilhas, ilha_idx = np.unique(df_escala['Ilha'].astype(str).to_numpy(), return_inverse=True)
+        _, semana_idx = np.unique(df_escala['Semana do Mês'].to_numpy(), return_inverse=True)
+        mascaras = indices.mascaras_semanais(df_escala).astype(np.int64)
+        ilha_de = dict(zip(df_escala['Funcionário'].astype(str), df_escala['Ilha'].astype(str)))
+        
+        # Histórico anterior ao mês = contador atual menos as folgas do próprio mês
+        folgas_mes = np.zeros((len(nomes), 5), dtype=np.int64)
+        np.add.at(folgas_mes, funcionario_idx, otimizador_folgas.FOLGAS_UTEIS[mascaras])
+        contadores = [self.rodizio_folgas.get(ilha_de[nome], {}).get('contador_folgas', {}).get(nome)
+                      for nome in nomes]
+        historico = np.array([[c[d] if c else 0 for d in range(5)] for c in contadores], dtype=np.int64)
+        historico = np.maximum(historico - folgas_mes, 0)
+        
+        otimizador = otimizador_folgas.OtimizadorFolgas(mascaras, funcionario_idx, ilha_idx, semana_idx, historico,
+                                                        validos=self.regras.tabelas(ilhas))
+        relatorio = otimizador.otimizar(tempo_limite, semente=semente)
+        
+        print(f"✅ Folgas otimizadas: custo {relatorio['custo_inicial']:.0f} → {relatorio['custo_final']:.0f} "
+              f"({relatorio['linhas_alteradas']} linhas, {relatorio['iteracoes']} iterações em {relatorio['segundos']}s)")
+        
+        df_otimizada = df_escala.copy()
+        for dia in range(5):
+            df_otimizada[self.dias_semana[dia]] = (otimizador.mascaras >> dia & 1).astype(bool)
+        
+        # Contador de folgas passa a refletir as folgas finais
+        novas_folgas = np.zeros_like(folgas_mes)
+        np.add.at(novas_folgas, funcionario_idx, otimizador_folgas.FOLGAS_UTEIS[otimizador.mascaras])
+        for posicao, contador in enumerate(contadores):
+            if contador:
+                for dia in range(5):
+                    contador[dia] = int(historico[posicao, dia] + novas_folgas[posicao, dia])
+        
+        df_otimizada.attrs = dict(df_escala.attrs, otimizacao_folgas=relatorio)
+        return df_otimizada
+    
+    def montar_escala_mascaras(self, ano: int, mes: int, nomes: List[str],
+                               mascaras: np.ndarray) -> pd.DataFrame:
+        """
+        Monta o DataFrame da escala a partir de máscaras semanais
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            nomes: Funcionários na ordem das linhas de `mascaras`
+            mascaras: Matriz funcionário x semana (bit d = trabalha no dia d)
+            
+        Returns:
+            DataFrame compacto da escala, na ordem semana/ilha/funcionário
+        """
+        linha_de = {nome: i for i, nome in enumerate(nomes)}
+        linhas = []
+        
+        for semana in range(mascaras.shape[1]):
+            for ilha, lista_func in self.funcionarios.items():
+                for func in lista_func:
+                    mascara = int(mascaras[linha_de[func], semana])
+                    dias = [bool(mascara >> d & 1) for d in range(7)]
+                    linhas.append({
+                        'Ano': ano, 'Mês': mes, 'Semana do Mês': semana + 1,
+                        'Funcionário': func, 'Ilha': ilha,
+                        **dict(zip(self.dias_semana, dias)),
+                        'Dias Trabalhados': sum(dias), 'Folgas': 7 - sum(dias)
+                    })
+        
+        return compactar_escala(pd.DataFrame(linhas))
+    
+    def registrar_escala_no_rodizio(self, df_escala: pd.DataFrame):
+        """
+        Atualiza filas, contadores e rodadas do rodízio com uma escala pronta
+        
+        Usado pelos motores que decidem o mês inteiro de uma vez, para que o
+        estado em memória fique igual ao que o motor guloso deixaria.
+        
+        Args:
+            df_escala: Escala do mês (compacta)
+        """
+        for ilha, lista_func in self.funcionarios.items():
+            rodizio = self.rodizio_ilhas[ilha]
+            folgas = self.rodizio_folgas[ilha]
+            df_ilha = df_escala[df_escala['Ilha'] == ilha]
+            
+            for func, df_func in df_ilha.groupby('Funcionário', observed=True, sort=False):
+                rodizio['domingos_pegos'][func] += int(df_func['Dom'].sum())
+                rodizio['sabados_pegos'][func] += int(df_func['Sáb'].sum())
+                
+                for dia in range(5):
+                    for _ in range(int((~df_func[self.dias_semana[dia]]).sum())):
+                        folgas['contador_folgas'][func][dia] += 1
+                        folgas['ultimas_folgas'][func].append(dia)
+                del folgas['ultimas_folgas'][func][:-10]
+            
+            rodizio['fila_domingo'] = deque(sorted(lista_func, key=lambda f: rodizio['domingos_pegos'][f]))
+            rodizio['fila_sabado'] = deque(sorted(lista_func, key=lambda f: rodizio['sabados_pegos'][f]))
+            rodizio['rodada_domingo'] = min(rodizio['domingos_pegos'].values())
+            rodizio['rodada_sabado'] = min(rodizio['sabados_pegos'].values())
     
     def mostrar_distribuicao_semana(self, df_semana: pd.DataFrame, semana_num: int):
         """Mostra a distribuição de fins de semana para uma semana específica"""
@@ -456,8 +768,8 @@ class SistemaEscalaExcel:
             df_ilha = df_semana[df_semana['Ilha'] == ilha]
             
             # Contar quem trabalha no fim de semana
-            sabado = df_ilha[df_ilha['Sáb'] == 'P']['Funcionário'].tolist()
-            domingo = df_ilha[df_ilha['Dom'] == 'P']['Funcionário'].tolist()
+            sabado = df_ilha[presenca(df_ilha['Sáb'])]['Funcionário'].tolist()
+            domingo = df_ilha[presenca(df_ilha['Dom'])]['Funcionário'].tolist()
             
             # Abreviar nomes
             sab_abreviados = [' '.join(f.split()[:2]) for f in sabado[:2]]
@@ -465,6 +777,66 @@ class SistemaEscalaExcel:
             
             print(f"      {ilha}: Sábado={sab_abreviados} | Domingo={dom_abreviados}")
     
+    def metas_fim_de_semana(self, semana_num: int) -> Dict[str, Tuple[int, int]]:
+        """
+        Pessoas por ilha no sábado e no domingo na semana do mês
+        
+        A cobertura do site (regras_escala.json) é repartida entre as ilhas;
+        ciclo_sem_domingo decide quem fica com uma pessoa a menos na semana.
+        
+        Args:
+            semana_num: Número da semana (1-4)
+            
+        Returns:
+            Dicionário {ilha: (sábado, domingo)}
+        """
+        ilhas = list(self.funcionarios)
+        metas = self.regras.metas_fim_de_semana(ilhas, semana_num - 1, self.ciclo_sem_domingo)
+        return {ilha: (int(sabado), int(domingo)) for ilha, (sabado, domingo) in zip(ilhas, metas)}
+    
+    def escolher_fim_de_semana_ilha(self, ilha: str, pessoas_sabado: int,
+                                    pessoas_domingo: int) -> Tuple[List[str], List[str]]:
+        """
+        Escolhe quem trabalha no domingo e no sábado em uma ilha na semana
+        
+        Args:
+            ilha: Nome da ilha
+            pessoas_sabado: Pessoas da ilha no sábado
+            pessoas_domingo: Pessoas da ilha no domingo
+            
+        Returns:
+            Tupla (funcionários do domingo, funcionários do sábado)
+        """
+        # DOMINGO: meta da ilha na semana (0 na ilha do rodízio)
+        funcionarios_domingo = []
+        for i in range(pessoas_domingo):
+            # Usar sistema de rodízio para escolher quem trabalha no domingo
+            funcionario_domingo = self.obter_proximo_domingo(ilha)
+            while funcionario_domingo in funcionarios_domingo:
+                funcionario_domingo = self.obter_proximo_domingo(ilha)
+            
+            funcionarios_domingo.append(funcionario_domingo)
+            
+            if i == 0:
+                print(f"    🏝️  {ilha}: {funcionario_domingo.split()[0]} no DOMINGO")
+        
+        # SÁBADO: meta da ilha na semana
+        funcionarios_sabado = []
+        for i in range(pessoas_sabado):
+            funcionario_sabado = self.obter_proximo_sabado(ilha)
+            
+            # Se a pessoa já foi escolhida para domingo, não pode fazer sábado
+            while funcionario_sabado in funcionarios_domingo or funcionario_sabado in funcionarios_sabado:
+                # Tentar outro
+                funcionario_sabado = self.obter_proximo_sabado(ilha)
+            
+            funcionarios_sabado.append(funcionario_sabado)
+            
+            if i == 0:
+                print(f"    🏝️  {ilha}: {funcionario_sabado.split()[0]} no SÁBADO")
+        
+        return funcionarios_domingo, funcionarios_sabado
+    
     def gerar_escala_semanal_rodizio(self, semana_num: int, contadores: Dict, 
                                    contadores_mes_atual: Dict, funcionarios: Dict) -> pd.DataFrame:
         """
@@ -479,61 +851,43 @@ class SistemaEscalaExcel:
         Returns:
             DataFrame com escala semanal
         """
-        # Determinar qual ilha NÃO terá ninguém no domingo nesta semana
-        ilha_sem_domingo = (semana_num - 1) % 4
-        ilhas = list(funcionarios.keys())
+        # Pessoas por ilha no fim de semana (cobertura das regras; uma ilha fica sem domingo)
+        metas = self.metas_fim_de_semana(semana_num)
         
         dados_semana = []
         
-        for ilha_idx, ilha in enumerate(ilhas):
-            lista_func = funcionarios[ilha]
-            
-            # DOMINGO: 1 pessoa por ilha (exceto a ilha do rodízio)
-            trabalha_domingo = False
-            funcionario_domingo = None
+        for ilha, lista_func in funcionarios.items():
+            funcionarios_domingo, funcionarios_sabado = self.escolher_fim_de_semana_ilha(ilha, *metas[ilha])
             
-            if ilha_idx != ilha_sem_domingo:
-                # Usar sistema de rodízio para escolher quem trabalha no domingo
-                funcionario_domingo = self.obter_proximo_domingo(ilha)
-                trabalha_domingo = True
-                
-                # Atualizar contador do mês atual
+            # Atualizar contadores do mês atual
+            for funcionario_domingo in funcionarios_domingo:
                 contadores_mes_atual[funcionario_domingo]['domingos'] += 1
                 contadores_mes_atual[funcionario_domingo]['total'] += 1
-                
-                print(f"    🏝️  {ilha}: {funcionario_domingo.split()[0]} no DOMINGO")
             
-            # SÁBADO: 2 pessoas por ilha
-            funcionarios_sabado = []
-            for i in range(2):
-                funcionario_sabado = self.obter_proximo_sabado(ilha)
-                
-                # Se a pessoa já foi escolhida para domingo, não pode fazer sábado
-                while funcionario_sabado == funcionario_domingo:
-                    # Tentar outro
-                    funcionario_sabado = self.obter_proximo_sabado(ilha)
-                
-                funcionarios_sabado.append(funcionario_sabado)
-                
-                # Atualizar contador do mês atual
+            for funcionario_sabado in funcionarios_sabado:
                 contadores_mes_atual[funcionario_sabado]['sabados'] += 1
                 contadores_mes_atual[funcionario_sabado]['total'] += 1
-                
-                if i == 0:
-                    print(f"    🏝️  {ilha}: {funcionario_sabado.split()[0]} no SÁBADO")
+            
+            # Folgas em dia útil de toda a ilha-semana de uma vez
+            folgas_ilha = {}
+            if self.folgas_em_lote:
+                folgas_ilha = self.distribuir_folgas_ilha(
+                    ilha, [f for f in lista_func if f in funcionarios_sabado or f in funcionarios_domingo]
+                )
             
             # Gerar escalas para todos os funcionários da ilha
             for funcionario in lista_func:
                 # Verificar se trabalha no fim de semana
                 trabalha_sabado = funcionario in funcionarios_sabado
-                trabalha_domingo_func = (funcionario == funcionario_domingo)
+                trabalha_domingo_func = funcionario in funcionarios_domingo
                 
                 # Gerar escala do funcionário
                 dias = self.gerar_escala_funcionario(
                     funcionario=funcionario,
                     trabalha_sabado=trabalha_sabado,
                     trabalha_domingo=trabalha_domingo_func,
-                    ilha=ilha
+                    ilha=ilha,
+                    folgas_definidas=folgas_ilha.get(funcionario)
                 )
                 
                 # Calcular totais
@@ -559,10 +913,49 @@ class SistemaEscalaExcel:
         
         return pd.DataFrame(dados_semana)
     
+    def distribuir_folgas_ilha(self, ilha: str, funcionarios_folga: List[str]) -> Dict[str, List[int]]:
+        """
+        Distribui em lote as folgas em dia útil de uma ilha-semana
+        
+        Quem trabalha no fim de semana ganha uma folga de segunda a sexta; os
+        dias são escolhidos juntos (otimizador_folgas.atribuir_folgas_semana)
+        para equilibrar quantas pessoas folgam em cada dia, respeitando o
+        contador de folgas de cada um.
+        
+        Args:
+            ilha: Nome da ilha
+            funcionarios_folga: Funcionários da ilha que trabalham no fim de semana
+            
+        Returns:
+            Dicionário {funcionário: [dia]} (0=Seg ... 4=Sex)
+        """
+        if not funcionarios_folga:
+            return {}
+        
+        rodizio = self.rodizio_folgas[ilha]
+        contadores = np.array([[rodizio['contador_folgas'][f][d] for d in range(5)] for f in funcionarios_folga])
+        ultimas = np.array([rodizio['ultimas_folgas'][f][-1] if rodizio['ultimas_folgas'][f] else -1
+                            for f in funcionarios_folga])
+        
+        dias = otimizador_folgas.atribuir_folgas_semana(contadores, ultimas)
+        
+        return {f: [int(dia)] for f, dia in zip(funcionarios_folga, dias)}
+    
+    def registrar_folga(self, ilha: str, funcionario: str, dia: int):
+        """Registra uma folga em dia útil no rodízio de folgas"""
+        rodizio = self.rodizio_folgas[ilha]
+        rodizio['contador_folgas'][funcionario][dia] += 1
+        rodizio['ultimas_folgas'][funcionario].append(dia)
+        
+        # Manter apenas as últimas 10 folgas
+        if len(rodizio['ultimas_folgas'][funcionario]) > 10:
+            rodizio['ultimas_folgas'][funcionario].pop(0)
+    
     def gerar_escala_funcionario(self, funcionario: str, 
                                  trabalha_sabado: bool, 
                                  trabalha_domingo: bool,
-                                 ilha: str) -> List[str]:
+                                 ilha: str,
+                                 folgas_definidas: Optional[List[int]] = None) -> List[str]:
         """
         Gera escala individual para um funcionário com rodízio de folgas
         
@@ -571,12 +964,18 @@ class SistemaEscalaExcel:
             trabalha_sabado: Se trabalha no sábado
             trabalha_domingo: Se trabalha no domingo
             ilha: Nome da ilha
+            folgas_definidas: Dias úteis de folga já escolhidos para a ilha-semana
+                (distribuir_folgas_ilha); sem eles, o dia é escolhido pelo rodízio individual
             
         Returns:
             Lista com 7 dias (P=Presente, F=Folga)
         """
+        # Regras da ilha (regras_escala.json)
+        regras = self.regras.da_ilha(ilha)
+        dias_meta = regras['dias_trabalhados']
+        
         # REGRA 1: Não pode trabalhar sábado E domingo
-        if trabalha_sabado and trabalha_domingo:
+        if trabalha_sabado and trabalha_domingo and not regras['sabado_e_domingo']:
             # Prioridade ao DOMINGO (regra principal)
             trabalha_sabado = False
         
@@ -592,10 +991,10 @@ class SistemaEscalaExcel:
         # Contar quantos dias de trabalho temos
         dias_trabalho = dias.count("P")
         
-        # REGRA 2: Precisamos de 5 dias de trabalho
-        if dias_trabalho > 5:
+        # REGRA 2: Precisamos de dias_meta dias de trabalho
+        if dias_trabalho > dias_meta:
             # Temos dias extras para folgar
-            dias_para_folgar = dias_trabalho - 5
+            dias_para_folgar = dias_trabalho - dias_meta
             
             # Tentar folgar dias na semana (segunda a sexta)
             dias_semana_disponiveis = []
@@ -606,7 +1005,14 @@ class SistemaEscalaExcel:
             # Escolher os melhores dias para folgar baseado no rodízio
             dias_folga_escolhidos = []
             
-            for _ in range(dias_para_folgar):
+            if folgas_definidas:
+                # Dias já escolhidos em lote para a ilha-semana
+                for dia in folgas_definidas[:dias_para_folgar]:
+                    self.registrar_folga(ilha, funcionario, dia)
+                    dias_folga_escolhidos.append(dia)
+                    dias_semana_disponiveis.remove(dia)
+            
+            for _ in range(dias_para_folgar - len(dias_folga_escolhidos)):
                 if dias_semana_disponiveis:
                     melhor_dia = self.obter_melhor_folga_semanal(
                         ilha=ilha,
@@ -621,9 +1027,9 @@ class SistemaEscalaExcel:
             for dia in dias_folga_escolhidos:
                 dias[dia] = "F"
         
-        elif dias_trabalho < 5:
+        elif dias_trabalho < dias_meta:
             # Precisamos de mais dias de trabalho
-            dias_para_trabalhar = 5 - dias_trabalho
+            dias_para_trabalhar = dias_meta - dias_trabalho
             
             # Encontrar dias que estão como folga (exceto fim de semana já definido)
             dias_folga_disponiveis = []
@@ -662,32 +1068,33 @@ class SistemaEscalaExcel:
         # Verificar e corrigir se necessário
         dias_semana = dias[:5]  # Apenas segunda a sexta
         
-        for i in range(len(dias_semana) - 1):
-            if dias_semana[i] == "F" and dias_semana[i + 1] == "F":
-                # Encontrar um dia de trabalho para trocar
-                for j in range(len(dias_semana)):
-                    if dias_semana[j] == "P" and abs(j - i) > 1:  # Evitar trocar com dia adjacente
-                        # Trocar os dias
-                        dias_semana[i], dias_semana[j] = dias_semana[j], dias_semana[i]
-                        
-                        # Atualizar o rodízio de folgas
-                        self.rodizio_folgas[ilha]['contador_folgas'][funcionario][i] -= 1
-                        self.rodizio_folgas[ilha]['contador_folgas'][funcionario][j] += 1
-                        
-                        # Atualizar histórico
-                        if i in self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario]:
-                            self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario].remove(i)
-                        if j not in self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario]:
-                            self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario].append(j)
-                        
-                        break
+        if not regras['folgas_seguidas_uteis']:
+            for i in range(len(dias_semana) - 1):
+                if dias_semana[i] == "F" and dias_semana[i + 1] == "F":
+                    # Encontrar um dia de trabalho para trocar
+                    for j in range(len(dias_semana)):
+                        if dias_semana[j] == "P" and abs(j - i) > 1:  # Evitar trocar com dia adjacente
+                            # Trocar os dias
+                            dias_semana[i], dias_semana[j] = dias_semana[j], dias_semana[i]
+                            
+                            # Atualizar o rodízio de folgas
+                            self.rodizio_folgas[ilha]['contador_folgas'][funcionario][i] -= 1
+                            self.rodizio_folgas[ilha]['contador_folgas'][funcionario][j] += 1
+                            
+                            # Atualizar histórico
+                            if i in self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario]:
+                                self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario].remove(i)
+                            if j not in self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario]:
+                                self.rodizio_folgas[ilha]['ultimas_folgas'][funcionario].append(j)
+                            
+                            break
         
         # Atualizar os dias da semana
         for i in range(5):
             dias[i] = dias_semana[i]
         
-        # REGRA 4: Garantir que temos exatamente 5 dias de trabalho
-        while dias.count("P") > 5:
+        # REGRA 4: Garantir que temos exatamente dias_meta dias de trabalho
+        while dias.count("P") > dias_meta:
             indices_trabalho = [i for i, d in enumerate(dias) if d == "P"]
             
             # Preferir remover trabalho do fim de semana (se for extra)
@@ -710,7 +1117,7 @@ class SistemaEscalaExcel:
                     # Se não há dias da semana, remover aleatoriamente
                     dias[random.choice(indices_trabalho)] = "F"
         
-        while dias.count("P") < 5:
+        while dias.count("P") < dias_meta:
             indices_folga = [i for i, d in enumerate(dias) if d == "F"]
             
             if not indices_folga:
@@ -729,7 +1136,7 @@ class SistemaEscalaExcel:
                 dias[random.choice(indices_folga)] = "P"
         
         # VERIFICAÇÃO FINAL: Garantir que não trabalha sábado e domingo
-        if dias[5] == "P" and dias[6] == "P":
+        if dias[5] == "P" and dias[6] == "P" and not regras['sabado_e_domingo']:
             # Prioridade ao domingo
             dias[5] = "F"
             
@@ -739,6 +1146,15 @@ class SistemaEscalaExcel:
                     dias[i] = "P"
                     break
         
+        # FILTRO DE PADRÕES: a semana precisa estar na tabela de regras da ilha
+        mascara = sum(1 << i for i, d in enumerate(dias) if d == "P")
+        ajustada = self.regras.ajustar_padrao(mascara, ilha)
+        if ajustada != mascara:
+            contadores = self.rodizio_folgas[ilha]['contador_folgas'][funcionario]
+            for i in range(5):
+                contadores[i] += (mascara >> i & 1) - (ajustada >> i & 1)
+            dias = ["P" if ajustada >> i & 1 else "F" for i in range(7)]
+        
         return dias
     
     def verificar_rodizio_perfeito(self, df_escala: pd.DataFrame) -> Dict:
@@ -760,24 +1176,15 @@ class SistemaEscalaExcel:
             'balanceamento_perfeito': True
         }
         
+        # Domingos e sábados por (ilha, funcionário) em uma única agregação
+        totais = self.totais_fim_semana(df_escala, ['Ilha', 'Funcionário'])
+        domingos_por_chave = totais['Dom'].to_dict()
+        sabados_por_chave = totais['Sáb'].to_dict()
+        
         # Para cada ilha
         for ilha, lista_func in self.funcionarios.items():
-            # Filtrar funcionários desta ilha
-            df_ilha = df_escala[df_escala['Ilha'] == ilha]
-            
-            # Contar domingos por funcionário nesta escala
-            domingos_por_func = {}
-            for funcionario in lista_func:
-                df_func = df_ilha[df_ilha['Funcionário'] == funcionario]
-                domingos = (df_func['Dom'] == 'P').sum()
-                domingos_por_func[funcionario] = domingos
-            
-            # Contar sábados por funcionário nesta escala
-            sabados_por_func = {}
-            for funcionario in lista_func:
-                df_func = df_ilha[df_ilha['Funcionário'] == funcionario]
-                sabados = (df_func['Sáb'] == 'P').sum()
-                sabados_por_func[funcionario] = sabados
+            domingos_por_func = {f: domingos_por_chave.get((ilha, f), 0) for f in lista_func}
+            sabados_por_func = {f: sabados_por_chave.get((ilha, f), 0) for f in lista_func}
             
             resultados['rodizio_domingo_por_ilha'][ilha] = domingos_por_func
             resultados['rodizio_sabado_por_ilha'][ilha] = sabados_por_func
@@ -813,65 +1220,93 @@ class SistemaEscalaExcel:
             ano: Ano da escala
             mes: Mês da escala
         """
-        # Nome do arquivo
-        nome_arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
-        
-        # Calcular contadores totais
-        contadores_totais = self.calcular_contadores(df_escala)
-        
-        # Calcular contadores acumulados (somando com mês anterior se existir)
-        contadores_acumulados = self.calcular_contadores_acumulados(ano, mes, contadores_totais)
-        
-        # Verificar rodízio perfeito
-        rodizio = self.verificar_rodizio_perfeito(df_escala)
-        
-        with pd.ExcelWriter(nome_arquivo, engine='openpyxl') as writer:
-            # ABA 1: ESCALA COMPLETA
-            df_escala.to_excel(writer, sheet_name='ESCALA_COMPLETA', index=False)
+        # Escritor do período: exclusivo no mês, compartilhado no mês anterior (contadores)
+        with trava_geracao(self.diretorio_escalas, ano, mes):
+            # Nome do arquivo
+            nome_arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
             
-            # ABA 2: RESUMO POR SEMANA
-            self.criar_resumo_semanal(df_escala, writer)
+            # Calcular contadores totais
+            contadores_totais = self.calcular_contadores(df_escala)
             
-            # ABA 3: RESUMO POR ILHA
-            self.criar_resumo_ilha(df_escala, writer)
+            # Calcular contadores acumulados (somando com mês anterior se existir)
+            contadores_acumulados = self.calcular_contadores_acumulados(ano, mes, contadores_totais)
             
-            # ABA 4: CONTADORES MÊS ATUAL
-            df_contadores_mes = pd.DataFrame([
-                {
-                    'Funcionário': func,
-                    'Sábados Trabalhados': cont['sabados'],
-                    'Domingos Trabalhados': cont['domingos'],
-                    'Total Fim de Semana': cont['total']
-                }
-                for func, cont in contadores_totais.items()
-            ])
-            df_contadores_mes.to_excel(writer, sheet_name='CONTADORES_MES_ATUAL', index=False)
+            # Relatório de validação (calculado uma vez e reaproveitado por todas as abas)
+            validacao = self.validar_escala(df_escala)
+            rodizio = validacao['rodizio']
             
-            # ABA 5: CONTADORES ACUMULADOS COM RODADAS
-            df_contadores_acum = pd.DataFrame([
-                {
-                    'Funcionário': func,
-                    'Sábados Trabalhados': cont['sabados_trabalhados'],
-                    'Domingos Trabalhados': cont['domingos_trabalhados'],
-                    'Total Fim de Semana': cont['total_fim_semana'],
-                    'Rodada Domingo': cont.get('rodada_domingo', 0),
-                    'Rodada Sábado': cont.get('rodada_sabado', 0)
-                }
-                for func, cont in contadores_acumulados.items()
-            ])
-            df_contadores_acum.to_excel(writer, sheet_name='CONTADORES_FIM_SEMANA', index=False)
+            with escrita_atomica(nome_arquivo, sufixo='.tmp.xlsx') as temporario, pd.ExcelWriter(temporario, engine='openpyxl') as writer:
+                # ABA 1: ESCALA COMPLETA
+                expandir_escala(df_escala).to_excel(writer, sheet_name='ESCALA_COMPLETA', index=False)
+                
+                # ABA 2: RESUMO POR SEMANA
+                self.criar_resumo_semanal(df_escala, writer)
+                
+                # ABA 3: RESUMO POR ILHA
+                self.criar_resumo_ilha(df_escala, writer)
+                
+                # ABA 4: CONTADORES MÊS ATUAL
+                df_contadores_mes = pd.DataFrame([
+                    {
+                        'Funcionário': func,
+                        'Sábados Trabalhados': cont['sabados'],
+                        'Domingos Trabalhados': cont['domingos'],
+                        'Total Fim de Semana': cont['total']
+                    }
+                    for func, cont in contadores_totais.items()
+                ])
+                df_contadores_mes.to_excel(writer, sheet_name='CONTADORES_MES_ATUAL', index=False)
+                
+                # ABA 5: CONTADORES ACUMULADOS COM RODADAS
+                df_contadores_acum = pd.DataFrame([
+                    {
+                        'Funcionário': func,
+                        'Sábados Trabalhados': cont['sabados_trabalhados'],
+                        'Domingos Trabalhados': cont['domingos_trabalhados'],
+                        'Total Fim de Semana': cont['total_fim_semana'],
+                        'Rodada Domingo': cont.get('rodada_domingo', 0),
+                        'Rodada Sábado': cont.get('rodada_sabado', 0)
+                    }
+                    for func, cont in contadores_acumulados.items()
+                ])
+                df_contadores_acum.to_excel(writer, sheet_name='CONTADORES_FIM_SEMANA', index=False)
+                
+                # ABA 6: VERIFICAÇÃO DE REGRAS
+                self.criar_verificacao_regras(validacao['regras'], writer)
+                
+                # ABA 7: RODÍZIO PERFEITO (NOVA)
+                self.criar_aba_rodizio_perfeito(rodizio, df_contadores_acum, writer)
+                
+                # ABA 8: DISTRIBUIÇÃO POR ILHA
+                self.criar_aba_distribuicao_ilha(rodizio, writer)
+                
+                # ABA 9: RODÍZIO DE FOLGAS (NOVA)
+                self.criar_aba_rodizio_folgas(writer)
+            
+            # A escala salva já contém as edições anteriores do mês
+            if os.path.exists(caminho_diario(self.diretorio_escalas, ano, mes)):
+                os.remove(caminho_diario(self.diretorio_escalas, ano, mes))
             
-            # ABA 6: VERIFICAÇÃO DE REGRAS
-            self.criar_verificacao_regras(df_escala, writer)
+            # Persistir a validação junto com a versão do mês
+            self.salvar_validacao(ano, mes, validacao)
             
-            # ABA 7: RODÍZIO PERFEITO (NOVA)
-            self.criar_aba_rodizio_perfeito(rodizio, df_contadores_acum, writer)
+            # Atualizar agregado anual de contadores (incremental)
+            self.atualizar_contadores_anuais(ano, mes, contadores_totais, contadores_acumulados)
             
-            # ABA 8: DISTRIBUIÇÃO POR ILHA
-            self.criar_aba_distribuicao_ilha(rodizio, writer)
+            # Cache de agregados do mês para o relatório anual
+            self.salvar_agregados_mes(ano, mes, self.agregar_escala_mes(df_escala))
             
-            # ABA 9: RODÍZIO DE FOLGAS (NOVA)
-            self.criar_aba_rodizio_folgas(writer)
+            # Índices de consulta do mês
+            self.indexar_periodo(ano, mes, df_escala)
+            
+            # Registrar no manifesto do histórico
+            registrar_no_manifesto(self.diretorio_escalas, criar_entrada(
+                self.diretorio_escalas, ano, mes,
+                linhas=len(df_escala),
+                funcionarios=int(df_escala['Funcionário'].nunique()),
+                validacao=validacao['resumo']
+            ))
+            self.marcar_alteracao(ano, mes)
         
         print(f"✅ Escala salva em: {nome_arquivo}")
         print(f"   - 9 abas incluídas no arquivo")
@@ -902,22 +1337,30 @@ class SistemaEscalaExcel:
         Returns:
             Dicionário com contadores do mês
         """
-        contadores = {}
+        totais = self.totais_fim_semana(df_escala, ['Funcionário'])
         
-        for funcionario in df_escala['Funcionário'].unique():
-            df_func = df_escala[df_escala['Funcionário'] == funcionario]
-            
-            sabados = (df_func['Sáb'] == 'P').sum()
-            domingos = (df_func['Dom'] == 'P').sum()
-            total = sabados + domingos
-            
-            contadores[funcionario] = {
-                'sabados': sabados,
-                'domingos': domingos,
-                'total': total
-            }
+        return {
+            funcionario: {'sabados': sabados, 'domingos': domingos, 'total': sabados + domingos}
+            for funcionario, sabados, domingos in zip(totais.index, totais['Sáb'].tolist(), totais['Dom'].tolist())
+        }
+    
+    def totais_fim_semana(self, df_escala: pd.DataFrame, chaves: List[str]) -> pd.DataFrame:
+        """
+        Sábados e domingos trabalhados agrupados por `chaves`, em uma passada
         
-        return contadores
+        Args:
+            df_escala: DataFrame com a escala
+            chaves: Colunas de agrupamento (ex.: ['Funcionário'])
+            
+        Returns:
+            DataFrame indexado pelas chaves (na ordem de aparição) com as colunas 'Sáb' e 'Dom'
+        """
+        presencas = pd.DataFrame({
+            **{chave: df_escala[chave].astype(str) for chave in chaves},
+            'Sáb': presenca(df_escala['Sáb']).astype(np.int64),
+            'Dom': presenca(df_escala['Dom']).astype(np.int64)
+        })
+        return presencas.groupby(chaves if len(chaves) > 1 else chaves[0], sort=False).sum()
     
     def calcular_contadores_acumulados(self, ano: int, mes: int, 
                                       contadores_mes_atual: Dict) -> Dict:
@@ -966,10 +1409,7 @@ class SistemaEscalaExcel:
         if os.path.exists(arquivo_anterior):
             try:
                 # Carregar contadores acumulados do mês anterior
-                df_contadores_anterior = pd.read_excel(
-                    arquivo_anterior, 
-                    sheet_name='CONTADORES_FIM_SEMANA'
-                )
+                df_contadores_anterior = self.ler_contadores_fim_semana(ano_anterior, mes_anterior)
                 
                 # Somar contadores
                 for _, row in df_contadores_anterior.iterrows():
@@ -1000,26 +1440,209 @@ class SistemaEscalaExcel:
         
         return contadores_acumulados
     
+    def atualizar_contadores_anuais(self, ano: int, mes: int, contadores_mes: Dict,
+                                    contadores_acumulados: Dict, parcial: bool = False):
+        """
+        Atualiza de forma incremental o agregado anual de contadores
+        
+        A contribuição anterior do mês (se a escala estiver sendo regerada) é
+        substituída pela nova, sem reler as outras escalas do ano.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            contadores_mes: Contadores do mês (saída de calcular_contadores)
+            contadores_acumulados: Contadores acumulados (com rodadas)
+            parcial: Substituir só a contribuição dos funcionários de contadores_mes
+        """
+        # Meses diferentes do mesmo ano compartilham o arquivo: um escritor por vez
+        with trava_arquivo(f"{self.diretorio_agregados}/CONTADORES_ANO_{ano}.json.lock"):
+            agregado = self._ler_contadores_anuais(ano)
+            
+            if agregado is None:
+                # Primeiro salvamento com agregado: incorporar os meses já existentes
+                agregado = self.reconstruir_contadores_anuais(ano) or {'ano': ano, 'meses': {}, 'funcionarios': {}}
+            chave_mes = f"{mes:02d}"
+            anterior = agregado['meses'].get(chave_mes, {})
+            
+            # Remover a contribuição antiga deste mês
+            for func, (sabados, domingos) in anterior.items():
+                if parcial and func not in contadores_mes:
+                    continue
+                if func in agregado['funcionarios']:
+                    totais = agregado['funcionarios'][func]
+                    totais['Sábados Trabalhados'] -= sabados
+                    totais['Domingos Trabalhados'] -= domingos
+                    totais['Total Fim de Semana'] -= sabados + domingos
+            
+            # Somar a nova contribuição
+            contribuicao = {func: anterior[func] for func in anterior if func not in contadores_mes} if parcial else {}
+            for func, cont in contadores_mes.items():
+                sabados = int(cont['sabados'])
+                domingos = int(cont['domingos'])
+                contribuicao[func] = [sabados, domingos]
+                
+                totais = agregado['funcionarios'].setdefault(func, {
+                    'Funcionário': func,
+                    'Sábados Trabalhados': 0,
+                    'Domingos Trabalhados': 0,
+                    'Total Fim de Semana': 0,
+                    'Rodada Domingo': 0,
+                    'Rodada Sábado': 0
+                })
+                totais['Sábados Trabalhados'] += sabados
+                totais['Domingos Trabalhados'] += domingos
+                totais['Total Fim de Semana'] += sabados + domingos
+            
+            agregado['meses'][chave_mes] = contribuicao
+            
+            # Rodadas vêm do mês mais recente salvo no ano
+            if chave_mes == max(agregado['meses']):
+                for func, cont in contadores_acumulados.items():
+                    if func in agregado['funcionarios']:
+                        agregado['funcionarios'][func]['Rodada Domingo'] = int(cont.get('rodada_domingo', 0))
+                        agregado['funcionarios'][func]['Rodada Sábado'] = int(cont.get('rodada_sabado', 0))
+            
+            self._gravar_contadores_anuais(ano, agregado)
+    
+    def carregar_contadores_anuais(self, ano: int) -> List[Dict]:
+        """
+        Carrega o agregado anual de contadores de fim de semana
+        
+        Se o agregado ainda não existir (escalas salvas antes dele), é
+        reconstruído uma única vez a partir das escalas do ano.
+        
+        Args:
+            ano: Ano desejado
+            
+        Returns:
+            Lista de registros (um por funcionário), vazia se não houver escalas
+        """
+        agregado = self._ler_contadores_anuais(ano)
+        
+        if agregado is None:
+            agregado = self.reconstruir_contadores_anuais(ano)
+        
+        return list(agregado['funcionarios'].values()) if agregado else []
+    
+    def reconstruir_contadores_anuais(self, ano: int) -> Optional[Dict]:
+        """
+        Reconstrói o agregado anual a partir das escalas salvas do ano
+        
+        Soma a aba CONTADORES_MES_ATUAL de cada mês (a aba CONTADORES_FIM_SEMANA
+        já é acumulada e não pode ser somada).
+        
+        Args:
+            ano: Ano a reconstruir
+            
+        Returns:
+            Agregado reconstruído ou None se não houver escalas no ano
+        """
+        agregado = {'ano': ano, 'meses': {}, 'funcionarios': {}}
+        
+        meses = [m for m in range(1, 13) if os.path.exists(f"{self.diretorio_escalas}/ESCALA_{ano}_{m:02d}.xlsx")]
+        planilhas, falhas = carregar_planilhas(
+            [f"{self.diretorio_escalas}/ESCALA_{ano}_{m:02d}.xlsx" for m in meses],
+            ['CONTADORES_MES_ATUAL', 'CONTADORES_FIM_SEMANA']
+        )
+        
+        for arquivo, erro in falhas:
+            print(f"⚠️  {arquivo} ignorado no agregado anual: {erro}")
+        
+        for mes, abas in zip(meses, planilhas):
+            if abas is None:
+                continue
+            
+            df_mes = abas['CONTADORES_MES_ATUAL']
+            df_acum = abas['CONTADORES_FIM_SEMANA']
+            
+            for _, row in df_mes.iterrows():
+                func = row['Funcionário']
+                sabados = int(row['Sábados Trabalhados'])
+                domingos = int(row['Domingos Trabalhados'])
+                agregado['meses'].setdefault(f"{mes:02d}", {})[func] = [sabados, domingos]
+                
+                totais = agregado['funcionarios'].setdefault(func, {
+                    'Funcionário': func,
+                    'Sábados Trabalhados': 0,
+                    'Domingos Trabalhados': 0,
+                    'Total Fim de Semana': 0,
+                    'Rodada Domingo': 0,
+                    'Rodada Sábado': 0
+                })
+                totais['Sábados Trabalhados'] += sabados
+                totais['Domingos Trabalhados'] += domingos
+                totais['Total Fim de Semana'] += sabados + domingos
+            
+            # Edições registradas depois do salvamento do mês
+            for func, (delta_sab, delta_dom) in self.deltas_contadores(ano, mes).items():
+                contribuicao = agregado['meses'].setdefault(f"{mes:02d}", {}).setdefault(func, [0, 0])
+                contribuicao[0] += delta_sab
+                contribuicao[1] += delta_dom
+                
+                totais = agregado['funcionarios'].setdefault(func, {
+                    'Funcionário': func,
+                    'Sábados Trabalhados': 0,
+                    'Domingos Trabalhados': 0,
+                    'Total Fim de Semana': 0,
+                    'Rodada Domingo': 0,
+                    'Rodada Sábado': 0
+                })
+                totais['Sábados Trabalhados'] += delta_sab
+                totais['Domingos Trabalhados'] += delta_dom
+                totais['Total Fim de Semana'] += delta_sab + delta_dom
+            
+            # Meses em ordem crescente: as rodadas finais são as do último mês
+            for _, row in df_acum.iterrows():
+                func = row['Funcionário']
+                if func in agregado['funcionarios']:
+                    agregado['funcionarios'][func]['Rodada Domingo'] = int(row.get('Rodada Domingo', 0))
+                    agregado['funcionarios'][func]['Rodada Sábado'] = int(row.get('Rodada Sábado', 0))
+        
+        if not agregado['meses']:
+            return None
+        
+        self._gravar_contadores_anuais(ano, agregado)
+        print(f"✅ Agregado anual de contadores reconstruído para {ano}")
+        
+        return agregado
+    
+    def _ler_contadores_anuais(self, ano: int) -> Optional[Dict]:
+        """Lê o arquivo de agregado anual (None se não existir)"""
+        arquivo = f"{self.diretorio_agregados}/CONTADORES_ANO_{ano}.json"
+        
+        if not os.path.exists(arquivo):
+            return None
+        
+        with open(arquivo, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _gravar_contadores_anuais(self, ano: int, agregado: Dict):
+        """Grava o agregado anual (arquivo temporário + renomeação)"""
+        gravar_json_atomico(f"{self.diretorio_agregados}/CONTADORES_ANO_{ano}.json", agregado)
+    
     def criar_resumo_semanal(self, df_escala: pd.DataFrame, writer):
         """Cria aba de resumo semanal"""
-        resumo = df_escala.groupby(['Semana do Mês']).agg({
+        resumo = df_escala.groupby(['Semana do Mês'], observed=True).agg({
             'Funcionário': 'count',
             'Dias Trabalhados': 'sum',
-            'Sáb': lambda x: (x == 'P').sum(),
-            'Dom': lambda x: (x == 'P').sum()
+            'Sáb': lambda x: presenca(x).sum(),
+            'Dom': lambda x: presenca(x).sum()
         }).reset_index()
         
         resumo.columns = ['Semana', 'Total Funcionários', 'Total Dias Trabalhados',
                          'Pessoas no Sábado', 'Pessoas no Domingo']
         
-        resumo['Meta Sábado'] = 8
-        resumo['Meta Domingo'] = 3
+        meta_sabado = self.regras.cobertura.get('Sáb', 0)
+        meta_domingo = self.regras.cobertura.get('Dom', 0)
+        resumo['Meta Sábado'] = meta_sabado
+        resumo['Meta Domingo'] = meta_domingo
         resumo['Status Sábado'] = resumo.apply(
-            lambda x: '✅ OK' if x['Pessoas no Sábado'] == 8 else f'❌ Faltam {8 - x["Pessoas no Sábado"]}', 
+            lambda x: '✅ OK' if x['Pessoas no Sábado'] == meta_sabado else f'❌ Faltam {meta_sabado - x["Pessoas no Sábado"]}', 
             axis=1
         )
         resumo['Status Domingo'] = resumo.apply(
-            lambda x: '✅ OK' if x['Pessoas no Domingo'] == 3 else f'❌ Faltam {3 - x["Pessoas no Domingo"]}', 
+            lambda x: '✅ OK' if x['Pessoas no Domingo'] == meta_domingo else f'❌ Faltam {meta_domingo - x["Pessoas no Domingo"]}', 
             axis=1
         )
         
@@ -1027,10 +1650,10 @@ class SistemaEscalaExcel:
     
     def criar_resumo_ilha(self, df_escala: pd.DataFrame, writer):
         """Cria aba de resumo por ilha"""
-        resumo_ilha = df_escala.groupby(['Ilha', 'Semana do Mês']).agg({
+        resumo_ilha = df_escala.groupby(['Ilha', 'Semana do Mês'], observed=True).agg({
             'Funcionário': 'count',
-            'Sáb': lambda x: (x == 'P').sum(),
-            'Dom': lambda x: (x == 'P').sum()
+            'Sáb': lambda x: presenca(x).sum(),
+            'Dom': lambda x: presenca(x).sum()
         }).reset_index()
         
         resumo_ilha.columns = ['Ilha', 'Semana', 'Total Funcionários',
@@ -1038,17 +1661,16 @@ class SistemaEscalaExcel:
         
         resumo_ilha.to_excel(writer, sheet_name='RESUMO_POR_ILHA', index=False)
     
-    def criar_verificacao_regras(self, df_escala: pd.DataFrame, writer):
-        """Cria aba de verificação de regras"""
-        verificacao = self.verificar_regras(df_escala)
-        
+    def criar_verificacao_regras(self, verificacao: Dict, writer):
+        """Cria aba de verificação de regras a partir do relatório de validação"""
+        regras = self.regras.padrao
         dados_verificacao = [
             ['Regra', 'Status'],
-            ['5 dias trabalhados por semana', '✅ OK' if verificacao['regra_5_dias'] else '❌ FALHOU'],
+            [f"{regras['dias_trabalhados']} dias trabalhados por semana", '✅ OK' if verificacao['regra_5_dias'] else '❌ FALHOU'],
             ['Sem duas folgas seguidas (seg-sex)', '✅ OK' if verificacao['regra_folgas_seguidas'] else '❌ FALHOU'],
             ['Não trabalha sábado e domingo', '✅ OK' if verificacao['regra_fim_semana_seguido'] else '❌ FALHOU'],
-            ['Cobertura de sábado (8 pessoas)', '✅ OK' if verificacao['cobertura_sabado'] else '❌ FALHOU'],
-            ['Cobertura de domingo (3 pessoas)', '✅ OK' if verificacao['cobertura_domingo'] else '❌ FALHOU'],
+            [f"Cobertura de sábado ({self.regras.cobertura.get('Sáb', 0)} pessoas)", '✅ OK' if verificacao['cobertura_sabado'] else '❌ FALHOU'],
+            [f"Cobertura de domingo ({self.regras.cobertura.get('Dom', 0)} pessoas)", '✅ OK' if verificacao['cobertura_domingo'] else '❌ FALHOU'],
             ['Rodízio de domingo perfeito', '✅ OK' if verificacao['rodizio_domingo'] else '❌ FALHOU'],
             ['Rodízio de sábado perfeito', '✅ OK' if verificacao['rodizio_sabado'] else '❌ FALHOU'],
             ['Rodízio de folgas semanal', '✅ OK' if verificacao['rodizio_folgas'] else '❌ FALHOU'],
@@ -1063,10 +1685,100 @@ class SistemaEscalaExcel:
         
         df_verificacao.to_excel(writer, sheet_name='VERIFICACAO_REGRAS', index=False)
     
-    def criar_aba_rodizio_perfeito(self, rodizio: Dict, df_contadores: pd.DataFrame, writer):
-        """Cria nova aba de rodízio perfeito"""
-        # Adicionar informações de rodízio
-        df_rodizio = df_contadores.copy()
+    def resumir_verificacao(self, verificacao: Dict) -> Dict:
+        """Resumo compacto da verificação de regras (para o manifesto)"""
+        regras = [v for k, v in verificacao.items() if k != 'erros']
+        
+        return {
+            'regras_ok': int(sum(regras)),
+            'total_regras': len(regras),
+            'erros': len(verificacao['erros'])
+        }
+    
+    def assinatura_escala(self, df_escala: pd.DataFrame) -> str:
+        """Impressão digital do conteúdo da escala (muda a cada alteração de linha ou dia, ou das regras)"""
+        colunas = ['Semana do Mês', 'Funcionário', 'Ilha', 'Dias Trabalhados'] + self.dias_semana
+        hashes = pd.util.hash_pandas_object(df_escala[colunas].astype(str), index=False)
+        return f"{len(df_escala)}-{int(hashes.sum()):016x}-{self.regras.assinatura}"
+    
+    def validar_escala(self, df_escala: pd.DataFrame) -> Dict:
+        """
+        Relatório de validação da escala, calculado uma vez por versão
+        
+        O relatório fica em df_escala.attrs['validacao'] e só é recalculado
+        quando o conteúdo da escala muda.
+        
+        Args:
+            df_escala: DataFrame com a escala
+            
+        Returns:
+            Dicionário com assinatura, regras, rodízio e resumo
+        """
+        assinatura = self.assinatura_escala(df_escala)
+        validacao = df_escala.attrs.get('validacao')
+        
+        if validacao is not None and validacao['assinatura'] == assinatura:
+            return validacao
+        
+        rodizio = self.verificar_rodizio_perfeito(df_escala)
+        regras = self.verificar_regras(df_escala, rodizio)
+        
+        validacao = {
+            'assinatura': assinatura,
+            'regras': regras,
+            'rodizio': rodizio,
+            'resumo': self.resumir_verificacao(regras)
+        }
+        df_escala.attrs['validacao'] = validacao
+        
+        return validacao
+    
+    def salvar_validacao(self, ano: int, mes: int, validacao: Dict):
+        """
+        Grava o relatório de validação do mês, associado à versão atual do arquivo
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            validacao: Saída de validar_escala
+        """
+        gravar_json_atomico(f"{self.diretorio_agregados}/VALIDACAO_{ano}_{mes:02d}.json",
+                            dict(validacao, versao=self.versao_periodo(ano, mes),
+                                 versao_regras=self.regras.assinatura))
+    
+    def carregar_validacao(self, ano: int, mes: int) -> Optional[Dict]:
+        """
+        Carrega o relatório de validação de um mês, recalculando apenas se o mês
+        ou as regras (regras_escala.json) mudaram
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Relatório de validação ou None se a escala não existir
+        """
+        if not os.path.exists(f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"):
+            return None
+        
+        cache = f"{self.diretorio_agregados}/VALIDACAO_{ano}_{mes:02d}.json"
+        if os.path.exists(cache):
+            with open(cache, encoding='utf-8') as f:
+                validacao = json.load(f)
+            versao_regras = validacao.pop('versao_regras', None)
+            if (validacao.pop('versao', None) == self.versao_periodo(ano, mes)
+                    and versao_regras == self.regras.assinatura):
+                return validacao
+        
+        validacao = self.validar_escala(self.carregar_escala(ano, mes))
+        self.salvar_validacao(ano, mes, validacao)
+        
+        return validacao
+    
+    def criar_aba_rodizio_perfeito(self, rodizio: Dict, df_contadores: pd.DataFrame, writer):
+        """Cria nova aba de rodízio perfeito"""
+        # Adicionar informações de rodízio
+        df_rodizio = df_contadores.copy()
         
         # Calcular diferença dentro de cada ilha
         def calcular_diferenca_ilha(funcionario):
@@ -1144,29 +1856,7 @@ class SistemaEscalaExcel:
         
         if dados_folgas:
             df_folgas = pd.DataFrame(dados_folgas)
-            
-            # Calcular estatísticas por ilha
-            estatisticas_ilha = []
-            for ilha in self.rodizio_folgas.keys():
-                df_ilha = df_folgas[df_folgas['Ilha'] == ilha]
-                
-                for dia_idx, dia_nome in enumerate(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']):
-                    media = df_ilha[f'Folgas {dia_nome}'].mean()
-                    min_val = df_ilha[f'Folgas {dia_nome}'].min()
-                    max_val = df_ilha[f'Folgas {dia_nome}'].max()
-                    diff = max_val - min_val
-                    
-                    estatisticas_ilha.append({
-                        'Ilha': ilha,
-                        'Dia da Semana': dia_nome,
-                        'Média de Folgas': round(media, 2),
-                        'Mínimo': min_val,
-                        'Máximo': max_val,
-                        'Diferença': diff,
-                        'Status': '✅ Balanceado' if diff <= 2 else '⚠️ Desbalanceado'
-                    })
-            
-            df_estatisticas = pd.DataFrame(estatisticas_ilha)
+            df_estatisticas = self.estatisticas_rodizio_folgas(df_folgas)
             
             # Ordenar por total de folgas
             df_folgas = df_folgas.sort_values('Total Folgas Semana', ascending=True)
@@ -1175,12 +1865,45 @@ class SistemaEscalaExcel:
             df_folgas.to_excel(writer, sheet_name='RODÍZIO_FOLGAS', index=False)
             df_estatisticas.to_excel(writer, sheet_name='ESTAT_FOLGAS', index=False)
     
-    def verificar_regras(self, df_escala: pd.DataFrame) -> Dict:
+    def estatisticas_rodizio_folgas(self, df_folgas: pd.DataFrame) -> pd.DataFrame:
+        """
+        Estatísticas de folgas por ilha e dia útil (aba ESTAT_FOLGAS)
+        
+        Args:
+            df_folgas: Contadores de folgas (formato da aba RODÍZIO_FOLGAS)
+            
+        Returns:
+            DataFrame com média, mínimo, máximo e status por ilha e dia
+        """
+        estatisticas_ilha = []
+        for ilha in self.rodizio_folgas.keys():
+            df_ilha = df_folgas[df_folgas['Ilha'] == ilha]
+            
+            for dia_idx, dia_nome in enumerate(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']):
+                media = df_ilha[f'Folgas {dia_nome}'].mean()
+                min_val = df_ilha[f'Folgas {dia_nome}'].min()
+                max_val = df_ilha[f'Folgas {dia_nome}'].max()
+                diff = max_val - min_val
+                
+                estatisticas_ilha.append({
+                    'Ilha': ilha,
+                    'Dia da Semana': dia_nome,
+                    'Média de Folgas': round(media, 2),
+                    'Mínimo': min_val,
+                    'Máximo': max_val,
+                    'Diferença': diff,
+                    'Status': '✅ Balanceado' if diff <= 2 else '⚠️ Desbalanceado'
+                })
+        
+        return pd.DataFrame(estatisticas_ilha)
+    
+    def verificar_regras(self, df_escala: pd.DataFrame, rodizio: Optional[Dict] = None) -> Dict:
         """
         Verifica se todas as regras foram atendidas
         
         Args:
             df_escala: DataFrame com a escala
+            rodizio: Resultado já calculado de verificar_rodizio_perfeito (opcional)
             
         Returns:
             Dicionário com resultados da verificação
@@ -1197,59 +1920,59 @@ class SistemaEscalaExcel:
             'erros': []
         }
         
-        # REGRA 1: Cada funcionário deve ter 5 dias de trabalho
-        for _, row in df_escala.iterrows():
-            if row['Dias Trabalhados'] != 5:
-                resultados['regra_5_dias'] = False
-                resultados['erros'].append(
-                    f"{row['Funcionário']} tem {row['Dias Trabalhados']} dias trabalhados"
-                )
+        # Todas as regras de uma vez sobre a matriz linhas x 7 (regras.py)
+        trabalha = np.column_stack([presenca(df_escala[dia]).to_numpy() for dia in self.dias_semana])
+        nomes = df_escala['Funcionário'].astype(str).to_numpy()
+        verificacao = self.regras.verificar(trabalha, df_escala['Ilha'].to_numpy(),
+                                            df_escala['Semana do Mês'].to_numpy(), nomes)
+        
+        # REGRA 1: Cada funcionário deve ter os dias de trabalho da sua ilha
+        dias_trabalhados = verificacao['dias']
+        for pos in np.flatnonzero(dias_trabalhados != verificacao['dias_esperados']):
+            resultados['regra_5_dias'] = False
+            resultados['erros'].append(
+                f"{nomes[pos]} tem {dias_trabalhados[pos]} dias trabalhados"
+            )
         
         # REGRA 2: Não pode ter duas folgas seguidas na semana
-        for _, row in df_escala.iterrows():
-            dias_semana = [row['Seg'], row['Ter'], row['Qua'], row['Qui'], row['Sex']]
-            
-            for i in range(len(dias_semana) - 1):
-                if dias_semana[i] == "F" and dias_semana[i + 1] == "F":
-                    resultados['regra_folgas_seguidas'] = False
-                    resultados['erros'].append(
-                        f"{row['Funcionário']} tem folgas seguidas: {self.dias_completos[i]} e {self.dias_completos[i+1]}"
-                    )
-                    break
+        folga_seguida = verificacao['folga_seguida']
+        for pos in np.flatnonzero(folga_seguida >= 0):
+            i = folga_seguida[pos]
+            resultados['regra_folgas_seguidas'] = False
+            resultados['erros'].append(
+                f"{nomes[pos]} tem folgas seguidas: {self.dias_completos[i]} e {self.dias_completos[i+1]}"
+            )
         
         # REGRA 3: Não pode trabalhar sábado e domingo
-        for _, row in df_escala.iterrows():
-            if row['Sáb'] == "P" and row['Dom'] == "P":
-                resultados['regra_fim_semana_seguido'] = False
-                resultados['erros'].append(
-                    f"{row['Funcionário']} trabalha sábado e domingo"
-                )
+        for pos in np.flatnonzero(verificacao['sabado_e_domingo']):
+            resultados['regra_fim_semana_seguido'] = False
+            resultados['erros'].append(
+                f"{nomes[pos]} trabalha sábado e domingo"
+            )
         
-        # REGRA 4: Cobertura de sábado (8 pessoas)
-        semanas = df_escala['Semana do Mês'].unique()
-        for semana in semanas:
-            df_semana = df_escala[df_escala['Semana do Mês'] == semana]
-            pessoas_sabado = (df_semana['Sáb'] == 'P').sum()
+        # REGRAS 4 e 5: Cobertura de sábado e domingo (site e ilhas com meta própria)
+        for dia, chave, nome_dia in (('Sáb', 'cobertura_sabado', 'sábado'), ('Dom', 'cobertura_domingo', 'domingo')):
+            if dia not in verificacao['cobertura']:
+                continue
             
-            if pessoas_sabado != 8:
-                resultados['cobertura_sabado'] = False
-                resultados['erros'].append(
-                    f"Semana {semana}: {pessoas_sabado} pessoas no sábado (deveria ser 8)"
-                )
-        
-        # REGRA 5: Cobertura de domingo (3 pessoas)
-        for semana in semanas:
-            df_semana = df_escala[df_escala['Semana do Mês'] == semana]
-            pessoas_domingo = (df_semana['Dom'] == 'P').sum()
+            pessoas, meta = verificacao['cobertura'][dia]
+            for semana, pessoas_dia in zip(verificacao['semanas'], pessoas):
+                if pessoas_dia != meta:
+                    resultados[chave] = False
+                    resultados['erros'].append(
+                        f"Semana {semana}: {pessoas_dia} pessoas no {nome_dia} (deveria ser {meta})"
+                    )
             
-            if pessoas_domingo != 3:
-                resultados['cobertura_domingo'] = False
-                resultados['erros'].append(
-                    f"Semana {semana}: {pessoas_domingo} pessoas no domingo (deveria ser 3)"
-                )
+            for ilha, semana, dia_ilha, pessoas_dia, meta in verificacao['cobertura_ilhas']:
+                if dia_ilha == dia:
+                    resultados[chave] = False
+                    resultados['erros'].append(
+                        f"{ilha} semana {semana}: {pessoas_dia} pessoas no {nome_dia} (deveria ser {meta})"
+                    )
         
         # REGRA 6: Rodízio de domingo
-        rodizio = self.verificar_rodizio_perfeito(df_escala)
+        if rodizio is None:
+            rodizio = self.verificar_rodizio_perfeito(df_escala)
         if not rodizio['balanceamento_perfeito']:
             resultados['rodizio_domingo'] = False
             resultados['rodizio_sabado'] = False
@@ -1258,41 +1981,91 @@ class SistemaEscalaExcel:
             for violacao in rodizio['violacoes_sabado'][:2]:
                 resultados['erros'].append(f"Rodízio Sábado: {violacao}")
         
-        # REGRA 7: Rodízio de folgas (verificar se as folgas estão bem distribuídas)
-        # Analisar por ilha
+        # REGRA 7: Rodízio de folgas (folgas por dia útil de cada ilha contra a média esperada)
+        posicao_ilha = {str(ilha): i for i, ilha in enumerate(verificacao['ilhas'])}
+        dias_nomes = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']
         for ilha in self.funcionarios.keys():
-            df_ilha = df_escala[df_escala['Ilha'] == ilha]
-            
-            # Contar folgas por dia da semana
-            folgas_por_dia = {i: 0 for i in range(5)}
-            for _, row in df_ilha.iterrows():
-                for i, dia in enumerate(['Seg', 'Ter', 'Qua', 'Qui', 'Sex']):
-                    if row[dia] == 'F':
-                        folgas_por_dia[i] += 1
-            
-            # Verificar se as folgas estão bem distribuídas
-            total_funcionarios = len(df_ilha['Funcionário'].unique())
-            semanas_no_mes = len(semanas)
-            
-            # Idealmente, cada funcionário deveria ter folgas em dias diferentes
-            # Verificar se há dias com muitas ou poucas folgas
-            for dia_idx, dia_nome in enumerate(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']):
-                folgas_no_dia = folgas_por_dia[dia_idx]
-                media_esperada = (total_funcionarios * 2 * semanas_no_mes) / 5  # 2 folgas por semana por funcionário
-                
-                if abs(folgas_no_dia - media_esperada) > media_esperada * 0.5:  # 50% de tolerância
-                    resultados['rodizio_folgas'] = False
-                    resultados['erros'].append(
-                        f"{ilha}: Folgas na {dia_nome} desbalanceadas ({folgas_no_dia} vs esperado ~{media_esperada:.1f})"
-                    )
-                    break
+            i = posicao_ilha.get(ilha)
+            if i is None or not verificacao['folgas_desbalanceadas'][i].any():
+                continue
+            
+            dia_idx = int(verificacao['folgas_desbalanceadas'][i].argmax())
+            resultados['rodizio_folgas'] = False
+            resultados['erros'].append(
+                f"{ilha}: Folgas na {dias_nomes[dia_idx]} desbalanceadas "
+                f"({verificacao['folgas_dia'][i, dia_idx]} vs esperado ~{verificacao['folgas_esperadas'][i]:.1f})"
+            )
         
         return resultados
     
+    def pontuar_escala(self, df_escala: pd.DataFrame) -> Dict:
+        """
+        Pontua uma escala para comparar candidatos (menor é melhor)
+        
+        Violações de regra pesam muito mais que desequilíbrios de justiça.
+        
+        Args:
+            df_escala: DataFrame com a escala
+            
+        Returns:
+            Dicionário com o total e suas parcelas
+        """
+        regras = self.validar_escala(df_escala)['regras']
+        
+        trabalha = np.column_stack([presenca(df_escala[dia]).to_numpy() for dia in self.dias_semana])
+        verificacao = self.regras.verificar(trabalha, df_escala['Ilha'].to_numpy(),
+                                            df_escala['Semana do Mês'].to_numpy(),
+                                            df_escala['Funcionário'].to_numpy())
+        
+        # Regras duras, contadas por ocorrência
+        violacoes = int((verificacao['dias'] != verificacao['dias_esperados']).sum())
+        violacoes += int((verificacao['folga_seguida'] >= 0).sum())
+        violacoes += int(verificacao['sabado_e_domingo'].sum())
+        violacoes += sum(int(np.abs(pessoas - meta).sum()) for pessoas, meta in verificacao['cobertura'].values())
+        
+        # Cobertura por ilha-semana contra as metas da geração (cobertura do site repartida)
+        fim_de_semana = pd.DataFrame({
+            'Ilha': df_escala['Ilha'].astype(str).to_numpy(),
+            'Semana': df_escala['Semana do Mês'].to_numpy(),
+            'Sáb': trabalha[:, 5].astype(int),
+            'Dom': trabalha[:, 6].astype(int)
+        }).groupby(['Semana', 'Ilha'], sort=False).sum()
+        for semana in fim_de_semana.index.unique(level='Semana'):
+            metas = self.metas_fim_de_semana(int(semana))
+            for ilha, pessoas in fim_de_semana.loc[semana].iterrows():
+                if ilha in metas:
+                    violacoes += abs(int(pessoas['Sáb']) - metas[ilha][0]) + abs(int(pessoas['Dom']) - metas[ilha][1])
+        
+        # Justiça: diferença de sábados/domingos e desvio das folgas por dia útil, por ilha
+        nomes, func_idx = np.unique(df_escala['Funcionário'].astype(str).to_numpy(), return_inverse=True)
+        ilhas, ilha_idx = np.unique(df_escala['Ilha'].astype(str).to_numpy(), return_inverse=True)
+        ilha_func = np.zeros(len(nomes), dtype=int)
+        ilha_func[func_idx] = ilha_idx
+        
+        domingos = np.bincount(func_idx, weights=trabalha[:, 6], minlength=len(nomes))
+        sabados = np.bincount(func_idx, weights=trabalha[:, 5], minlength=len(nomes))
+        folgas_ilha = verificacao['folgas_dia'].astype(float)
+        
+        diferenca_domingos = sum(np.ptp(domingos[ilha_func == i]) for i in range(len(ilhas)))
+        diferenca_sabados = sum(np.ptp(sabados[ilha_func == i]) for i in range(len(ilhas)))
+        desvio_folgas = float(folgas_ilha.std(axis=1).sum())
+        
+        total = (1000 * violacoes
+                 + 100 * (not regras['rodizio_domingo']) + 100 * (not regras['rodizio_sabado'])
+                 + 10 * diferenca_domingos + 5 * diferenca_sabados + desvio_folgas)
+        
+        return {
+            'total': round(float(total), 3),
+            'violacoes': violacoes,
+            'erros_verificacao': len(regras['erros']),
+            'diferenca_domingos': int(diferenca_domingos),
+            'diferenca_sabados': int(diferenca_sabados),
+            'desvio_folgas': round(desvio_folgas, 3)
+        }
+    
     def listar_escalas_existentes(self, return_list=False):
-        """Lista todas as escalas existentes no diretório"""
-        arquivos = sorted([f for f in os.listdir(self.diretorio_escalas) 
-                          if f.startswith('ESCALA_') and f.endswith('.xlsx')])
+        """Lista todas as escalas existentes no histórico (via manifesto)"""
+        arquivos = [entrada['arquivo'] for entrada in self.listar_historico()]
         
         if return_list:
             return arquivos
@@ -1316,6 +2089,432 @@ class SistemaEscalaExcel:
         
         return arquivos
     
+    def listar_historico(self) -> List[Dict]:
+        """
+        Lista as escalas do histórico a partir do manifesto
+        
+        Returns:
+            Entradas do manifesto (período, caminho, tamanho, mtime, contagens,
+            checksum e resumo de validação) em ordem de período
+        """
+        return listar_entradas(self.diretorio_escalas)
+    
+    def reindexar_historico(self) -> Dict:
+        """Reconstrói o manifesto varrendo o diretório do histórico"""
+        return reindexar_historico(self.diretorio_escalas)
+    
+    def versao_http(self, ano: int, mes: int, aberto: Optional[BinaryIO] = None) -> Optional[Dict]:
+        """
+        Identificadores de versão de um mês para cache HTTP (ETag/Last-Modified)
+        
+        O checksum vem do manifesto enquanto ele corresponder ao arquivo em
+        disco; só é recalculado se o manifesto estiver desatualizado.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            aberto: Excel já aberto: a versão é a desses bytes (fstat), mesmo
+                    que o arquivo seja substituído depois
+            
+        Returns:
+            Dicionário com checksum e mtime do Excel, e etag/mtime do conteúdo
+            com as edições do mês aplicadas; None se a escala não existir
+        """
+        arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+        
+        try:
+            info = os.fstat(aberto.fileno()) if aberto is not None else os.stat(arquivo)
+        except FileNotFoundError:
+            return None
+        
+        manifesto = ler_manifesto(self.diretorio_escalas) or {'escalas': {}}
+        entrada = manifesto['escalas'].get(f"{ano}-{mes:02d}")
+        
+        if entrada and entrada['mtime_ns'] == info.st_mtime_ns and entrada['tamanho'] == info.st_size:
+            checksum = entrada['checksum']
+        else:
+            checksum = calcular_checksum(aberto if aberto is not None else arquivo)
+        
+        diario = caminho_diario(self.diretorio_escalas, ano, mes)
+        versao_diario = os.stat(diario).st_mtime_ns if os.path.exists(diario) else 0
+        
+        return {
+            'checksum': checksum,
+            'mtime': info.st_mtime,
+            'etag': f"{checksum[:32]}-{versao_diario}" if versao_diario else checksum,
+            'mtime_conteudo': max(info.st_mtime, versao_diario / 1e9)
+        }
+    
+    def indexar_periodo(self, ano: int, mes: int, df_escala: pd.DataFrame):
+        """
+        Constrói os índices de consulta de um mês salvo
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            df_escala: DataFrame com a escala
+        """
+        indices.construir_indice_disponibilidade(self.diretorio_indices, ano, mes, df_escala)
+        self.codificar_periodo(ano, mes, df_escala)
+        
+        if indices.carregar_linha_do_tempo(self.diretorio_indices) is None:
+            # Primeira vez: montar a linha do tempo com todo o histórico
+            self.reconstruir_linha_do_tempo()
+        
+        # O mês vem da escala recebida (a reconstrução lê o que está em disco)
+        indices.atualizar_linha_do_tempo(self.diretorio_indices, ano, mes, df_escala)
+    
+    def codificar_periodo(self, ano: int, mes: int, df_escala: pd.DataFrame):
+        """
+        Grava a cópia codificada por padrão semanal (1 byte por funcionário-semana)
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            df_escala: DataFrame com a escala
+        """
+        ids_funcionarios = indices.registrar_funcionarios(self.diretorio_indices, df_escala['Funcionário'].astype(str))
+        padroes.gravar_escala_codificada(
+            f"{self.diretorio_indices}/ESCALA_{ano}_{mes:02d}.npz",
+            padroes.codificar_escala(df_escala, ids_funcionarios),
+            self.versao_periodo(ano, mes)
+        )
+    
+    def reconstruir_linha_do_tempo(self):
+        """Reconstrói a linha do tempo dos funcionários a partir de todo o histórico"""
+        entradas = self.listar_historico()
+        escalas, falhas = carregar_planilhas([e['caminho'] for e in entradas], 'ESCALA_COMPLETA',
+                                             transformar=compactar_escala)
+        
+        for arquivo, erro in falhas:
+            print(f"⚠️  {arquivo} ignorado na linha do tempo: {erro}")
+        
+        # Todos os meses em memória e uma única gravação
+        indices.reconstruir_linha_do_tempo(self.diretorio_indices, {
+            (entrada['ano'], entrada['mes']): aplicar_edicoes(
+                df_escala, ler_edicoes(self.diretorio_escalas, entrada['ano'], entrada['mes']))
+            for entrada, df_escala in zip(entradas, escalas) if df_escala is not None
+        })
+        
+        print(f"✅ Linha do tempo reconstruída com {len(entradas) - len(falhas)} meses")
+    
+    def historico_funcionario(self, nome: str, desde: Optional[str] = None) -> Optional[Dict]:
+        """
+        Histórico completo de um funcionário em uma única consulta ao índice
+        
+        Args:
+            nome: Nome do funcionário (sem diferenciar maiúsculas)
+            desde: Período inicial 'AAAA-MM' (inclusive)
+            
+        Returns:
+            Dicionário com semanas por mês, fins de semana trabalhados e
+            folgas por dia da semana, ou None se o funcionário não existir
+        """
+        linha_do_tempo = indices.carregar_linha_do_tempo(self.diretorio_indices)
+        
+        if linha_do_tempo is None:
+            self.reconstruir_linha_do_tempo()
+            linha_do_tempo = indices.carregar_linha_do_tempo(self.diretorio_indices) or {'funcionarios': {}}
+        
+        nomes = indices.carregar_registro(self.diretorio_indices)
+        id_func = next((i for i, n in enumerate(nomes) if n.upper() == nome.strip().upper()), None)
+        
+        if id_func is None or str(id_func) not in linha_do_tempo['funcionarios']:
+            return None
+        
+        resumo = indices.resumir_linha_do_tempo(linha_do_tempo['funcionarios'][str(id_func)], desde)
+        
+        return dict({'id': id_func, 'funcionario': nomes[id_func]}, **resumo)
+    
+    def obter_indice_disponibilidade(self, ano: int, mes: int) -> Optional[indices.IndiceDisponibilidade]:
+        """
+        Obtém o índice de disponibilidade de um mês
+        
+        Escalas salvas antes do índice são indexadas na primeira consulta.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Índice do mês ou None se a escala não existir
+        """
+        indice = indices.carregar_indice_disponibilidade(self.diretorio_indices, ano, mes)
+        
+        if indice is None:
+            df_escala = self.carregar_escala(ano, mes)
+            if df_escala is None:
+                return None
+            
+            # Só o índice pedido: os demais derivados ficam com o salvamento e o backfill
+            indices.construir_indice_disponibilidade(self.diretorio_indices, ano, mes, df_escala)
+            indice = indices.carregar_indice_disponibilidade(self.diretorio_indices, ano, mes)
+        
+        return indice
+    
+    def consultar_disponibilidade(self, inicio: Tuple[int, int, int, int],
+                                  fim: Optional[Tuple[int, int, int, int]] = None,
+                                  ilha: Optional[str] = None,
+                                  modo: str = 'todos') -> Dict:
+        """
+        Consulta quem trabalha em um dia, intervalo de dias ou vários meses
+        
+        Args:
+            inicio: (ano, mês, semana, dia) inicial, dia 0=Seg ... 6=Dom
+            fim: (ano, mês, semana, dia) final (padrão: só o dia inicial)
+            ilha: Restringir a uma ilha
+            modo: 'todos' (trabalha em todos os dias) ou 'algum' (em pelo menos um)
+            
+        Returns:
+            Dicionário com disponíveis e em folga (listas de {nome, ilha}),
+            total de escalados e dias consultados
+        """
+        fim = fim or inicio
+        indices_periodo = {}
+        
+        for periodo in indices.posicoes_intervalo(inicio, fim):
+            indice = self.obter_indice_disponibilidade(*periodo)
+            if indice is not None:
+                indices_periodo[periodo] = indice
+        
+        resultado = indices.consultar_disponibilidade(indices_periodo, inicio, fim, ilha, modo)
+        nomes = indices.carregar_registro(self.diretorio_indices)
+        
+        def ilha_de(id_funcionario):
+            # Ilha no mês mais recente do intervalo em que a pessoa aparece
+            for periodo in sorted(indices_periodo, reverse=True):
+                ilha_func = indices_periodo[periodo].ilha_de(id_funcionario)
+                if ilha_func:
+                    return ilha_func
+            return None
+        
+        def pessoas(bits):
+            return [{'nome': nomes[i], 'ilha': ilha_de(i)} for i in indices.ids_do_conjunto(bits)]
+        
+        disponiveis = resultado['disponiveis'] & resultado['escalados']
+        
+        return {
+            'disponiveis': pessoas(disponiveis),
+            'folga': pessoas(resultado['escalados'] & ~disponiveis),
+            'total': resultado['escalados'].bit_count(),
+            'dias_consultados': resultado['dias_consultados']
+        }
+    
+    def carregar_escala_codificada(self, ano: int, mes: int) -> Optional[padroes.EscalaCodificada]:
+        """
+        Carrega a escala de um mês codificada por padrão semanal
+        
+        A cópia codificada é regerada a partir do Excel (mais as edições do
+        mês) se estiver ausente ou se o Excel ou as edições tiverem mudado
+        depois dela. Só ela: os demais derivados ficam com o salvamento, a
+        edição e o backfill, fora do caminho de leitura.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Escala codificada ou None se a escala não existir
+        """
+        arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+        codificado = f"{self.diretorio_indices}/ESCALA_{ano}_{mes:02d}.npz"
+        
+        if not os.path.exists(arquivo):
+            return None
+        
+        versao = self.versao_periodo(ano, mes)
+        escala = self.escalas_em_memoria.get((ano, mes))
+        if escala is not None and escala.versao == versao:
+            return escala
+        
+        if os.path.exists(codificado):
+            escala = padroes.ler_escala_codificada(codificado, indices.carregar_registro(self.diretorio_indices))
+            if escala.versao == versao:
+                self.escalas_em_memoria[(ano, mes)] = escala
+                return escala
+        
+        df_escala = compactar_escala(pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA'))
+        df_escala = aplicar_edicoes(df_escala, ler_edicoes(self.diretorio_escalas, ano, mes))
+        self.codificar_periodo(ano, mes, df_escala)
+        
+        escala = padroes.ler_escala_codificada(codificado, indices.carregar_registro(self.diretorio_indices))
+        self.escalas_em_memoria[(ano, mes)] = escala
+        
+        return escala
+    
+    def carregar_escala(self, ano: int, mes: int) -> Optional[pd.DataFrame]:
+        """
+        Carrega a escala de um mês no esquema compacto
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            DataFrame compacto da escala ou None se não existir
+        """
+        escala = self.carregar_escala_codificada(ano, mes)
+        return escala.dataframe() if escala is not None else None
+    
+    def geracao_atual(self) -> int:
+        """Geração do histórico (mtime do marcador em ns; 0 se nunca houve alteração)"""
+        try:
+            return os.stat(self.arquivo_geracao).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    def marcar_alteracao(self, ano: int, mes: int):
+        """Regrava o marcador de geração para que outros processos revejam seus caches"""
+        gravar_json_atomico(self.arquivo_geracao, {'periodo': f"{ano}-{mes:02d}", 'pid': os.getpid()})
+    
+    def sincronizar_caches(self) -> int:
+        """
+        Descarta as escalas em memória que mudaram em disco
+        
+        Custa um stat quando nada mudou. Meses não alterados continuam em
+        memória (inclusive os herdados do snapshot do processo mestre).
+        
+        Returns:
+            Quantidade de meses descartados
+        """
+        geracao = self.geracao_atual()
+        if geracao == self.geracao_vista:
+            return 0
+        
+        self.geracao_vista = geracao
+        descartados = 0
+        
+        for (ano, mes), escala in list(self.escalas_em_memoria.items()):
+            arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+            if not os.path.exists(arquivo) or escala.versao != self.versao_periodo(ano, mes):
+                self.escalas_em_memoria.pop((ano, mes), None)
+                descartados += 1
+        
+        return descartados
+    
+    def atualizar_periodos(self, periodos: List[Tuple[int, int]], max_processos: Optional[int] = None,
+                           forcar: bool = False) -> List[Tuple[int, int]]:
+        """
+        Regera os derivados (cópia codificada, índices, agregados e validação)
+        dos meses cuja cópia codificada está ausente ou desatualizada
+        
+        Os Excel pendentes são lidos em paralelo; os derivados são gravados
+        neste processo (o registro de funcionários não é compartilhado entre
+        processos).
+        
+        Args:
+            periodos: Lista de (ano, mês)
+            max_processos: Limite de processos de leitura (padrão: núcleos da CPU)
+            forcar: Regerar mesmo os meses já atualizados
+            
+        Returns:
+            Meses regerados
+        """
+        pendentes = []
+        
+        for ano, mes in periodos:
+            arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+            codificado = f"{self.diretorio_indices}/ESCALA_{ano}_{mes:02d}.npz"
+            
+            if not os.path.exists(arquivo):
+                continue
+            if (not forcar and os.path.exists(codificado)
+                    and padroes.ler_versao_codificada(codificado) == self.versao_periodo(ano, mes)):
+                continue
+            
+            pendentes.append((ano, mes))
+        
+        escalas, falhas = carregar_planilhas(
+            [f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx" for ano, mes in pendentes],
+            'ESCALA_COMPLETA', max_processos=max_processos, transformar=compactar_escala
+        )
+        
+        for arquivo, erro in falhas:
+            print(f"  ✗ {arquivo}: erro ao carregar ({erro})")
+        
+        atualizados = []
+        for (ano, mes), df_escala in zip(pendentes, escalas):
+            if df_escala is None:
+                continue
+            
+            df_escala = aplicar_edicoes(df_escala, ler_edicoes(self.diretorio_escalas, ano, mes))
+            self.indexar_periodo(ano, mes, df_escala)
+            self.salvar_agregados_mes(ano, mes, self.agregar_escala_mes(df_escala))
+            self.salvar_validacao(ano, mes, self.validar_escala(df_escala))
+            atualizados.append((ano, mes))
+        
+        return atualizados
+    
+    def carregar_snapshot(self, meses: Optional[int] = None) -> int:
+        """
+        Carrega em memória as escalas codificadas e os índices do histórico
+        
+        Chamado no processo mestre antes de criar os workers: os arrays ficam
+        compartilhados entre eles por copy-on-write.
+        
+        Args:
+            meses: Apenas os N meses mais recentes (padrão: todos)
+            
+        Returns:
+            Quantidade de meses carregados
+        """
+        entradas = self.listar_historico()
+        if meses:
+            entradas = entradas[-meses:]
+        
+        for entrada in entradas:
+            self.carregar_escala_codificada(entrada['ano'], entrada['mes'])
+            self.obter_indice_disponibilidade(entrada['ano'], entrada['mes'])
+        
+        return len(entradas)
+    
+    def pagina_escala(self, ano: int, mes: int, cursor: int = 0, limite: int = 100,
+                      colunas: Optional[List[str]] = None, ilha: Optional[str] = None,
+                      semana: Optional[int] = None, funcionario: Optional[str] = None) -> Optional[Dict]:
+        """
+        Uma página da escala de um mês, lida da cópia codificada
+        
+        Os filtros são aplicados sobre os arrays codificados e só as linhas
+        da página são decodificadas, então o custo não depende do tamanho do mês.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            cursor: Posição a partir da qual a página começa (proximo_cursor da página anterior)
+            limite: Máximo de registros na página
+            colunas: Colunas desejadas (padrão: todas)
+            ilha: Filtrar por ilha
+            semana: Filtrar por semana do mês
+            funcionario: Filtrar por trecho do nome
+            
+        Returns:
+            Dicionário com registros, total filtrado e próximo cursor (None na
+            última página); None se a escala não existir
+        """
+        colunas = colunas or COLUNAS_ESCALA
+        desconhecidas = [c for c in colunas if c not in COLUNAS_ESCALA]
+        if desconhecidas:
+            raise ValueError(f"Colunas desconhecidas: {', '.join(desconhecidas)}")
+        if cursor < 0 or limite < 1:
+            raise ValueError("cursor deve ser >= 0 e limite >= 1")
+        
+        escala = self.carregar_escala_codificada(ano, mes)
+        if escala is None:
+            return None
+        
+        posicoes = escala.filtrar(ilha=ilha, semana=semana, funcionario=funcionario)
+        inicio = int(np.searchsorted(posicoes, cursor))
+        pagina = posicoes[inicio:inicio + limite]
+        
+        registros = expandir_escala(escala.dataframe(pagina)[colunas]).to_dict('records') if len(pagina) else []
+        
+        return {
+            'registros': registros,
+            'total': len(posicoes),
+            'colunas': colunas,
+            'proximo_cursor': int(pagina[-1]) + 1 if inicio + limite < len(posicoes) else None
+        }
+    
     def carregar_escala_anterior(self, ano: int, mes: int) -> Optional[pd.DataFrame]:
         """
         Carrega a escala do mês anterior
@@ -1338,7 +2537,7 @@ class SistemaEscalaExcel:
         
         if os.path.exists(arquivo):
             try:
-                df_anterior = pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA')
+                df_anterior = self.carregar_escala(ano_anterior, mes_anterior)
                 print(f"✅ Escala anterior carregada: {mes_anterior:02d}/{ano_anterior}")
                 return df_anterior
             except Exception as e:
@@ -1346,36 +2545,433 @@ class SistemaEscalaExcel:
         
         return None
     
+    def versao_arquivo(self, arquivo: str) -> List[int]:
+        """Versão de um arquivo salvo (mtime em ns e tamanho em bytes)"""
+        info = os.stat(arquivo)
+        return [info.st_mtime_ns, info.st_size]
+    
+    def versao_periodo(self, ano: int, mes: int) -> List[int]:
+        """Versão de um mês: versão do Excel mais a do diário de edições (0 se não houver)"""
+        diario = caminho_diario(self.diretorio_escalas, ano, mes)
+        versao_diario = os.stat(diario).st_mtime_ns if os.path.exists(diario) else 0
+        return self.versao_arquivo(f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx") + [versao_diario]
+    
+    def deltas_contadores(self, ano: int, mes: int) -> Dict[str, List[int]]:
+        """
+        Soma dos deltas de sábados/domingos das edições do mês
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Dicionário {funcionário: [delta_sábados, delta_domingos]}
+        """
+        deltas = {}
+        for edicao in ler_edicoes(self.diretorio_escalas, ano, mes):
+            for func, (delta_sab, delta_dom) in edicao['contadores'].items():
+                total = deltas.setdefault(func, [0, 0])
+                total[0] += delta_sab
+                total[1] += delta_dom
+        return deltas
+    
+    def ler_contadores_fim_semana(self, ano: int, mes: int) -> pd.DataFrame:
+        """
+        Lê a aba CONTADORES_FIM_SEMANA de um mês com as edições do mês aplicadas
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            DataFrame com os contadores acumulados
+        """
+        arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+        df_contadores = pd.read_excel(arquivo, sheet_name='CONTADORES_FIM_SEMANA')
+        deltas = self.deltas_contadores(ano, mes)
+        
+        if not deltas:
+            return df_contadores
+        
+        novos = [func for func in deltas if func not in set(df_contadores['Funcionário'])]
+        if novos:
+            df_contadores = pd.concat([df_contadores, pd.DataFrame({'Funcionário': novos})], ignore_index=True)
+            df_contadores = df_contadores.fillna(0)
+        
+        delta_sab = df_contadores['Funcionário'].map(lambda f: deltas.get(f, [0, 0])[0])
+        delta_dom = df_contadores['Funcionário'].map(lambda f: deltas.get(f, [0, 0])[1])
+        df_contadores['Sábados Trabalhados'] = df_contadores['Sábados Trabalhados'] + delta_sab
+        df_contadores['Domingos Trabalhados'] = df_contadores['Domingos Trabalhados'] + delta_dom
+        df_contadores['Total Fim de Semana'] = df_contadores['Total Fim de Semana'] + delta_sab + delta_dom
+        
+        return df_contadores
+    
+    def deltas_folgas(self, ano: int, mes: int) -> Dict[str, Dict[int, int]]:
+        """
+        Soma dos deltas de folgas em dia útil das edições do mês
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Dicionário {funcionário: {dia (0=Seg ... 4=Sex): delta}}
+        """
+        deltas = {}
+        for edicao in ler_edicoes(self.diretorio_escalas, ano, mes):
+            for func, por_dia in edicao['folgas'].items():
+                total = deltas.setdefault(func, {})
+                for dia, delta in por_dia.items():
+                    total[int(dia)] = total.get(int(dia), 0) + delta
+        return deltas
+    
+    def ler_rodizio_folgas(self, ano: int, mes: int) -> pd.DataFrame:
+        """
+        Lê a aba RODÍZIO_FOLGAS de um mês com as edições do mês aplicadas
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            DataFrame com os contadores de folgas por dia útil
+        """
+        arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+        df_folgas = pd.read_excel(arquivo, sheet_name='RODÍZIO_FOLGAS')
+        deltas = self.deltas_folgas(ano, mes)
+        
+        if not deltas:
+            return df_folgas
+        
+        colunas = [f'Folgas {dia}' for dia in ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']]
+        for dia_idx, coluna in enumerate(colunas):
+            df_folgas[coluna] = df_folgas[coluna] + df_folgas['Funcionário'].map(
+                lambda f: deltas.get(f, {}).get(dia_idx, 0))
+        df_folgas['Total Folgas Semana'] = df_folgas[colunas].sum(axis=1)
+        
+        return df_folgas.sort_values('Total Folgas Semana', ascending=True, kind='stable')
+    
+    def carregar_rodizio_folgas(self, ano: int, mes: int):
+        """
+        Carrega nas estruturas de rodízio os contadores de folgas salvos de um mês
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+        """
+        for _, row in self.ler_rodizio_folgas(ano, mes).iterrows():
+            contador = self.rodizio_folgas.get(row['Ilha'], {}).get('contador_folgas', {}).get(row['Funcionário'])
+            if contador is not None:
+                for dia_idx, dia in enumerate(['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta']):
+                    contador[dia_idx] = int(row[f'Folgas {dia}'])
+    
+    def incluir_funcionario(self, ilha: str, funcionario: str):
+        """
+        Inclui um funcionário admitido nas estruturas de rodízio
+        
+        Args:
+            ilha: Ilha do funcionário
+            funcionario: Nome do funcionário
+        """
+        if funcionario in self.funcionarios.setdefault(ilha, []):
+            return
+        
+        self.funcionarios[ilha].append(funcionario)
+        rodizio = self.rodizio_ilhas[ilha]
+        rodizio['fila_domingo'].appendleft(funcionario)
+        rodizio['fila_sabado'].appendleft(funcionario)
+        rodizio['domingos_pegos'][funcionario] = 0
+        rodizio['sabados_pegos'][funcionario] = 0
+        
+        folgas = self.rodizio_folgas[ilha]
+        folgas['contador_folgas'][funcionario] = {i: 0 for i in range(5)}
+        folgas['ultimas_folgas'][funcionario] = []
+        folgas['sequencia_folgas'][funcionario] = deque()
+        folgas['prioridade_folgas'].append(funcionario)
+    
+    def incluir_admitidos(self, ano: int, mes: int):
+        """
+        Inclui no rodízio os funcionários admitidos pelo diário de edições do mês
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+        """
+        for edicao in ler_edicoes(self.diretorio_escalas, ano, mes):
+            if edicao['tipo'] == 'admissao':
+                for linha in edicao['linhas']:
+                    self.incluir_funcionario(linha['ilha'], linha['funcionario'])
+    
+    def atualizar_derivados_edicao(self, ano: int, mes: int, df_escala: pd.DataFrame,
+                                   semanas: Optional[List[int]] = None,
+                                   funcionarios: Optional[List[str]] = None,
+                                   versao_anterior: Optional[List[int]] = None):
+        """
+        Atualiza os derivados de um mês depois de uma edição incremental
+        
+        O Excel não é reescrito: índices, cópia codificada, agregados e
+        manifesto passam a refletir o Excel mais o diário de edições.
+        
+        Com as semanas e funcionários editados, o índice de disponibilidade,
+        a linha do tempo, os agregados e os contadores anuais recalculam só a
+        parte tocada. Se os derivados em disco não forem da versão anterior à
+        edição, o mês inteiro é recalculado. A validação é sempre do mês.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            df_escala: Escala do mês com as edições aplicadas
+            semanas: Semanas editadas (opcional)
+            funcionarios: Funcionários editados (opcional)
+            versao_anterior: versao_periodo do mês antes da edição (opcional)
+        """
+        agregados = None
+        if semanas is not None and funcionarios is not None:
+            agregados = self._ler_agregados_mes(ano, mes)
+            if agregados is not None and agregados.get('versao') != versao_anterior:
+                agregados = None
+        
+        if agregados is None or indices.carregar_linha_do_tempo(self.diretorio_indices) is None:
+            self.indexar_periodo(ano, mes, df_escala)
+            self.salvar_agregados_mes(ano, mes, self.agregar_escala_mes(df_escala))
+            self.atualizar_contadores_anuais(ano, mes, self.calcular_contadores(df_escala), {})
+        else:
+            df_tocado = df_escala[df_escala['Funcionário'].astype(str).isin(funcionarios)]
+            
+            indices.construir_indice_disponibilidade(self.diretorio_indices, ano, mes, df_escala, semanas=semanas)
+            self.codificar_periodo(ano, mes, df_escala)
+            indices.atualizar_linha_do_tempo(self.diretorio_indices, ano, mes, df_escala, funcionarios=funcionarios)
+            self.salvar_agregados_mes(ano, mes, self.substituir_agregados(agregados, df_escala, df_tocado))
+            self.atualizar_contadores_anuais(ano, mes, self.calcular_contadores(df_tocado), {}, parcial=True)
+        
+        validacao = self.validar_escala(df_escala)
+        self.salvar_validacao(ano, mes, validacao)
+        
+        registrar_no_manifesto(self.diretorio_escalas, dict(
+            criar_entrada(self.diretorio_escalas, ano, mes,
+                          linhas=len(df_escala),
+                          funcionarios=int(df_escala['Funcionário'].nunique()),
+                          validacao=validacao['resumo']),
+            edicoes=len(ler_edicoes(self.diretorio_escalas, ano, mes))
+        ))
+        self.marcar_alteracao(ano, mes)
+    
+    def consolidar_edicoes(self, ano: int, mes: int) -> Optional[str]:
+        """
+        Regrava o Excel do mês com as edições aplicadas e descarta o diário
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Caminho do arquivo salvo ou None se a escala não existir
+        """
+        with trava_geracao(self.diretorio_escalas, ano, mes):
+            df_escala = self.carregar_escala(ano, mes)
+            
+            if df_escala is None:
+                return None
+            
+            # A aba de rodízio de folgas vem do arquivo e do diário, não da memória
+            self.incluir_admitidos(ano, mes)
+            self.carregar_rodizio_folgas(ano, mes)
+            
+            return self.salvar_escala_excel(df_escala, ano, mes)
+    
+    def agregar_escala_mes(self, df_escala: pd.DataFrame) -> Dict:
+        """
+        Calcula os agregados parciais de um mês usados pelo relatório anual
+        
+        Args:
+            df_escala: DataFrame com a escala (aba ESCALA_COMPLETA)
+            
+        Returns:
+            Dicionário com agregados por funcionário/ilha e totais do mês (só
+            totais: a escala em si fica na cópia codificada)
+        """
+        df_escala = compactar_escala(df_escala)
+        sabados = df_escala['Sáb']
+        domingos = df_escala['Dom']
+        
+        por_funcionario = df_escala[['Funcionário', 'Ilha']].astype(str).assign(
+            **{'Dias Trabalhados': df_escala['Dias Trabalhados'].astype(int),
+               'Sáb': sabados.astype(int), 'Dom': domingos.astype(int)}
+        ).groupby(['Funcionário', 'Ilha'], sort=False).sum().reset_index()
+        
+        return {
+            'mes': int(df_escala['Mês'].iloc[0]),
+            'registros': len(df_escala),
+            'por_funcionario': por_funcionario,
+            'funcionarios': sorted(df_escala['Funcionário'].astype(str).unique()),
+            'dias_trabalhados': int(df_escala['Dias Trabalhados'].sum()),
+            'sabados': int(sabados.sum()),
+            'domingos': int(domingos.sum())
+        }
+    
+    def salvar_agregados_mes(self, ano: int, mes: int, agregados: Dict):
+        """
+        Grava o cache de agregados do mês, associado à versão atual do arquivo
+        
+        JSON só com totais: nada que seja executado ao ler o cache.
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            agregados: Saída de agregar_escala_mes
+        """
+        gravar_json_atomico(f"{self.diretorio_agregados}/ESCALA_{ano}_{mes:02d}.json", dict(
+            agregados,
+            por_funcionario=agregados['por_funcionario'].to_dict('records'),
+            versao=self.versao_periodo(ano, mes)
+        ))
+    
+    def _ler_agregados_mes(self, ano: int, mes: int) -> Optional[Dict]:
+        """JSON de agregados do mês como gravado (None se não existir ou estiver inválido)"""
+        try:
+            with open(f"{self.diretorio_agregados}/ESCALA_{ano}_{mes:02d}.json", encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def substituir_agregados(self, agregados: Dict, df_escala: pd.DataFrame,
+                             df_tocado: pd.DataFrame) -> Dict:
+        """
+        Substitui nos agregados gravados as linhas dos funcionários editados
+        
+        Args:
+            agregados: JSON de agregados do mês antes da edição
+            df_escala: Escala do mês com as edições aplicadas
+            df_tocado: Linhas de df_escala dos funcionários editados
+            
+        Returns:
+            Agregados no formato de agregar_escala_mes
+        """
+        registros = {(r['Funcionário'], r['Ilha']): r for r in agregados['por_funcionario']}
+        
+        # Poucas linhas por funcionário editado: somar direto, sem groupby
+        tocados = {}
+        for nome, ilha, dias, sab, dom in zip(df_tocado['Funcionário'].astype(str), df_tocado['Ilha'].astype(str),
+                                              df_tocado['Dias Trabalhados'], presenca(df_tocado['Sáb']),
+                                              presenca(df_tocado['Dom'])):
+            registro = tocados.setdefault((nome, ilha), dict(zip(COLUNAS_AGREGADOS, [nome, ilha, 0, 0, 0])))
+            registro['Dias Trabalhados'] += int(dias)
+            registro['Sáb'] += int(sab)
+            registro['Dom'] += int(dom)
+        
+        nomes_tocados = {nome for nome, _ in tocados}
+        registros = {chave: r for chave, r in registros.items() if chave[0] not in nomes_tocados}
+        registros.update(tocados)
+        
+        # Mesma ordem de aparição de agregar_escala_mes
+        ordem = dict.fromkeys(zip(df_escala['Funcionário'].astype(str), df_escala['Ilha'].astype(str)))
+        por_funcionario = pd.DataFrame([registros[chave] for chave in ordem], columns=COLUNAS_AGREGADOS)
+        
+        return {
+            'mes': agregados['mes'],
+            'registros': len(df_escala),
+            'por_funcionario': por_funcionario,
+            'funcionarios': sorted(por_funcionario['Funcionário'].unique()),
+            'dias_trabalhados': int(por_funcionario['Dias Trabalhados'].sum()),
+            'sabados': int(por_funcionario['Sáb'].sum()),
+            'domingos': int(por_funcionario['Dom'].sum())
+        }
+    
+    def carregar_agregados_mes(self, ano: int, mes: int) -> Optional[Dict]:
+        """
+        Carrega os agregados de um mês, recalculando apenas se o arquivo mudou
+        
+        Args:
+            ano: Ano da escala
+            mes: Mês da escala
+            
+        Returns:
+            Agregados do mês ou None se a escala não existir
+        """
+        return self.carregar_agregados_periodos([(ano, mes)]).get((ano, mes))
+    
+    def carregar_agregados_periodos(self, periodos: List[Tuple[int, int]]) -> Dict:
+        """
+        Carrega os agregados de vários meses
+        
+        Meses com cache válido não tocam no Excel; os demais são lidos em
+        paralelo (um processo por arquivo) e têm o cache regravado.
+        
+        Args:
+            periodos: Lista de (ano, mês)
+            
+        Returns:
+            Dicionário {(ano, mês): agregados} apenas com os meses disponíveis
+        """
+        resultado = {}
+        pendentes = []
+        
+        for ano, mes in periodos:
+            arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+            cache = f"{self.diretorio_agregados}/ESCALA_{ano}_{mes:02d}.json"
+            
+            if not os.path.exists(arquivo):
+                continue
+            
+            if os.path.exists(cache):
+                try:
+                    with open(cache, encoding='utf-8') as f:
+                        agregados = json.load(f)
+                    if agregados.get('versao') == self.versao_periodo(ano, mes):
+                        agregados['por_funcionario'] = pd.DataFrame(
+                            agregados['por_funcionario'], columns=COLUNAS_AGREGADOS)
+                        resultado[(ano, mes)] = agregados
+                        continue
+                except Exception as e:
+                    print(f"⚠️  Cache de agregados inválido para {mes:02d}/{ano}: {e}")
+            
+            pendentes.append((ano, mes, arquivo))
+        
+        # Cache ausente ou desatualizado: recalcular só esses meses
+        escalas, falhas = carregar_planilhas([p[2] for p in pendentes], 'ESCALA_COMPLETA',
+                                             transformar=compactar_escala)
+        
+        for arquivo, erro in falhas:
+            print(f"  ✗ {arquivo}: erro ao carregar ({erro})")
+        
+        for (ano, mes, arquivo), df_mes in zip(pendentes, escalas):
+            if df_mes is None:
+                continue
+            
+            df_mes = aplicar_edicoes(df_mes, ler_edicoes(self.diretorio_escalas, ano, mes))
+            agregados = self.agregar_escala_mes(df_mes)
+            self.salvar_agregados_mes(ano, mes, agregados)
+            resultado[(ano, mes)] = dict(agregados, versao=self.versao_periodo(ano, mes))
+        
+        return resultado
+    
     def gerar_relatorio_anual(self, ano: int):
         """
         Gera um relatório consolidado de um ano inteiro
         
+        O relatório é montado a partir dos agregados parciais de cada mês
+        (em cache, por versão do arquivo). Se nenhum mês mudou desde o último
+        relatório, o arquivo existente é reaproveitado.
+        
         Args:
             ano: Ano do relatório
         """
         print(f"\n📊 GERANDO RELATÓRIO ANUAL {ano}")
         print("=" * 50)
         
-        # Encontrar todas as escalas do ano
-        escalas_ano = []
+        # Encontrar os agregados de todas as escalas do ano
+        agregados_ano = {
+            mes: agregados
+            for (_, mes), agregados in sorted(self.carregar_agregados_periodos([(ano, m) for m in range(1, 13)]).items())
+        }
         
-        for mes in range(1, 13):
-            arquivo = f"{self.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
-            if os.path.exists(arquivo):
-                try:
-                    df_mes = pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA')
-                    escalas_ano.append(df_mes)
-                    print(f"  ✓ Mês {mes:02d}: {len(df_mes)} registros")
-                except:
-                    print(f"  ✗ Mês {mes:02d}: erro ao carregar")
+        for mes, agregados in agregados_ano.items():
+            print(f"  ✓ Mês {mes:02d}: {agregados['registros']} registros")
         
-        if not escalas_ano:
+        if not agregados_ano:
             print(f"❌ Nenhuma escala encontrada para o ano {ano}")
             return
         
-        # Consolidar todas as escalas
-        df_anual = pd.concat(escalas_ano, ignore_index=True)
-        
         # Criar diretório para relatórios anuais
         dir_relatorios = "RELATORIOS_ANUAIS"
         os.makedirs(dir_relatorios, exist_ok=True)
@@ -1383,74 +2979,161 @@ class SistemaEscalaExcel:
         # Nome do arquivo do relatório anual
         arquivo_relatorio = f"{dir_relatorios}/RELATORIO_ANUAL_{ano}.xlsx"
         
-        with pd.ExcelWriter(arquivo_relatorio, engine='openpyxl') as writer:
-            # ABA 1: DADOS COMPLETOS DO ANO
-            df_anual.to_excel(writer, sheet_name='DADOS_ANUAIS', index=False)
-            
-            # ABA 2: ESTATÍSTICAS POR FUNCIONÁRIO
-            stats_func = df_anual.groupby(['Funcionário', 'Ilha']).agg({
-                'Dias Trabalhados': 'sum',
-                'Sáb': lambda x: (x == 'P').sum(),
-                'Dom': lambda x: (x == 'P').sum()
-            }).reset_index()
-            
-            stats_func['Total Fim de Semana'] = stats_func['Sáb'] + stats_func['Dom']
-            stats_func.to_excel(writer, sheet_name='ESTATISTICAS_FUNCIONARIOS', index=False)
-            
-            # ABA 3: ESTATÍSTICAS POR MÊS
-            stats_mes = df_anual.groupby(['Mês']).agg({
-                'Funcionário': 'nunique',
-                'Dias Trabalhados': 'sum',
-                'Sáb': lambda x: (x == 'P').sum(),
-                'Dom': lambda x: (x == 'P').sum()
-            }).reset_index()
-            
-            stats_mes.columns = ['Mês', 'Funcionários Únicos', 'Total Dias Trabalhados',
-                                'Sábados Trabalhados', 'Domingos Trabalhados']
-            stats_mes.to_excel(writer, sheet_name='ESTATISTICAS_MENSAL', index=False)
-            
-            # ABA 4: BALANCEAMENTO DE FIM DE SEMANA
-            balanceamento = stats_func.copy()
-            balanceamento['Média Mensal'] = balanceamento['Total Fim de Semana'] / len(df_anual['Mês'].unique())
-            balanceamento = balanceamento.sort_values('Total Fim de Semana', ascending=True)
-            balanceamento.to_excel(writer, sheet_name='BALANCEAMENTO_ANUAL', index=False)
-            
-            # ABA 5: RESUMO GERAL
-            resumo_geral = pd.DataFrame({
-                'Métrica': [
-                    'Total de Meses',
-                    'Total de Funcionários',
-                    'Total de Dias Trabalhados',
-                    'Média Dias/Funcionário/Mês',
-                    'Total Sábados Trabalhados',
-                    'Total Domingos Trabalhados',
-                    'Média Sábados/Funcionário',
-                    'Média Domingos/Funcionário',
-                    'Funcionários sem Domingo',
-                    'Funcionários com 1 Domingo',
-                    'Funcionários com 2+ Domingos',
-                    'Maior diferença em Domingos',
-                    'Maior diferença em Sábados'
-                ],
-                'Valor': [
-                    len(df_anual['Mês'].unique()),
-                    len(df_anual['Funcionário'].unique()),
-                    df_anual['Dias Trabalhados'].sum(),
-                    df_anual['Dias Trabalhados'].sum() / (len(df_anual['Funcionário'].unique()) * len(df_anual['Mês'].unique())),
-                    stats_mes['Sábados Trabalhados'].sum(),
-                    stats_mes['Domingos Trabalhados'].sum(),
-                    stats_mes['Sábados Trabalhados'].sum() / len(df_anual['Funcionário'].unique()),
-                    stats_mes['Domingos Trabalhados'].sum() / len(df_anual['Funcionário'].unique()),
-                    (stats_func['Dom'] == 0).sum(),
-                    (stats_func['Dom'] == 1).sum(),
-                    (stats_func['Dom'] >= 2).sum(),
-                    stats_func['Dom'].max() - stats_func['Dom'].min() if len(stats_func) > 0 else 0,
-                    stats_func['Sáb'].max() - stats_func['Sáb'].min() if len(stats_func) > 0 else 0
-                ]
-            })
-            resumo_geral.to_excel(writer, sheet_name='RESUMO_GERAL', index=False)
+        # Reaproveitar o relatório se os meses de origem não mudaram
+        versoes = {f"{mes:02d}": agregados['versao'] for mes, agregados in agregados_ano.items()}
+        arquivo_versoes = f"{self.diretorio_agregados}/RELATORIO_ANUAL_{ano}.json"
+        
+        if os.path.exists(arquivo_relatorio) and os.path.exists(arquivo_versoes):
+            with open(arquivo_versoes, encoding='utf-8') as f:
+                if json.load(f) == versoes:
+                    print(f"\n✅ Relatório anual {ano} já está atualizado: {arquivo_relatorio}")
+                    return arquivo_relatorio
+        
+        stats_func, stats_mes, resumo_geral = self.consolidar_agregados(list(agregados_ano.values()))
+        
+        # BALANCEAMENTO DE FIM DE SEMANA
+        balanceamento = stats_func.copy()
+        balanceamento['Média Mensal'] = balanceamento['Total Fim de Semana'] / len(agregados_ano)
+        balanceamento = balanceamento.sort_values('Total Fim de Semana', ascending=True)
+        
+        with escrita_atomica(arquivo_relatorio, sufixo='.tmp.xlsx') as temporario:
+            # ABA 1: DADOS COMPLETOS DO ANO, gravados mês a mês a partir da cópia codificada
+            # ABAS 2 a 5: estatísticas por funcionário, por mês, balanceamento e resumo
+            exportacao.gravar_relatorio_anual(
+                temporario,
+                (self.carregar_escala_codificada(ano, mes) for mes in agregados_ano),
+                {
+                    'ESTATISTICAS_FUNCIONARIOS': stats_func,
+                    'ESTATISTICAS_MENSAL': stats_mes,
+                    'BALANCEAMENTO_ANUAL': balanceamento,
+                    'RESUMO_GERAL': resumo_geral
+                }
+            )
+        
+        gravar_json_atomico(arquivo_versoes, versoes)
         
         print(f"\n✅ Relatório anual {ano} salvo em: {arquivo_relatorio}")
         print(f"   - 5 abas incluídas no relatório")
         
-        return arquivo_relatorio
\ No newline at end of file
+        return arquivo_relatorio
+    
+    def consolidar_agregados(self, lista_agregados: List[Dict]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Combina agregados mensais em estatísticas por funcionário, por mês e gerais
+        
+        Args:
+            lista_agregados: Agregados mensais (saída de carregar_agregados_mes)
+            
+        Returns:
+            Tupla (stats_func, stats_mes, resumo_geral)
+        """
+        # ESTATÍSTICAS POR FUNCIONÁRIO: soma dos parciais mensais
+        stats_func = pd.concat(
+            [a['por_funcionario'] for a in lista_agregados], ignore_index=True
+        ).groupby(['Funcionário', 'Ilha']).sum().reset_index()
+        stats_func['Total Fim de Semana'] = stats_func['Sáb'] + stats_func['Dom']
+        
+        # ESTATÍSTICAS POR MÊS: uma linha por mês, direto dos totais em cache
+        stats_mes = pd.DataFrame([
+            {
+                'Mês': a['mes'],
+                'Funcionários Únicos': len(a['funcionarios']),
+                'Total Dias Trabalhados': a['dias_trabalhados'],
+                'Sábados Trabalhados': a['sabados'],
+                'Domingos Trabalhados': a['domingos']
+            }
+            for a in lista_agregados
+        ])
+        
+        total_meses = len(lista_agregados)
+        total_funcionarios = len(set().union(*(a['funcionarios'] for a in lista_agregados)))
+        total_dias = stats_mes['Total Dias Trabalhados'].sum()
+        
+        resumo_geral = pd.DataFrame({
+            'Métrica': [
+                'Total de Meses',
+                'Total de Funcionários',
+                'Total de Dias Trabalhados',
+                'Média Dias/Funcionário/Mês',
+                'Total Sábados Trabalhados',
+                'Total Domingos Trabalhados',
+                'Média Sábados/Funcionário',
+                'Média Domingos/Funcionário',
+                'Funcionários sem Domingo',
+                'Funcionários com 1 Domingo',
+                'Funcionários com 2+ Domingos',
+                'Maior diferença em Domingos',
+                'Maior diferença em Sábados'
+            ],
+            'Valor': [
+                total_meses,
+                total_funcionarios,
+                total_dias,
+                total_dias / (total_funcionarios * total_meses),
+                stats_mes['Sábados Trabalhados'].sum(),
+                stats_mes['Domingos Trabalhados'].sum(),
+                stats_mes['Sábados Trabalhados'].sum() / total_funcionarios,
+                stats_mes['Domingos Trabalhados'].sum() / total_funcionarios,
+                (stats_func['Dom'] == 0).sum(),
+                (stats_func['Dom'] == 1).sum(),
+                (stats_func['Dom'] >= 2).sum(),
+                stats_func['Dom'].max() - stats_func['Dom'].min() if len(stats_func) > 0 else 0,
+                stats_func['Sáb'].max() - stats_func['Sáb'].min() if len(stats_func) > 0 else 0
+            ]
+        })
+        
+        return stats_func, stats_mes, resumo_geral
+    
+    def gerar_relatorio_comparativo(self, anos: List[int]):
+        """
+        Gera um relatório comparando vários anos a partir dos agregados mensais
+        
+        Args:
+            anos: Lista de anos a comparar
+            
+        Returns:
+            Caminho do relatório ou None se nenhum ano tiver escalas
+        """
+        print(f"\n📊 GERANDO RELATÓRIO COMPARATIVO {min(anos)}-{max(anos)}")
+        print("=" * 50)
+        
+        resumos = []
+        funcionarios_ano = []
+        
+        agregados_periodos = self.carregar_agregados_periodos(
+            [(ano, mes) for ano in sorted(anos) for mes in range(1, 13)]
+        )
+        
+        for ano in sorted(anos):
+            lista_agregados = [a for (a_ano, _), a in sorted(agregados_periodos.items()) if a_ano == ano]
+            
+            if not lista_agregados:
+                print(f"  ✗ {ano}: nenhuma escala")
+                continue
+            
+            stats_func, _, resumo_geral = self.consolidar_agregados(lista_agregados)
+            
+            resumos.append(resumo_geral.set_index('Métrica')['Valor'].rename(ano))
+            funcionarios_ano.append(stats_func.assign(Ano=ano))
+            print(f"  ✓ {ano}: {len(lista_agregados)} meses")
+        
+        if not resumos:
+            print("❌ Nenhuma escala encontrada para os anos informados")
+            return None
+        
+        dir_relatorios = "RELATORIOS_ANUAIS"
+        os.makedirs(dir_relatorios, exist_ok=True)
+        arquivo_relatorio = f"{dir_relatorios}/RELATORIO_COMPARATIVO_{min(anos)}_{max(anos)}.xlsx"
+        
+        with escrita_atomica(arquivo_relatorio, sufixo='.tmp.xlsx') as temporario, pd.ExcelWriter(temporario, engine='openpyxl') as writer:
+            pd.concat(resumos, axis=1).reset_index().to_excel(writer, sheet_name='RESUMO_POR_ANO', index=False)
+            
+            df_funcionarios = pd.concat(funcionarios_ano, ignore_index=True)
+            df_funcionarios.pivot_table(
+                index=['Funcionário', 'Ilha'], columns='Ano',
+                values='Total Fim de Semana', fill_value=0
+            ).reset_index().to_excel(writer, sheet_name='FIM_SEMANA_POR_ANO', index=False)
+        
+        print(f"\n✅ Relatório comparativo salvo em: {arquivo_relatorio}")
+        
+        return arquivo_relatorio
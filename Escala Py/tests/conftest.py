@@ -0,0 +1,31 @@
+"""
+Fixtures dos testes do sistema de escala
+
+Cada teste roda em um diretório temporário com a escala de janeiro/2026
+gerada e salva (o histórico fica em ESCALAS_HISTORICO relativo ao cwd).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def sistema(tmp_path, monkeypatch):
+    from sistema_escala import SistemaEscalaExcel
+
+    monkeypatch.chdir(tmp_path)
+    sistema = SistemaEscalaExcel()
+    df = sistema.gerar_escala_mensal(2026, 1, 4)
+    sistema.salvar_escala_excel(df, 2026, 1)
+    return sistema
+
+
+@pytest.fixture
+def editor(sistema):
+    from edicao import EditorEscala
+
+    return EditorEscala(sistema)
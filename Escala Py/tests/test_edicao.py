@@ -0,0 +1,107 @@
+"""Testes das edições pontuais (edicao.EditorEscala)"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from edicao import ler_edicoes
+
+
+def _fim_de_semana(sistema, semana, ilha):
+    df = sistema.carregar_escala(2026, 1)
+    da_ilha = df[(df['Semana do Mês'] == semana) & (df['Ilha'] == ilha)]
+    return {str(row['Funcionário']): (bool(row['Sáb']), bool(row['Dom']))
+            for _, row in da_ilha.iterrows()}
+
+
+def _quem_trabalha(fim_de_semana, dia):
+    return [nome for nome, dias in fim_de_semana.items() if dias[dia]]
+
+
+@pytest.mark.parametrize('dia', [5, 6])
+def test_ausencia_no_fim_de_semana_mantem_o_outro_dia(editor, sistema, dia):
+    ilha = 'ILHA SC'
+    antes = _fim_de_semana(sistema, 1, ilha)
+    ausente = _quem_trabalha(antes, dia - 5)[0]
+
+    relatorio = editor.registrar_ausencia(2026, 1, ausente, 1, [dia])
+
+    depois = _fim_de_semana(sistema, 1, ilha)
+    outro = 6 - dia
+    # Quem cobria o outro dia continua cobrindo; ninguém trabalha os dois
+    assert _quem_trabalha(depois, outro) == _quem_trabalha(antes, outro)
+    assert len(_quem_trabalha(depois, dia - 5)) == len(_quem_trabalha(antes, dia - 5))
+    assert not any(sab and dom for sab, dom in depois.values())
+    assert relatorio['validacao']['ok'], relatorio['validacao']['erros']
+
+
+@pytest.mark.parametrize('dia', [5, 6])
+def test_substituto_nao_sai_do_outro_dia_do_fim_de_semana(editor, sistema, dia):
+    df, mascaras = editor._carregar(2026, 1)
+    fim_de_semana = _fim_de_semana(sistema, 1, 'ILHA SC')
+    # Só sobra como candidato quem cobre o outro dia: ninguém pode ser escolhido
+    outro_dia = set(_quem_trabalha(fim_de_semana, 6 - dia))
+    excluir = set(fim_de_semana) - outro_dia
+
+    with pytest.raises(ValueError, match='Ninguém disponível'):
+        editor._escolher_substituto(df, mascaras, 1, 'ILHA SC', dia, excluir)
+
+
+def test_edicao_que_quebra_cobertura_nao_vai_para_o_diario(editor, sistema):
+    df, mascaras = editor._carregar(2026, 1)
+    domingo = _quem_trabalha(_fim_de_semana(sistema, 1, 'ILHA SC'), 1)[0]
+    linha = editor._linha(df, 1, domingo)
+
+    with pytest.raises(ValueError, match='Edição recusada'):
+        editor._registrar(2026, 1, 'ausencia', df, mascaras, 1,
+                          {domingo: int(mascaras[linha]) & ~(1 << 6)}, {domingo: [6]})
+
+    assert ler_edicoes(editor.diretorio, 2026, 1) == []
+
+
+def _derivados(sistema):
+    arquivos = [f"{sistema.diretorio_indices}/DISPONIBILIDADE_2026_01.json",
+                f"{sistema.diretorio_indices}/LINHA_DO_TEMPO.json",
+                f"{sistema.diretorio_agregados}/ESCALA_2026_01.json",
+                f"{sistema.diretorio_agregados}/CONTADORES_ANO_2026.json"]
+    derivados = {}
+    for arquivo in arquivos:
+        with open(arquivo, encoding='utf-8') as f:
+            derivados[arquivo] = json.load(f)
+    return derivados
+
+
+def test_derivados_parciais_iguais_ao_recalculo_completo(editor, sistema):
+    domingo = _quem_trabalha(_fim_de_semana(sistema, 1, 'ILHA SC'), 1)[0]
+    editor.registrar_ausencia(2026, 1, domingo, 1, [6])
+    editor.admitir_funcionario(2026, 1, 'ILHA SC', 'FUNCIONARIO NOVO', 2)
+    parciais = _derivados(sistema)
+
+    sistema.atualizar_derivados_edicao(2026, 1, sistema.carregar_escala(2026, 1))
+
+    assert parciais == _derivados(sistema)
+
+
+def test_contadores_de_folgas_vem_do_diario(editor, sistema):
+    from sistema_escala import SistemaEscalaExcel
+
+    antes = sistema.ler_rodizio_folgas(2026, 1).set_index('Funcionário')
+    domingo = _quem_trabalha(_fim_de_semana(sistema, 1, 'ILHA SC'), 1)[0]
+    relatorio = editor.registrar_ausencia(2026, 1, domingo, 1, [6])
+    editor.admitir_funcionario(2026, 1, 'ILHA SC', 'FUNCIONARIO NOVO', 2)
+    substituto = next(l['funcionario'] for l in relatorio['linhas'] if l['funcionario'] != domingo)
+
+    # Outro processo: nada em memória, tudo vem do Excel mais o diário
+    outro = SistemaEscalaExcel()
+    depois = outro.ler_rodizio_folgas(2026, 1).set_index('Funcionário')
+    assert depois.loc[substituto, 'Total Folgas Semana'] == antes.loc[substituto, 'Total Folgas Semana'] + 1
+
+    # A admissão chega ao rodízio do mês seguinte pelo diário
+    fevereiro = SistemaEscalaExcel().gerar_escala_mensal(2026, 2, 4)
+    assert 'FUNCIONARIO NOVO' in set(fevereiro['Funcionário'])
+
+    SistemaEscalaExcel().consolidar_edicoes(2026, 1)
+    planilha = pd.read_excel(f"{outro.diretorio_escalas}/ESCALA_2026_01.xlsx", sheet_name='RODÍZIO_FOLGAS')
+    assert planilha.set_index('Funcionário').loc[substituto, 'Total Folgas Semana'] == \
+        depois.loc[substituto, 'Total Folgas Semana']
@@ -0,0 +1,15 @@
+"""Testes do manifesto do histórico (historico.py)"""
+
+from historico import ler_manifesto, reindexar_historico
+
+
+def test_reindexacao_reconstroi_a_validacao(sistema):
+    diretorio = sistema.diretorio_escalas
+    gravada = ler_manifesto(diretorio)['escalas']['2026-01']['validacao']
+
+    reconstruida = reindexar_historico(diretorio)['escalas']['2026-01']['validacao']
+
+    assert reconstruida.keys() == gravada.keys()
+    assert reconstruida['regras_ok'] == gravada['regras_ok']
+    assert reconstruida['total_regras'] == gravada['total_regras']
+    assert reconstruida['erros'] == min(gravada['erros'], 10)
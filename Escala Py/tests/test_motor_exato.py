@@ -0,0 +1,40 @@
+"""Testes do motor exato (motor_exato.py)"""
+
+import random
+
+import pytest
+
+import motor_exato
+from esquema import presenca
+
+pytestmark = pytest.mark.skipif(not motor_exato.SCIPY_DISPONIVEL, reason='SciPy não instalado')
+
+
+def test_escala_exata_respeita_as_regras(sistema):
+    random.seed(2)
+    df = sistema.gerar_escala_mensal(2026, 2, 4, motor='exato')
+
+    sabado = presenca(df['Sáb']).to_numpy()
+    domingo = presenca(df['Dom']).to_numpy()
+
+    # 5 dias por semana e nunca sábado e domingo na mesma semana
+    assert (df['Dias Trabalhados'] == sistema.regras.padrao['dias_trabalhados']).all()
+    assert not (sabado & domingo).any()
+
+    # Cobertura de cada ilha-semana igual às metas da geração
+    fim_de_semana = df.assign(Sab=sabado, Dom=domingo).groupby(
+        ['Semana do Mês', 'Ilha'], observed=True)[['Sab', 'Dom']].sum()
+    for semana in range(1, 5):
+        for ilha, meta in sistema.metas_fim_de_semana(semana).items():
+            assert tuple(fim_de_semana.loc[(semana, ilha)]) == meta
+
+
+def test_escala_exata_nao_perde_para_a_gulosa_na_pontuacao(sistema):
+    # As duas gerações partem dos contadores de janeiro (recarregados a cada chamada)
+    random.seed(2)
+    gulosa = sistema.pontuar_escala(sistema.gerar_escala_mensal(2026, 2, 4))
+
+    random.seed(2)
+    exata = sistema.pontuar_escala(sistema.gerar_escala_mensal(2026, 2, 4, motor='exato'))
+
+    assert exata['total'] <= gulosa['total']
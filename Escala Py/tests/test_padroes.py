@@ -0,0 +1,40 @@
+"""Testes da cópia codificada por padrão semanal (padroes.py)"""
+
+import pandas as pd
+
+import padroes
+from edicao import aplicar_edicoes, ler_edicoes
+from esquema import compactar_escala
+
+
+def _escala_do_excel(sistema, ano, mes):
+    arquivo = f"{sistema.diretorio_escalas}/ESCALA_{ano}_{mes:02d}.xlsx"
+    return compactar_escala(pd.read_excel(arquivo, sheet_name='ESCALA_COMPLETA'))
+
+
+def test_decodificar_devolve_a_escala_codificada(sistema, tmp_path):
+    df = _escala_do_excel(sistema, 2026, 1)
+    # Uma máscara fora das regras (trabalha os 7 dias) também precisa voltar igual
+    df.loc[0, ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']] = True
+    df.loc[0, ['Dias Trabalhados', 'Folgas']] = [7, 0]
+
+    nomes = list(dict.fromkeys(df['Funcionário'].astype(str)))
+    caminho = str(tmp_path / 'ESCALA.npz')
+    padroes.gravar_escala_codificada(caminho, padroes.codificar_escala(df, {n: i for i, n in enumerate(nomes)}),
+                                     [1, 2, 3])
+    escala = padroes.ler_escala_codificada(caminho, nomes)
+
+    assert escala.versao == [1, 2, 3]
+    pd.testing.assert_frame_equal(escala.dataframe(), df)
+
+
+def test_copia_codificada_inclui_as_edicoes_do_diario(editor, sistema):
+    df, mascaras = editor._carregar(2026, 1)
+    a, b = df[(df['Semana do Mês'] == 2) & (df['Ilha'] == 'ILHA SC')]['Funcionário'].astype(str)[:2]
+    editor.trocar(2026, 1, 2, a, b)
+    editor.admitir_funcionario(2026, 1, 'ILHA SC', 'FUNCIONARIO NOVO', 3)
+
+    sistema.escalas_em_memoria.clear()
+    esperado = aplicar_edicoes(_escala_do_excel(sistema, 2026, 1), ler_edicoes(sistema.diretorio_escalas, 2026, 1))
+
+    pd.testing.assert_frame_equal(sistema.carregar_escala_codificada(2026, 1).dataframe(), esperado)
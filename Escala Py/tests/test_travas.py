@@ -0,0 +1,44 @@
+"""Testes das travas de escritores (travas.py)"""
+
+import threading
+import time
+
+import pytest
+
+from travas import trava_arquivo, trava_geracao
+
+
+def test_exclusiva_com_compartilhada_mantida_e_erro(tmp_path):
+    caminho = str(tmp_path / 'ESCALA.lock')
+
+    with trava_arquivo(caminho, exclusiva=False):
+        with pytest.raises(RuntimeError, match='compartilhada'):
+            with trava_arquivo(caminho):
+                pass
+
+    # Reentrância no sentido contrário continua valendo
+    with trava_arquivo(caminho):
+        with trava_arquivo(caminho, exclusiva=False):
+            with trava_arquivo(caminho):
+                pass
+
+
+def test_geracoes_do_mesmo_processo_em_sequencia(tmp_path):
+    dentro = []
+    sobrepostas = []
+
+    def gerar(mes):
+        with trava_geracao(str(tmp_path), 2026, mes):
+            dentro.append(mes)
+            sobrepostas.append(len(dentro) > 1)
+            time.sleep(0.05)
+            dentro.remove(mes)
+
+    # Meses não vizinhos: as travas de arquivo não se cruzam
+    threads = [threading.Thread(target=gerar, args=(mes,)) for mes in (3, 6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sobrepostas == [False, False]
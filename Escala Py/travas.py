@@ -0,0 +1,141 @@
+"""
+Travas de arquivo para escritores concorrentes do histórico
+
+Protocolo:
+    - Geração e salvamento (trava_geracao) pegam trava exclusiva do período
+      que gravam e trava compartilhada do mês anterior, do qual leem os
+      contadores. Duas gerações de meses vizinhos ficam assim em sequência.
+    - Edições (edicao.py) pegam só a exclusiva do período: partem do próprio
+      mês (Excel, diário e contadores acumulados dele), não dos contadores do
+      mês anterior, e não mudam o rodízio em memória; por isso dispensam a
+      compartilhada do mês anterior e a RLock.
+    - Leitores (páginas, downloads, relatórios) não pegam trava: todo arquivo
+      é gravado num temporário e renomeado (os.replace), então o leitor vê a
+      versão anterior inteira ou a nova inteira, nunca meio arquivo.
+
+As travas usam fcntl.flock (POSIX) ou msvcrt.locking (Windows, só
+exclusiva) e são reentrantes por thread: um escritor que já tem a trava de um
+período pode chamar outro método que pede a mesma trava. Pedir a exclusiva
+tendo só a compartilhada é erro (não há promoção de trava).
+
+flock só separa processos; threads do mesmo processo compartilham o sistema
+(rodízio em memória), então trava_geracao também serializa as gerações do
+processo com uma RLock. Os arquivos compartilhados entre meses (manifesto,
+agregado anual, linha do tempo) têm cada um a sua trava de arquivo.
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_mantidas = threading.local()
+_trava_geracoes = threading.RLock()
+
+
+def _esquecer_travas():
+    # flock não passa para o filho do fork: ele começa sem nenhuma trava
+    global _trava_geracoes
+    _mantidas.__dict__.clear()
+    _trava_geracoes = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_esquecer_travas)
+
+
+def _travar(arquivo, exclusiva: bool):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+        return
+
+    # msvcrt não tem trava compartilhada nem espera indefinida: tentar até conseguir
+    while True:
+        try:
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(0.05)
+
+
+def _destravar(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    else:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def trava_arquivo(caminho: str, exclusiva: bool = True):
+    """
+    Trava entre processos sobre um arquivo .lock (criado se não existir)
+
+    Args:
+        caminho: Arquivo de trava
+        exclusiva: Exclusiva (escrita) ou compartilhada (leitura de quem vai escrever)
+    """
+    contagem = getattr(_mantidas, 'contagem', None)
+    if contagem is None:
+        contagem = _mantidas.contagem = {}
+        _mantidas.exclusivas = set()
+
+    if contagem.get(caminho):
+        if exclusiva and caminho not in _mantidas.exclusivas:
+            raise RuntimeError(f"Trava exclusiva pedida com a compartilhada já mantida: {caminho}")
+
+        # Esta thread já tem a trava: só contar
+        contagem[caminho] += 1
+        try:
+            yield
+        finally:
+            contagem[caminho] -= 1
+        return
+
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+
+    with open(caminho, 'a+') as arquivo:
+        _travar(arquivo, exclusiva)
+        contagem[caminho] = 1
+        if exclusiva:
+            _mantidas.exclusivas.add(caminho)
+        try:
+            yield
+        finally:
+            contagem[caminho] = 0
+            _mantidas.exclusivas.discard(caminho)
+            _destravar(arquivo)
+
+
+def caminho_trava(diretorio: str, ano: int, mes: int) -> str:
+    """Arquivo de trava de um período"""
+    return f"{diretorio}/TRAVAS/ESCALA_{ano}_{mes:02d}.lock"
+
+
+@contextmanager
+def trava_periodo(diretorio: str, ano: int, mes: int, exclusiva: bool = True):
+    """Trava de um período do histórico (ver trava_arquivo)"""
+    with trava_arquivo(caminho_trava(diretorio, ano, mes), exclusiva):
+        yield
+
+
+@contextmanager
+def trava_geracao(diretorio: str, ano: int, mes: int):
+    """
+    Trava para gerar/salvar um mês: compartilhada no mês anterior, exclusiva no mês
+
+    A ordem é sempre do mês mais antigo para o mais novo, o que evita impasse
+    entre gerações de meses vizinhos. No processo, uma geração por vez (em
+    qualquer mês), já que todas alteram o mesmo estado em memória.
+    """
+    ano_anterior, mes_anterior = (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+    with _trava_geracoes:
+        with trava_periodo(diretorio, ano_anterior, mes_anterior, exclusiva=False):
+            with trava_periodo(diretorio, ano, mes):
+                yield
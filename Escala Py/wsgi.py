@@ -0,0 +1,34 @@
+"""
+Ponto de entrada de produção (WSGI)
+
+Uso com vários workers compartilhando um único histórico carregado:
+
+    gunicorn --preload -w 4 -b 0.0.0.0:5000 wsgi:app
+
+Com --preload, este módulo é importado uma vez no processo mestre: a
+aplicação é criada, o histórico (escalas codificadas e índices de
+disponibilidade) é carregado em memória e os objetos são congelados fora do
+coletor de lixo. Os workers criados depois herdam esse snapshot por
+copy-on-write, então adicionar workers não multiplica a memória do histórico.
+
+Quando um worker salva ou edita um mês, ele regrava o marcador
+ESCALAS_HISTORICO/GERACAO; na próxima requisição cada worker percebe a mudança
+(um stat) e descarta apenas os meses que mudaram.
+
+Variáveis de ambiente:
+    ESCALA_SNAPSHOT_MESES: meses mais recentes no snapshot (0 = todos)
+"""
+import gc
+import os
+
+from app_escala import criar_app, sistema
+
+# Sem thread de aquecimento: o snapshot abaixo já carrega o histórico, e o
+# fork dos workers não deve acontecer com uma thread rodando
+app = criar_app(aquecer=False)
+
+meses_snapshot = sistema.carregar_snapshot(int(os.environ.get('ESCALA_SNAPSHOT_MESES', 0)) or None)
+print(f"📦 Snapshot do histórico: {meses_snapshot} meses em memória (pid {os.getpid()})")
+
+# Objetos do snapshot fora do GC: as coletas nos workers não tocam (e não copiam) essas páginas
+gc.freeze()